@@ -0,0 +1,173 @@
+# NFS - host stand-in for the esp-now gateway, for testing on a computer with python 3
+
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# The frames of nfs_espnow.py are carried in udp datagrams instead of esp-now, keep the formats below the same as in nfs_espnow.py.
+# Gateway: python3 host/espnow_gateway.py [--port 4210] [--mqtt broker.local]
+#   prints every message, publishes it when --mqtt is given and paho-mqtt (1.6 or 2.x) is installed, then acks it
+# Sensor: python3 host/espnow_gateway.py --send payload.json [--gateway 127.0.0.1] [--port 4210]
+#   sends a payload the way an esp-now sensor does and waits for the ack
+
+import argparse
+import json
+import random
+import socket
+import struct
+import sys
+import time
+
+
+# [ Functions ]
+# frames of a message, each is the frame header (magic, boot nonce, message id, frame index, frame count) then the next part of the message.
+# message_key is (boot nonce, message id), the nonce tells a sender that restarted its message ids from a repeated message
+def espnow_frames(message_key, message_bytes):
+    espnow_frame_data_bytes = Constant_espnow_frame_bytes - struct.calcsize(Constant_espnow_frame_header_format)
+    espnow_frame_count = max(1, (len(message_bytes) + espnow_frame_data_bytes - 1) // espnow_frame_data_bytes)
+    return [struct.pack(Constant_espnow_frame_header_format, Constant_espnow_frame_magic, message_key[0], message_key[1], espnow_frame_index, espnow_frame_count) + message_bytes[espnow_frame_index * espnow_frame_data_bytes:(espnow_frame_index + 1) * espnow_frame_data_bytes] for espnow_frame_index in range(espnow_frame_count)]
+
+
+# add a frame from sender to the messages being received, one per sender. Returns (message key, message) once every frame of the message arrived, else None.
+# The message key is (boot nonce, message id)
+def espnow_reassemble(espnow_messages_dictionary, sender, espnow_frame):
+    espnow_frame_header_bytes = struct.calcsize(Constant_espnow_frame_header_format)
+    if len(espnow_frame) < espnow_frame_header_bytes:
+        return None
+    espnow_frame_magic, boot_nonce, message_id, espnow_frame_index, espnow_frame_count = struct.unpack_from(Constant_espnow_frame_header_format, espnow_frame)
+    message_key = (boot_nonce, message_id)
+    if espnow_frame_magic != Constant_espnow_frame_magic or espnow_frame_index >= espnow_frame_count:
+        return None
+    espnow_message = espnow_messages_dictionary.get(sender)
+    # a new message drops what arrived of the last one
+    if espnow_message is None or espnow_message[0] != message_key or espnow_message[1] != espnow_frame_count:
+        espnow_message = [message_key, espnow_frame_count, [None] * espnow_frame_count]
+        espnow_messages_dictionary[sender] = espnow_message
+    espnow_message[2][espnow_frame_index] = bytes(espnow_frame[espnow_frame_header_bytes:])
+    if None in espnow_message[2]:
+        return None
+    del espnow_messages_dictionary[sender]
+    return message_key, b''.join(espnow_message[2])
+
+
+# mqtt client when a broker is given and paho-mqtt is installed, else None and messages are only printed
+def mqtt_client(mqtt_host, mqtt_port):
+    if not mqtt_host:
+        return None
+    try:
+        # noinspection PyUnresolvedReferences
+        import paho.mqtt.client
+    except ImportError as e:
+        print('Error: {0}'.format(e))
+        print('paho-mqtt not installed, messages are only printed')
+        return None
+    # paho-mqtt 2.x needs the callback api version, 1.x has none
+    if hasattr(paho.mqtt.client, 'CallbackAPIVersion'):
+        mqttc = paho.mqtt.client.Client(paho.mqtt.client.CallbackAPIVersion.VERSION2)
+    else:
+        mqttc = paho.mqtt.client.Client()
+    mqttc.connect(mqtt_host, mqtt_port)
+    mqttc.loop_start()
+    return mqttc
+
+
+# gateway, prints and publishes every message from a sensor and acknowledges it back to the sensor. Never returns
+def espnow_gateway(port, mqtt_host, mqtt_port):
+    mqttc = mqtt_client(mqtt_host, mqtt_port)
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    udp_socket.bind(('', port))
+    print('esp-now gateway stand-in on udp port {0}'.format(port))
+    espnow_messages_dictionary = {}
+    # last (boot nonce, message id) published for each sensor, a message sent again because the ack was lost is only acknowledged
+    espnow_published_dictionary = {}
+    while True:
+        espnow_frame, espnow_sender = udp_socket.recvfrom(Constant_espnow_frame_bytes)
+        espnow_message = espnow_reassemble(espnow_messages_dictionary, espnow_sender, espnow_frame)
+        if espnow_message is None:
+            continue
+
+        espnow_status = 0
+        if espnow_published_dictionary.get(espnow_sender) == espnow_message[0]:
+            print('{0} message {1} again, acknowledged only'.format(espnow_sender, espnow_message[0]))
+        else:
+            try:
+                # the message is the payload of the sensor, keyed by its unique id like its own mqtt topic
+                topic = 'noflippingswitches/sensor/' + next(iter(json.loads(espnow_message[1])))
+                print('{0} message {1} to {2}: {3}'.format(espnow_sender, espnow_message[0], topic, espnow_message[1].decode('UTF-8')))
+                if mqttc is not None:
+                    mqtt_message_info = mqttc.publish(topic, espnow_message[1], qos=1)
+                    mqtt_message_info.wait_for_publish(Constant_espnow_ack_timeout_ms / 1000)
+                    # wait_for_publish returns on timeout too, the sensor keeps the readings unless the broker has them
+                    if not mqtt_message_info.is_published():
+                        raise OSError('mqtt publish not acknowledged by the broker')
+                espnow_published_dictionary[espnow_sender] = espnow_message[0]
+            except Exception as e:
+                print('Error: {0}'.format(e))
+                espnow_status = 1
+        udp_socket.sendto(struct.pack(Constant_espnow_ack_format, Constant_espnow_ack_magic, espnow_message[0][0], espnow_message[0][1], espnow_status), espnow_sender)
+
+
+# sensor, sends a payload to the gateway and waits for its ack. Returns True if the gateway published it
+def espnow_send(gateway_host, port, message_bytes):
+    udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # a new nonce every run like a sensor after power on, the gateway only skips a message with the same key as the last one from this sender
+    message_key = (random.randint(1, 0xFFFF), int(time.time()) & 0xFFFF)
+    for espnow_frame in espnow_frames(message_key, message_bytes):
+        udp_socket.sendto(espnow_frame, (gateway_host, port))
+    udp_socket.settimeout(Constant_espnow_ack_timeout_ms / 1000)
+    try:
+        while True:
+            espnow_frame = udp_socket.recv(Constant_espnow_frame_bytes)
+            if len(espnow_frame) != struct.calcsize(Constant_espnow_ack_format):
+                continue
+            espnow_ack_magic, ack_boot_nonce, ack_message_id, espnow_status = struct.unpack(Constant_espnow_ack_format, espnow_frame)
+            if espnow_ack_magic == Constant_espnow_ack_magic and (ack_boot_nonce, ack_message_id) == message_key:
+                return espnow_status == 0
+    except socket.timeout:
+        print('esp-now gateway did not acknowledge')
+        return False
+
+
+# [Static]
+# esp-now - max bytes of one esp-now frame
+Constant_espnow_frame_bytes = 250
+# esp-now - frame header (magic, boot nonce, message id, frame index, frame count), then the next part of the message
+Constant_espnow_frame_header_format = '<BHHBB'
+Constant_espnow_frame_magic = 0xE5
+# esp-now - ack from the gateway (magic, boot nonce, message id, status 0 published 1 failed)
+Constant_espnow_ack_format = '<BHHB'
+Constant_espnow_ack_magic = 0xE6
+# esp-now - ms a sensor waits for the ack of the gateway after the last frame
+Constant_espnow_ack_timeout_ms = 2000
+
+
+if __name__ == '__main__':
+    argument_parser = argparse.ArgumentParser(description='esp-now gateway stand-in over udp')
+    argument_parser.add_argument('--port', type=int, default=4210, help='udp port of the gateway')
+    argument_parser.add_argument('--mqtt', default='', help='mqtt broker to publish to, needs paho-mqtt')
+    argument_parser.add_argument('--mqtt-port', type=int, default=1883)
+    argument_parser.add_argument('--send', default='', help='act as a sensor and send this json payload file to the gateway')
+    argument_parser.add_argument('--gateway', default='127.0.0.1', help='host of the gateway when sending')
+    arguments = argument_parser.parse_args()
+    if arguments.send:
+        with open(arguments.send, 'rb') as payload_file:
+            sys.exit(0 if espnow_send(arguments.gateway, arguments.port, payload_file.read()) else 1)
+    espnow_gateway(arguments.port, arguments.mqtt, arguments.mqtt_port)
@@ -0,0 +1,142 @@
+# NFS - decoder of the binary payload for consumers on a computer with python 3
+
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+# Decodes the frames nfs_payload.py publishes on noflippingswitches/sensor/<unique_id>/bin into the dictionary of the json payload, keep the
+# formats below the same as in nfs_payload.py. The static fields (device, sensor ids, intervals) are in the first frame of a send after they
+# changed, after a power on, and at least every 24 sends (Constant_payload_static_every_sends), so keep the last ones of each device. A consumer
+# that starts late can decode the frames of a device once its next frame with static fields arrives.
+# python3 host/payload_decode.py frame.bin
+
+import json
+import struct
+import sys
+
+
+# [ Functions ]
+# temperature or error code from centi-degrees, as nfs_rtc.py centi_to_temp
+def centi_to_temp(centi):
+    if centi >= Constant_rtc_series_error_offset:
+        return centi - Constant_rtc_series_error_offset + Constant_temp_error_code_min
+    return centi / 100
+
+
+# (text, offset after it) of length prefixed utf-8 at offset
+def payload_text_unpack(payload_frame, offset):
+    return payload_frame[offset + 1:offset + 1 + payload_frame[offset]].decode('UTF-8'), offset + 1 + payload_frame[offset]
+
+
+# dictionary of a binary frame laid out like the json payload of the device. static_dictionary is the "static" of the last frame of the device
+# that had them, used when this frame has none
+def payload_binary_unpack(payload_frame, static_dictionary=None):
+    (payload_version, payload_flags, series_count, series_rows, ts_base, ts_interval_ms, record_interval_ms, battery_mv, battery_percentage,
+     power_up_ms, conversion_ms, gap_count) = struct.unpack_from(Constant_payload_header_format, payload_frame)
+    if payload_version != Constant_payload_version:
+        raise ValueError('binary payload version {0} not supported'.format(payload_version))
+    offset = struct.calcsize(Constant_payload_header_format)
+    ts_gaps = []
+    for _ in range(gap_count):
+        ts_gaps.append(list(struct.unpack_from(Constant_payload_gap_format, payload_frame, offset)))
+        offset += struct.calcsize(Constant_payload_gap_format)
+    series_list = []
+    for _ in range(series_count):
+        series_list.append([centi_to_temp(centi) for centi in struct.unpack_from('<' + 'h' * series_rows, payload_frame, offset)])
+        offset += 2 * series_rows
+    energy_dictionary = None
+    if payload_flags & Constant_payload_flag_energy:
+        energy_dictionary = dict(zip(Constant_payload_energy_keys, [None if energy != energy else energy for energy in struct.unpack_from(Constant_payload_energy_format, payload_frame, offset)]))
+        offset += struct.calcsize(Constant_payload_energy_format)
+    if payload_flags & Constant_payload_flag_static:
+        record_data_interval_ms, send_data_interval_min = struct.unpack_from(Constant_payload_static_format, payload_frame, offset)
+        offset += struct.calcsize(Constant_payload_static_format)
+        device, offset = payload_text_unpack(payload_frame, offset)
+        sensor_id, offset = payload_text_unpack(payload_frame, offset)
+        # empty when no sensor was found, false in the json payload
+        sensor_id = sensor_id or False
+        sensor_ids = []
+        offset += 1
+        for _ in range(payload_frame[offset - 1]):
+            sensor_id_next, offset = payload_text_unpack(payload_frame, offset)
+            sensor_ids.append(sensor_id_next)
+        static_dictionary = {"record_data_interval_ms": record_data_interval_ms, "send_data_interval_min": send_data_interval_min, "device": device, "sensor_id": sensor_id, "sensor_ids": sensor_ids}
+    if static_dictionary is None:
+        raise ValueError('binary payload without static fields, decode the last frame with them first')
+    payload_dictionary = {
+        "sensor": {
+            "tempC": series_list[0] if series_list else [],
+            "tempC_by_sensor_id": dict(zip(static_dictionary['sensor_ids'], series_list)),
+            "ts_base": ts_base or None,
+            "ts_interval_ms": ts_interval_ms or None,
+            "ts_gaps": ts_gaps,
+            "record_data_interval_ms": static_dictionary['record_data_interval_ms'],
+            "record_interval_ms": record_interval_ms,
+            "send_data_interval_min": static_dictionary['send_data_interval_min'],
+            "power_up_ms": power_up_ms,
+            "conversion_ms": conversion_ms
+        },
+        "battery": {
+            "volts": battery_mv / 1000,
+            "percentage": battery_percentage,
+            "energy": energy_dictionary
+        },
+        "device": {
+            "device": static_dictionary['device'],
+            "sensor_id": static_dictionary['sensor_id'],
+            "sensor_ids": static_dictionary['sensor_ids']
+        },
+        "static": static_dictionary
+    }
+    if payload_flags & Constant_payload_flag_spooled:
+        payload_dictionary['sensor']['spooled'] = True
+    if payload_flags & Constant_payload_flag_diagnostics:
+        diagnostics_length = struct.unpack_from('<H', payload_frame, offset)[0]
+        payload_dictionary['diagnostics'] = json.loads(payload_frame[offset + 2:offset + 2 + diagnostics_length])
+    return payload_dictionary
+
+
+# [Static]
+# payload - version of the binary frame
+Constant_payload_version = 1
+# payload - (version, flags, sensors, readings per sensor, ts_base, ts_interval_ms, record_interval_ms, battery mV, battery %, power_up_ms,
+# conversion_ms, gaps)
+Constant_payload_header_format = '<BBBHIIIHBhhB'
+# payload - per gap in the timestamps (reading, timestamp, interval ms)
+Constant_payload_gap_format = '<HII'
+# payload - energy ledger of the battery, nan when not known
+Constant_payload_energy_format = '<ffff'
+Constant_payload_energy_keys = ('used_mah', 'average_ma', 'average_ma_since_send', 'days_remaining')
+# payload - (record_data_interval_ms, send_data_interval_min) then device, sensor_id and the sensor ids as length prefixed text
+Constant_payload_static_format = '<IH'
+# payload - flags of what follows the readings
+Constant_payload_flag_static = 1
+Constant_payload_flag_spooled = 2
+Constant_payload_flag_energy = 4
+Constant_payload_flag_diagnostics = 8
+# readings - centi-degrees at or above this are error codes, temperatures at or above Constant_temp_error_code_min are error codes
+Constant_rtc_series_error_offset = 32000
+Constant_temp_error_code_min = 900
+
+
+if __name__ == '__main__':
+    with open(sys.argv[1], 'rb') as payload_file:
+        print(json.dumps(payload_binary_unpack(payload_file.read()), indent=2))
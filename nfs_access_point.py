@@ -0,0 +1,741 @@
+# NFS - access point mode, web server for the settings
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import usocket as socket
+import machine
+import network
+import gc
+import json
+from nfs_sensor import batt, ds18b20_apply_resolution, ds18b20, Constant_ds18b20_conversion_time_ms
+from nfs_rtc import rtc_series_capacity_rows
+from nfs_settings import json_to_dictionary, dictionary_to_json
+from nfs_mqtt import mqtt_client
+from nfs_network import known_wifi_first, known_wifi_set_first, wifi_connection_status, wifi_station_wait, wifi_client_scan, Constant_wifi_connect_timeout_ms
+
+
+# [ Functions ]
+# access point mode, web server to change the settings and test wifi and mqtt. Never returns
+def access_point(device_settings_dictionary, wifi_settings_dictionary):
+
+    # global vars
+    html_wifi_connection_status = ''
+    ip_address_html = ''
+    subnet_mask_html = ''
+    gateway_server_html = ''
+    dns_server_html = ''
+    hostname_html = ''
+    ssid_html = ''
+    html_mqtt_connection_status = ''
+    data_out_dictionary = {}
+
+    print('Access Point mode selected')
+
+    # log system info if dictionary loadded successfully
+    print('\ndevice: {0}\nboard: {1}\nbattery: {2}\nsoftware_version: {3}\nunique_id: {4}\nhash_unique_id: {5}\nds18b20_sn: {6}\n'.format(
+        device_settings_dictionary['device'],  # {0}
+        device_settings_dictionary['board'],  # {1}
+        device_settings_dictionary['battery'],  # {2}
+        device_settings_dictionary['software_version'],  # {3}
+        device_settings_dictionary['unique_id'],  # {4}
+        device_settings_dictionary['hash_unique_id'],  # {5}
+        ', '.join(device_settings_dictionary['ds18b20_sn_list']),  # {6}
+    ))
+
+    # get tempature of ds18b20(s)
+    tempC_internal_ap, tempC_internal_ready_ms_ap = ds18b20(device_settings_dictionary["ds18b20_sn_list"], wifi_settings_dictionary["ds18b20_resolution"])
+    # get battery voltage and % estleft
+    batt_result_ap = batt()
+
+    # scan for Wi-Fi networks and get best channel to use for Access Point
+    ap_client_scan, ap_client_scan_raw = wifi_client_scan()
+    # print('ap_client_scan: ', ap_client_scan)
+
+    # check connection to mqtt
+    # the first known wifi network is the one set here, more can be added to known_wifi in wifi_settings.json
+    known_wifi_dictionary = known_wifi_first(wifi_settings_dictionary)
+    # has user set ssid for his Wi-Fi connection?
+    if 'wifi_ssid' not in known_wifi_dictionary:
+        html_wifi_connection_status = 'Select_a_SSID_Network_Name'
+    else:
+        # CONNECT to user defined wifi network
+        # define wifi station
+        wifi_station = network.WLAN(network.STA_IF)
+        # Make sure wifi_station is not active (note: if no True/False given as an argument it will output current state)
+        # Make sure we are not connected to a wifi network
+        if wifi_station.active():
+            # Make sure we are not connected to a wifi network
+            if wifi_station.isconnected():
+                wifi_station.disconnect()
+                # give wifi time to disconnect
+                time.sleep_ms(250)
+            wifi_station.active(False)
+            # give wifi time to go down
+            time.sleep_ms(250)
+
+        wifi_station.active(True)
+        # give wifi time to come up
+        time.sleep_ms(250)
+
+        # how many attemps to connect to this network/ssid. will try # of times if good conection is lost NOTE: call them one at a time else jams up
+        wifi_station.config(hostname=device_settings_dictionary['unique_id'])
+        wifi_station.config(reconnects=5)
+
+        # NOTE: anoying you cannot unassign static values for ifconfig, you must reset device. rather try dhcp networks first.
+        # NOTE: if a ssid had a password and now does not the last 5 values are cashed. user must change the ssid for network on thier router/device! Gerrr.
+
+        bssid = None
+        # Scan wifi networks to get bssid with the highest signal, as wifi will connect to first random ssid/bssid even if it's not the best signal.
+        if ap_client_scan_raw:
+            ap_client_scan_sorted = sorted(ap_client_scan_raw, key=lambda x: -x[3])  # sorts by fourth element in wifi tuple (rssi) signal strength.
+            print('ap_client_scan_sorted: {0}'.format(ap_client_scan_sorted))
+
+            for ssid in ap_client_scan_sorted:
+                # noinspection PyUnresolvedReferences
+                individual_ssid = str(ssid[0].decode('UTF-8'))
+                print('individual_ssid: {0}'.format(individual_ssid))
+                if individual_ssid == known_wifi_dictionary['wifi_ssid']:
+                    bssid = ssid[1]
+                    print('bssid: {0}'.format(bssid))
+                    break
+
+        # make sure we are not connected
+        if not wifi_station.isconnected():
+            if 'wifi_password' not in known_wifi_dictionary:
+                wifi_station.connect(known_wifi_dictionary['wifi_ssid'], bssid=bssid)
+            else:
+                wifi_station.connect(known_wifi_dictionary['wifi_ssid'], known_wifi_dictionary['wifi_password'], bssid=bssid)
+
+            print('Trying to Connect to: {0}'.format(known_wifi_dictionary['wifi_ssid']))
+            # get status once connecting ended, connected, failed or timed out
+            status = wifi_connection_status(wifi_station_wait(wifi_station, Constant_wifi_connect_timeout_ms)[0])
+            if status == 'STAT_GOT_IP: connection successful':
+                html_wifi_connection_status = 'connection_successful'
+            # print(html_wifi_connection_status)
+            print(str(status))
+
+        # We have connected to the wifi, do stuff
+        if wifi_station.isconnected():
+            # get connection info
+            ifconfig = wifi_station.ifconfig()
+            ip_address_html = ifconfig[0]
+            subnet_mask_html = ifconfig[1]
+            gateway_server_html = ifconfig[2]
+            dns_server_html = ifconfig[3]
+            hostname_html = wifi_station.config('hostname')
+            ssid_html = wifi_station.config('ssid')
+            print('Connected to: {0}'.format(ssid_html))
+
+            data_out_dictionary = {
+                device_settings_dictionary['unique_id']: {
+                    "sensor": {
+                        "tempC": [tempC_internal_ap[0][1]],
+                        "tempC_by_sensor_id": dict([(ds18b20_result[0], [ds18b20_result[1]]) for ds18b20_result in tempC_internal_ap]),
+                        "record_data_interval_ms": 0,
+                        "send_data_interval_min": 0,
+                        "power_up_ms": tempC_internal_ready_ms_ap[0],
+                        "conversion_ms": tempC_internal_ready_ms_ap[1]
+                    },
+                    "battery": {
+                        "volts": batt_result_ap[0],
+                        "percentage": batt_result_ap[1]
+                    },
+                    "device": {
+                        "device": device_settings_dictionary['device'],
+                        "sensor_id": device_settings_dictionary['ds18b20_sn'],
+                        "sensor_ids": device_settings_dictionary['ds18b20_sn_list']
+                    }
+
+                }
+            }
+
+            data_out_json = json.dumps(data_out_dictionary)
+
+            # mqtt, the same client as a send
+            mqttc = mqtt_client(wifi_settings_dictionary, hostname_html)
+
+            while_loop_counter = 1
+            while True:
+                # noinspection PyBroadException
+                try:
+                    mqttc.connect(clean_session=True)
+                    topic_byte = ('noflippingswitches/sensor/' + hostname_html).encode()
+                    msg_byte = data_out_json.encode()
+                    mqttc.publish(topic_byte, msg_byte, retain=False, qos=1)
+                    mqttc.disconnect()
+                    html_mqtt_connection_status = 'mqtt_connection_successful'
+                    print('mqtt connection successful')
+                    break
+                except Exception as e:
+                    if while_loop_counter == 5:
+                        html_mqtt_connection_status = 'mqtt_unable_to_connect_check_mqtt_settings_or_internet_connection'
+                        break
+                    while_loop_counter += 1
+                    print('mqtt failed')
+
+        wifi_station.disconnect()
+        wifi_station.active(False)
+        # give wifi time to go down
+        time.sleep_ms(250)
+
+    # start up access point
+    # noinspection PyUnresolvedReferences
+    ap = network.WLAN(network.AP_IF)
+    # Make sure ap is not active (note: if no True/False given as an argument it will output current state)
+    # Make sure we are not connected to ap network
+    if ap.active():
+        ap.active(False)
+        # give ap time to go down
+        time.sleep_ms(250)
+    ap.active(True)
+    # give ap time to come up
+    time.sleep_ms(250)
+
+    # config ap
+    # use AUTH_WPA2_PSK for authmode. Note, AUTH_WPA_WPA2_PSK, WPA2 has been standard scence 2006! if users device cant handle it ... tooo bad! also apple does not like WPA1
+    # noinspection PyUnresolvedReferences
+    ap.config(channel=1, hidden=False, essid=wifi_settings_dictionary['access_point']['wifi_ssid'], authmode=network.AUTH_WPA2_PSK, password=wifi_settings_dictionary['access_point']['wifi_password'])
+    # print('essid:', ap.config('essid'))
+    # print("password: ", wifi_settings_dictionary['access_point']['wifi_password'])
+    # print('channel:', ap.config('channel'))
+    # print('hidden:', ap.config('hidden'))
+
+    while ap.active() is False:
+        pass
+
+    print('AP creation successful and Broadcasting')
+    print(ap.ifconfig())
+
+    placeholder = 'placeholder'
+
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)  # used if socket is soft reset.
+    s.bind(('', 80))
+    s.listen(1)
+    # s.settimeout(3)
+
+    first_tab_access_point_machine_reset = False
+    third_tab_access_point_machine_reset = False
+    while True:
+        try:
+            # set watchdog time, so it resets if server locks up
+            # also see about How to retry after exception? https://stackoverflow.com/questions/2083987/how-to-retry-after-exception
+            # also try new device as this one may be foobar! If that does not work then try a limited for loop
+
+            # noinspection PyTupleAssignmentBalance,PyNoneFunctionAssignment
+            connection, address = s.accept()
+            request = connection.recv(1024).decode('utf-8')
+            request_list = request.split(' ')  # Split request from spaces
+            # print('address: ', address)  # Client IP address
+            # print('client request list: ', request_list)
+
+            # Check if client has a language preff, if so set it
+            html_language_list = []  # default lang english
+            for i in range(len(request_list)):
+                # print(i, request_list[i])
+                if request_list[i].find('Accept-Language') != -1:
+                    clean_returns_off_languages_header = request_list[i + 1].splitlines()[0]
+                    # print('clean_returns_off_languages_header:', clean_returns_off_languages_header)
+                    languages = clean_returns_off_languages_header.split(",")
+                    # print('languages: ', languages)
+                    locale_q_pairs = []
+                    for language in languages:
+                        if language.split(";")[0] == language:
+                            # no q => q = 1
+                            locale_q_pairs.append((language.strip(), "1"))
+                        else:
+                            locale = language.split(";")[0].strip()
+                            q = language.split(";")[1].split("=")[1]
+                            locale_q_pairs.append((locale, q))
+
+                    # Sort by second element of tuple
+                    def by_second_elem_off_tuple(elem):
+                        return float(elem[1])
+
+
+                    locale_q_pairs.sort(key=by_second_elem_off_tuple, reverse=True)
+                    # print(locale_q_pairs)
+
+                    for the_tuple in locale_q_pairs:
+                        if the_tuple[0][0:2] not in html_language_list:
+                            html_language_list.append(the_tuple[0][0:2])
+                    # print('language_list:', html_language_list)
+
+            language_dictionary_html = {}
+            language_html_code = 'en'
+            if html_language_list:
+                for language in html_language_list:
+                    # translations path
+                    path = '/lang/html/language_{0}.json'.format(language)
+                    language_html_code = language
+                    print('set language_html_code to:', language_html_code)
+                    try:
+                        # load translation
+                        language_dictionary_html = json_to_dictionary(path)
+                        # print('Loaded language_dictionary_html: {0}'.format(path))
+                        break
+                    except Exception as e:
+                        print(' ')
+                        print('Error: {0}'.format(e))
+                        print('Unable to load language_dictionary_html: {0}'.format(path))
+            else:
+                # translations path
+                path = '/lang/html/language_en.json'
+                try:
+                    # load translation
+                    language_dictionary_html = json_to_dictionary(path)
+                    # print('Loaded language_dictionary_html: {0}'.format(path))
+                except Exception as e:
+                    print(' ')
+                    print('Error: {0}'.format(e))
+                    print('Unable to load language_dictionary_html: {0}'.format(path))
+
+            param_request_dictionary = {}
+            if language_dictionary_html:
+                get_request_list = request_list[1].split('?')
+                # print('get request list: ', get_request_list)
+
+                file_request = get_request_list[0].lstrip('/')
+                # print('file request: ', file_request)
+
+                if request_list[1].find('=') != -1:
+                    split_param_requests = get_request_list[1].split("&")
+                    for i in split_param_requests:
+                        key, value = i.split("=")
+                        # assigning keys with values
+                        param_request_dictionary[key] = value
+
+                # print('param_request_dictionary: ', param_request_dictionary)
+
+                # what to send client based on request
+                if file_request == '' or file_request == 'wifi-static' or file_request == 'wifi-dhcp' or file_request == 'wifi-scan' or file_request == 'wifi-apply' or file_request == 'sensor-apply' or file_request == 'test-connection':
+                    header = 'HTTP/1.1 200 OK\nContent-Type: text/html\nConnection: close\n\n'
+
+                    # set Meta Refresh empty
+                    meta_refresh = ''
+
+                    # -=[ first-tab, WiFi }=-
+                    # format found/scanned for networks
+                    found_networks_html = ''
+
+                    if 'ssid' in param_request_dictionary:
+                        # header = 'HTTP/1.1 303 See Other\nLocation: /#first-tab\nContent-Type: text/html\nConnection: close\n\n'
+                        meta_refresh = '<meta http-equiv="refresh" content="0; url=/#first-tab"/>'
+
+                        if 'ipaddress' in param_request_dictionary:
+                            known_wifi_set_first(wifi_settings_dictionary, {
+                                "wifi_ssid": param_request_dictionary['ssid'],
+                                "wifi_password": param_request_dictionary['password'],
+                                "ip_address": param_request_dictionary['ipaddress'],
+                                "subnet_mask": param_request_dictionary['subnetmask'],
+                                "gateway_server": param_request_dictionary['gateway'],
+                                "dns_server": param_request_dictionary['dns']
+                            })
+                        else:
+                            if 'password' in param_request_dictionary:
+                                if param_request_dictionary['password'] == '':
+                                    known_wifi_set_first(wifi_settings_dictionary, {
+                                        "wifi_ssid": param_request_dictionary['ssid']
+                                    })
+                                else:
+                                    known_wifi_set_first(wifi_settings_dictionary, {
+                                        "wifi_ssid": param_request_dictionary['ssid'],
+                                        "wifi_password": param_request_dictionary['password']
+                                    })
+                            else:
+                                known_wifi_set_first(wifi_settings_dictionary, {
+                                    "wifi_ssid": param_request_dictionary['ssid']
+                                })
+
+                        dictionary_to_json(wifi_settings_dictionary, 'wifi_settings.json')
+                        print('Updated wifi_settings.json')
+                        print('{0}'.format(wifi_settings_dictionary))
+
+                    if 'scan' in param_request_dictionary or first_tab_access_point_machine_reset:
+                        if first_tab_access_point_machine_reset:
+                            meta_refresh = '<meta http-equiv="refresh" content="30; url=/#first-tab"/>'
+                        else:
+                            # header = 'HTTP/1.1 303 See Other\nLocation: /#first-tab\nContent-Type: text/html\nConnection: close\n\n'
+                            meta_refresh = '<meta http-equiv="refresh" content="0; url=/#first-tab"/>'
+
+                        found_networks_html += '{0}&#13;&#10;{1}&#13;&#10;{2}%&#13;&#10;{3}&#13;&#10;{4}&#13;&#10;'.format(
+                            language_dictionary_html["Disconnecting_WiFi_access_point"],  # {0}
+                            language_dictionary_html["Scanning_WiFi_networks"],  # {1}
+                            language_dictionary_html["Webpage_will_automatically_refresh"],  # {2}
+                            language_dictionary_html["Please_wait_x_seconds"],  # {3}
+                            language_dictionary_html["You_may_have_to_reconnect_to_the_WiFi"],  # {4}
+                        )
+
+                    elif ap_client_scan:
+                        for i in range(len(ap_client_scan)):
+                            # print(i, ap_client_scan[1][i])
+                            if ap_client_scan[i][3] < -90:
+                                signal_quality = 0
+                            elif ap_client_scan[i][3] > -40:
+                                signal_quality = 100
+                            else:
+                                signal_quality = 2 * (ap_client_scan[i][3] + 90)
+
+                            found_networks_html += '{6}: {0}&#13;&#10;{7}: {1}&#13;&#10;{8}: {2}%&#13;&#10;{9}: {3}dBm&#13;&#10;{10}: {4}&#13;&#10;{11}: {5}&#13;&#10;&#13;&#10;'.format(
+                                ap_client_scan[i][0],  # {0} SSID
+                                ap_client_scan[i][1],  # {1} BSSID
+                                signal_quality,  # {2} Signal Quality
+                                ap_client_scan[i][3],  # {3} RSSI
+                                ap_client_scan[i][2],  # {4} Channel
+                                ap_client_scan[i][4],  # {5} Security
+                                language_dictionary_html["SSID_Network_Name"],  # {6}
+                                'BSSID',  # {7}
+                                language_dictionary_html["Signal_Quality"],  # {8}
+                                'RSSI',  # {9}
+                                language_dictionary_html["Channel"],  # {10}
+                                language_dictionary_html["Security"],  # {11}
+                            )
+
+                    # when hover over DHCP / Static (Order of if statments matter!)
+                    known_wifi_dictionary = known_wifi_first(wifi_settings_dictionary)
+                    style_content = 'Static'  # default DHCP --> Static
+
+                    if 'wifi_ssid' in known_wifi_dictionary:
+                        ssid_html_input_vlaue = '<input type="text" name="ssid" value="{0}" required>'.format(known_wifi_dictionary['wifi_ssid'])
+                        if 'wifi_password' not in known_wifi_dictionary:
+                            password_html_input_vlaue = '<input type="password" name="password" placeholder="{0} *">'.format(language_dictionary_html["Password"])
+                        else:
+                            password_html_input_vlaue = '<input type="password" name="password" value="{0}">'.format(known_wifi_dictionary['wifi_password'])
+
+                    else:
+                        ssid_html_input_vlaue = '<input type="text" name="ssid" placeholder="{0} *" required>'.format(language_dictionary_html["SSID_Network_Name"])
+                        password_html_input_vlaue = '<input type="password" name="password" placeholder="{0} *">'.format(language_dictionary_html["Password"])
+
+                    html_content_wifi = '<form action="/#first-tab" method="GET"><legend><input type="hidden"/><button class="dhcpButton" formaction="/wifi-static#first-tab"><span>{0}</span></button></legend></form><form action="/wifi-apply#first-tab" method="GET">{1}{2}'.format(
+                        language_dictionary_html["DHCP"],  # {0}
+                        ssid_html_input_vlaue,  # {1}
+                        password_html_input_vlaue  # {2}
+                    )
+                    if file_request == 'wifi-static' or (file_request != 'wifi-dhcp' and 'ip_address' in known_wifi_dictionary):
+                        style_content = 'DHCP'
+
+                        if 'ip_address' in known_wifi_dictionary:
+                            ip_address_html_input_vlaue = '<input type="text" name="ipaddress" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" value="{0}" required>'.format(known_wifi_dictionary['ip_address'])
+                            subnetmask_html_input_vlaue = '<input type="text" name="subnetmask" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" value="{0}" required>'.format(known_wifi_dictionary['subnet_mask'])
+                            gateway_html_input_vlaue = '<input type="text" name="gateway" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" value="{0}" required>'.format(known_wifi_dictionary['gateway_server'])
+                            dns_html_input_vlaue = '<input type="text" name="dns" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" value="{0}" required>'.format(known_wifi_dictionary['dns_server'])
+
+                        else:
+                            ip_address_html_input_vlaue = '<input type="text" name="ipaddress" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" placeholder="{0}: xxx.xxx.xxx.xxx" required>'.format(language_dictionary_html["IP_Address"])
+                            subnetmask_html_input_vlaue = '<input type="text" name="subnetmask" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" placeholder="{0}: xxx.xxx.xxx.xxx" required>'.format(language_dictionary_html["Subnet_Mask"])
+                            gateway_html_input_vlaue = '<input type="text" name="gateway" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" placeholder="{0}: xxx.xxx.xxx.xxx" required>'.format(language_dictionary_html["Gateway"])
+                            dns_html_input_vlaue = '<input type="text" name="dns" minlength="7" maxlength="15" pattern="^((\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])\\.){{3}}(\\d{{1,2}}|1\\d\\d|2[0-4]\\d|25[0-5])$" placeholder="{0}: xxx.xxx.xxx.xxx" required>'.format(language_dictionary_html["DNS_Server"])
+
+                        html_content_wifi = '<form action="/#first-tab" method="GET"><legend><input type="hidden"/><button class="dhcpButton" formaction="/wifi-dhcp#first-tab"><span>{0}</span></button></legend></form><form action="/wifi-apply#first-tab" method="GET">{5}{6}{1}{2}{3}{4}'.format(
+                            language_dictionary_html["Static"],  # {0}
+                            ip_address_html_input_vlaue,  # {1}
+                            subnetmask_html_input_vlaue,  # {2}
+                            gateway_html_input_vlaue,  # {3}
+                            dns_html_input_vlaue,  # {4}
+                            ssid_html_input_vlaue,  # {5}
+                            password_html_input_vlaue  # {6}
+                        )
+
+                    # -=[ second-tab, Sensor }=-
+                    # get/format sensor information for html
+                    tempC_internal_ap, tempC_internal_ready_ms_ap = ds18b20(device_settings_dictionary["ds18b20_sn_list"], wifi_settings_dictionary["ds18b20_resolution"])
+                    sensor_info_html = ''
+                    for ds18b20_result in tempC_internal_ap:
+                        sensor_info_html += '{2} °C: {0}&#13;&#10;ID: {1}&#13;&#10;'.format(
+                            ds18b20_result[1],
+                            ds18b20_result[0],
+                            language_dictionary_html["Tempature"]
+                        )
+                    sensor_info_html += '{2} V: {0}&#13;&#10;{2} %: {1}&#13;&#10;ready ms: {3} / {4}&#13;&#10;'.format(
+                        batt_result_ap[0],
+                        batt_result_ap[1],
+                        language_dictionary_html["Battery"],
+                        tempC_internal_ready_ms_ap[0],  # power up
+                        tempC_internal_ready_ms_ap[1]  # conversion
+                    )
+                    # rows of readings that surely fit in rtc memory (max 2048 bytes), the send interval is capped to this many readings
+                    series_capacity_rows_ap = rtc_series_capacity_rows(len(device_settings_dictionary['ds18b20_sn_list']) or 1)
+                    sensor_info_html += 'max readings per send: {0}&#13;&#10;'.format(series_capacity_rows_ap)
+
+                    if 'refresh_second_tab' in param_request_dictionary:
+                        # header = 'HTTP/1.1 303 See Other\nLocation: /#second-tab\nContent-Type: text/html\nConnection: close\n\n'
+                        meta_refresh = '<meta http-equiv="refresh" content="0; url=/#second-tab"/>'
+
+                    if 'record_every_int' in param_request_dictionary:
+                        # header = 'HTTP/1.1 303 See Other\nLocation: /#first-tab\nContent-Type: text/html\nConnection: close\n\n'
+                        meta_refresh = '<meta http-equiv="refresh" content="0; url=/#second-tab"/>'
+
+                        if param_request_dictionary['record_every_min_hr'] == 'hours':
+                            record_data_interval = 60 * int(param_request_dictionary['record_every_int'])
+                        else:
+                            record_data_interval = int(param_request_dictionary['record_every_int'])
+                        # protect deepsleep from overflow
+                        if record_data_interval > 525600:
+                            record_data_interval = 525600
+
+                        if param_request_dictionary['send_every_min_hr'] == 'hours':
+                            send_data_interval = 60 * int(param_request_dictionary['send_every_int'])
+                        else:
+                            send_data_interval = int(param_request_dictionary['send_every_int'])
+                        # protect deepsleep from overflow
+                        if record_data_interval > 525600:
+                            record_data_interval = 525600
+
+                        interval_list_length = int(send_data_interval / record_data_interval)
+                        if interval_list_length <= 1:
+                            interval_list_length = 0
+                            send_data_interval = record_data_interval
+                            wifi_settings_dictionary['record_data_interval_ms'] = record_data_interval * 60000  # 60000ms in a minute
+                            wifi_settings_dictionary['send_data_interval_list_length'] = interval_list_length
+                            wifi_settings_dictionary['send_data_interval_min'] = send_data_interval
+
+                        else:
+                            # rows of readings that surely fit in rtc memory (max 2048 bytes), most readings take 1 byte per sensor
+                            if interval_list_length <= series_capacity_rows_ap:
+                                wifi_settings_dictionary['record_data_interval_ms'] = record_data_interval * 60000  # 60000ms in a minute
+                                wifi_settings_dictionary['send_data_interval_list_length'] = interval_list_length
+                                wifi_settings_dictionary['send_data_interval_min'] = send_data_interval
+                            else:
+                                interval_list_length = series_capacity_rows_ap
+                                send_data_interval = int(record_data_interval * interval_list_length)
+                                print('Send interval lowered to {0} min, rtc memory holds {1} readings'.format(send_data_interval, interval_list_length))
+                                wifi_settings_dictionary['record_data_interval_ms'] = record_data_interval * 60000  # 60000ms in a minute
+                                wifi_settings_dictionary['send_data_interval_list_length'] = interval_list_length
+                                wifi_settings_dictionary['send_data_interval_min'] = send_data_interval
+
+                        # report by exception, deadband 0 is off. Empty alarm is no alarm
+                        try:
+                            if 'deadband' in param_request_dictionary:
+                                wifi_settings_dictionary['deadband_c'] = min(max(float(param_request_dictionary['deadband']), 0), 100)
+                            for alarm_param, alarm_setting in (('alarm_low', 'alarm_low_c'), ('alarm_high', 'alarm_high_c')):
+                                if alarm_param in param_request_dictionary:
+                                    wifi_settings_dictionary[alarm_setting] = min(max(float(param_request_dictionary[alarm_param]), -55), 125) if param_request_dictionary[alarm_param] != '' else None
+                            if 'heartbeat_hours' in param_request_dictionary:
+                                wifi_settings_dictionary['heartbeat_min'] = min(max(int(param_request_dictionary['heartbeat_hours']), 1), 8760) * 60
+                            # adaptive sampling, min 0 is off
+                            if 'adaptive_min' in param_request_dictionary and 'adaptive_max' in param_request_dictionary:
+                                wifi_settings_dictionary['adaptive_min_ms'] = min(max(int(param_request_dictionary['adaptive_min']), 0), 525600) * 60000
+                                wifi_settings_dictionary['adaptive_max_ms'] = min(max(int(param_request_dictionary['adaptive_max']), 1), 525600) * 60000
+                        except ValueError as e:
+                            print('Error: {0}'.format(e))
+
+                        # resolution of the ds18b20(s), lower resolution means a shorter conversion and less time awake
+                        if 'resolution' in param_request_dictionary and int(param_request_dictionary['resolution']) in Constant_ds18b20_conversion_time_ms:
+                            if int(param_request_dictionary['resolution']) != wifi_settings_dictionary['ds18b20_resolution']:
+                                wifi_settings_dictionary['ds18b20_resolution'] = int(param_request_dictionary['resolution'])
+                                # write the configuration register once, it is kept in the sensors eeprom
+                                ds18b20_apply_resolution(device_settings_dictionary['ds18b20_sn_list'], wifi_settings_dictionary['ds18b20_resolution'])
+
+                        dictionary_to_json(wifi_settings_dictionary, 'wifi_settings.json')
+                        print('Updated wifi_settings.json')
+                        print('{0}'.format(wifi_settings_dictionary))
+
+                    # resolution options, degrees C per step for each resolution
+                    resolution_options_html = ''
+                    for ds18b20_resolution, ds18b20_resolution_step in ((9, '0.5'), (10, '0.25'), (11, '0.125'), (12, '0.0625')):
+                        if ds18b20_resolution == wifi_settings_dictionary['ds18b20_resolution']:
+                            resolution_options_html += '<option value="{0}" selected>{0} bit, {1} °C</option>'.format(ds18b20_resolution, ds18b20_resolution_step)
+                        else:
+                            resolution_options_html += '<option value="{0}">{0} bit, {1} °C</option>'.format(ds18b20_resolution, ds18b20_resolution_step)
+
+                    # -=[ third-tab, Data }=-
+                    if wifi_settings_dictionary['mqtt_url'] == 'noflippingswitches.com' or wifi_settings_dictionary['mqtt_url'] == 'no-fs.com':
+                        html_content_data_extra_settings = ''
+                    else:
+                        html_content_data_extra_settings = '<label for="mqtt_user_name" style="font-size:16px">{0}: <input type="text" id="mqtt_user_name" name="mqtt_user_name" value="{1}"></label><label for="mqtt_password" style="font-size:16px">{2}: <input type="password" id="mqtt_password" name="mqtt_password" value="{3}"></label><label for="mqtt_port_number" style="font-size:16px">{4}: <input type="number" id="mqtt_port_number" name="mqtt_port_number" value="{5}" min="1" max="65535"></label>'.format(
+                            language_dictionary_html['user_name'],  # {0}
+                            wifi_settings_dictionary['mqtt_username'],  # {1}
+                            language_dictionary_html['Password'],  # {2}
+                            wifi_settings_dictionary['mqtt_password'],  # {3}
+                            language_dictionary_html['port_number'],  # {4}
+                            wifi_settings_dictionary['mqtt_port']  # {5}
+                        )
+
+                        if wifi_settings_dictionary['mqtt_ssl']:
+                            html_content_data_extra_settings += '<label for="ssl" style="font-size:16px">SSL: <input type="checkbox" id="ssl" name="ssl" value="True" checked></label>'
+                        else:
+                            html_content_data_extra_settings += '<label for="ssl" style="font-size:16px">SSL: <input type="checkbox" id="ssl" name="ssl" value="True"></label>'
+
+                    # format output for html_content_data
+                    html_content_data = '{0}'.format(language_dictionary_html['failed_incorrect_password_out_of_range_or_unreachable'])
+
+                    if html_wifi_connection_status == 'connection_successful':
+                        html_content_data = '{12}&#13;&#10;{0}: {1}&#13;&#10;{2}: {3}&#13;&#10;{4}: {5}&#13;&#10;{6}: {7}&#13;&#10;{8}: {9}&#13;&#10;{10}: {11}&#13;&#10;'.format(
+                            language_dictionary_html['hostname'],  # {0}
+                            hostname_html,  # {1}
+                            language_dictionary_html['SSID_Network_Name'],  # {2}
+                            ssid_html,  # {3}
+                            language_dictionary_html['IP_Address'],  # {4}
+                            ip_address_html,  # {5}
+                            language_dictionary_html['Subnet_Mask'],  # {6}
+                            subnet_mask_html,  # {7}
+                            language_dictionary_html['Gateway'],  # {8}
+                            gateway_server_html,  # {9}
+                            language_dictionary_html['DNS_Server'],  # {10}
+                            dns_server_html,  # {11},
+                            language_dictionary_html['connection_successful']  # {12}
+                        )
+                        if html_mqtt_connection_status == 'mqtt_unable_to_connect_check_mqtt_settings_or_internet_connection':
+                            html_content_data += '&#13;&#10;{0}'.format(language_dictionary_html['mqtt_unable_to_connect_check_mqtt_settings_or_internet_connection'])
+                        if html_mqtt_connection_status == 'mqtt_connection_successful':
+                            html_content_data += '&#13;&#10;{3}&#13;&#10;{0}: {1}&#13;&#10;{2}'.format(
+                                language_dictionary_html['mqtt_server'],  # {0}
+                                wifi_settings_dictionary['mqtt_url'],  # {1}
+                                language_dictionary_html['data_sent'],  # {2}
+                                language_dictionary_html['mqtt_connection_successful']  # {3}
+                            )
+
+                    if 'refresh_third_tab' in param_request_dictionary or third_tab_access_point_machine_reset:
+                        if third_tab_access_point_machine_reset:
+                            meta_refresh = '<meta http-equiv="refresh" content="30; url=/#third-tab"/>'
+                        else:
+                            # header = 'HTTP/1.1 303 See Other\nLocation: /#third-tab\nContent-Type: text/html\nConnection: close\n\n'
+                            meta_refresh = '<meta http-equiv="refresh" content="0; url=/#third-tab"/>'
+
+                            if 'mqtt_address' in param_request_dictionary:
+                                wifi_settings_dictionary['mqtt_url'] = param_request_dictionary['mqtt_address']
+                            if 'mqtt_user_name' in param_request_dictionary:
+                                wifi_settings_dictionary['mqtt_username'] = param_request_dictionary['mqtt_user_name']
+                            if 'mqtt_password' in param_request_dictionary:
+                                wifi_settings_dictionary['mqtt_password'] = param_request_dictionary['mqtt_password']
+                            if 'mqtt_port_number' in param_request_dictionary:
+                                wifi_settings_dictionary['mqtt_port'] = param_request_dictionary['mqtt_port_number']
+
+                            if 'ssl' not in param_request_dictionary:
+                                wifi_settings_dictionary['mqtt_ssl'] = False
+                            else:
+                                wifi_settings_dictionary['mqtt_ssl'] = True
+
+                            dictionary_to_json(wifi_settings_dictionary, 'wifi_settings.json')
+                            print('Updated wifi_settings.json')
+                            print('{0}'.format(wifi_settings_dictionary))
+
+                        html_content_data = '{0}&#13;&#10;{1}&#13;&#10;{2}&#13;&#10;{3}&#13;&#10;'.format(
+                            language_dictionary_html["Disconnecting_WiFi_access_point"],  # {0}
+                            language_dictionary_html["Webpage_will_automatically_refresh"],  # {1}
+                            language_dictionary_html["Please_wait_x_seconds"],  # {2}
+                            language_dictionary_html["You_may_have_to_reconnect_to_the_WiFi"],  # {3}
+                        )
+
+                    # START CREATION OF HTML FOR SITE
+                    html_start = '<!DOCTYPE html>'
+                    html_lang = '<html lang={0}>'.format(language_html_code)
+                    html_head_start = '<head><meta http-equiv="Content-Type" content="text/html; charset=utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1">{0}<link rel="icon" type="image/svg" href="data:image/svg+xml;base64,PD94bWwgdmVyc2lvbj0iMS4wIj8+IDxzdmcgd2lkdGg9IjUwMCIgaGVpZ2h0PSI1MDAiIHZpZXdCb3g9IjAgMCA1MDAgNTAwIiB4bWxucz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciIHhtbG5zOnN2Zz0iaHR0cDovL3d3dy53My5vcmcvMjAwMC9zdmciPiA8IS0tIENyZWF0ZWQgd2l0aCBTVkctZWRpdCAtIGh0dHBzOi8vZ2l0aHViLmNvbS9TVkctRWRpdC9zdmdlZGl0LS0+IDxnIGNsYXNzPSJsYXllciI+IDx0aXRsZT5MYXllciAxPC90aXRsZT4gPHRleHQgZmlsbD0iIzAwMDAwMCIgZm9udC1mYW1pbHk9IlNlcmlmIiBmb250LXNpemU9IjMwMCIgaWQ9InN2Z18yIiBzdHJva2U9IiMwMDAwMDAiIHN0cm9rZS13aWR0aD0iMCIgdGV4dC1hbmNob3I9Im1pZGRsZSIgeD0iMTIxLjQiIHhtbDpzcGFjZT0icHJlc2VydmUiIHk9IjIyNS44Ij5OPC90ZXh0PiA8dGV4dCBmaWxsPSIjMDAwMDAwIiBmb250LWZhbWlseT0iU2VyaWYiIGZvbnQtc2l6ZT0iMzAwIiBpZD0ic3ZnXzMiIHN0cm9rZT0iIzAwMDAwMCIgc3Ryb2tlLXdpZHRoPSIwIiB0ZXh0LWFuY2hvcj0ibWlkZGxlIiB4PSIzMDIuNCIgeG1sOnNwYWNlPSJwcmVzZXJ2ZSIgeT0iMzQ2LjgiPkY8L3RleHQ+IDx0ZXh0IGZpbGw9IiMwMDAwMDAiIGZvbnQtZmFtaWx5PSJTZXJpZiIgZm9udC1zaXplPSIzMDAiIGlkPSJzdmdfNCIgc3Ryb2tlPSIjMDAwMDAwIiBzdHJva2Utd2lkdGg9IjAiIHRleHQtYW5jaG9yPSJtaWRkbGUiIHRyYW5zZm9ybT0ibWF0cml4KDEgMCAwIDEgMCAwKSIgeD0iNDEwLjQiIHhtbDpzcGFjZT0icHJlc2VydmUiIHk9IjQ4OC44Ij5TPC90ZXh0PiA8L2c+IDwvc3ZnPg=="><title>NFS</title><meta name="noflippingswitches" content="NFS">'.format(meta_refresh)
+                    html_static_style = 'body {background: #CDDC39;font-family: Verdana, Arial, Helvetica, Tahoma, sans-serif;}.tab {display: none;}.tab:target {display: block;}.tab:last-child {display: block;}.tab:target~section.tab:last-child {display: none;}.tab>nav>a.active {background: #fffffff6;color: #000;}main .tab {width: 100%;max-width: 500px;}main {width: 100%;max-width: 500px;margin: 0 auto;padding: 50px 0;}.tab>* {width: 100%;padding-top: 10px;margin: 0;}.tab>nav {padding: 0;display: flex;justify-content: center;gap: 5px;}.tab>nav>a {cursor: pointer;padding: 13px 25px;margin: 0px 2px;background: #000;display: inline-block;color: #fff;border-top: 3px solid #000;border-radius: 3px 3px 0px 0px;text-decoration: none;}.tab-box {padding: 5px;background: #fff;box-shadow: 0 2rem 2rem #00000080;animation: fadein 2s;border-radius: 5px;}.tab-box img {width: 100%;height: 100%;}@keyframes fadein {from {opacity: 0;}to {opacity: 1;}}.form-style-5{max-width: 500px;background: #f4f7f8;padding: 20px;border-radius: 5px;}.form-style-5 fieldset{border: none;}.form-style-5 legend {font-size: 1.4em;margin-bottom: 10px;}.form-style-5 label {display: block;margin-bottom: 8px;}.form-style-5 input[type="text"], .form-style-5 input[type="date"], .form-style-5 input[type="datetime"], .form-style-5 input[type="email"], .form-style-5 input[type="number"], .form-style-5 input[type="search"], .form-style-5 input[type="time"], .form-style-5 input[type="url"], .form-style-5 input[type="password"], .form-style-5 textarea, .form-style-5 select {border: none;border-radius: 4px;font-size: 15px;margin: 0;outline: 0;padding: 10px;width: 100%;box-sizing: border-box;-webkit-box-sizing: border-box;-moz-box-sizing: border-box;background-color: #e8eeef;color:#8a97a0;-webkit-box-shadow: 0 1px 0 rgba(0,0,0,0.03) inset;-moz-box-shadow: 0 1px 0 rgba(0,0,0,0.03) inset;box-shadow: 0 1px 0 rgba(0,0,0,0.03) inset;margin-bottom: 30px;}.form-style-5 input[type="text"]:focus, .form-style-5 input[type="date"]:focus, .form-style-5 input[type="datetime"]:focus, .form-style-5 input[type="email"]:focus, .form-style-5 input[type="number"]:focus, .form-style-5 input[type="search"]:focus, .form-style-5 input[type="time"]:focus, .form-style-5 input[type="url"]:focus, .form-style-5 input[type="password"]:focus, .form-style-5 textarea:focus, .form-style-5 select:focus{background: #d2d9dd;}.form-style-5 select{-webkit-appearance: menulist-button;-moz-appearance: menulist-button;height:35px;}.form-style-5 .section_titles {background: #1abc9c;color: #fff;height: 30px;display: inline-block;font-size: 0.8em;margin-right: 4px;line-height: 30px;text-align: center;text-shadow: 0 1px 0 rgba(255,255,255,0.2);border-radius: 5px 5px 5px 5px;}.form-style-5 input[type="submit"], .form-style-5 input[type="button"] {position: relative;display: block;padding: 19px 39px 18px 39px;color: #FFF;margin: 0 auto;background: #DC9A39;font-size: 18px;text-align: center;font-style: normal;width: 100%;margin-bottom: 10px;border: none;border-radius: 5px 5px 5px 5px;}.form-style-5 input[type="submit"]:hover, .form-style-5 input[type="button"]:hover {background: #ba8536;}'
+                    html_style = '<style>.scanButton{{font-size: 18px; border: none; text-align: center; background: #DC9A39; color: #fff; height: 30px; width: 110px; display: inline-block; margin-right: 4px; line-height: 0px; text-align: center; text-shadow: 0 1px 0 rgba(255,255,255,0.2); border-radius: 5px 5px 5px 5px;}}.scanButton:hover span {{display:none;}}.scanButton:hover:before {{content:"{0}";}}.scanButton:hover {{background-color: #ba8536;}}.dhcpButton {{font-size: 18px; border: none; text-align: center; background: #DC9A39; color: #fff; height: 30px; width: 80px; display: inline-block; margin-right: 4px; line-height: 0px; text-align: center; text-shadow: 0 1px 0 rgba(255,255,255,0.2); border-radius: 5px 5px 5px 5px;}}.dhcpButton:hover span {{display:none;}}.dhcpButton:hover:before {{content:"{1}";}} .dhcpButton:hover {{background-color: #ba8536;}}{2}</style>'.format(
+                        language_dictionary_html["Scan"],
+                        language_dictionary_html[style_content],
+                        html_static_style
+                    )
+                    html_head_end = '</head>'
+                    html_body = '<body><main><section class="tab" id="third-tab"><nav><a href="#first-tab">{0}</a><a href="#second-tab">{1}</a><a href="#third-tab" class="active">{2}</a></nav><div class="tab-box"><div class="form-style-5"><form action="/test-connection#third-tab" method="GET"><fieldset><input type="hidden" name="refresh_third_tab" value="True"/><textarea rows="4" style="white-space: pre; overflow: scroll; resize: vertical;" wrap="off" name="test_connection_output" disabled>{15}</textarea><br><br><label for="mqtt_address" style="font-size:20px">MQTT URL/IP:</label><input type="text" id="mqtt_address" name="mqtt_address" minlength="1" maxlength="2048" value="{17}" required>{18}<br><br><input type="submit" value="{16}" /></fieldset></form></div></div></section><section class="tab" id="second-tab"><nav><a href="#first-tab">{0}</a><a href="#second-tab" class="active">{1}</a><a href="#third-tab">{2}</a></nav><div class="tab-box"><div class="form-style-5"><form action="/#second-tab" method="GET"><fieldset><legend><input type="hidden" name="refresh_second_tab" value="True"/><button class="scanButton"><span>{1}</span></button></legend><textarea rows="4" style="white-space: pre; overflow: scroll; resize: vertical; width: 100%;" wrap="off" name="scanned_sensors" disabled>{8}</textarea></form><form action="/sensor-apply#second-tab" method="GET"><label for="take_reading" style="font-size:20px">{9}:</label><input type="number" min="0" max="525600" name="record_every_int" style="width:135px;text-align:right;direction: rtl;height:38px;"value="{13}" required><select id="take_reading" name="record_every_min_hr" style="width:120px;text-align:left;height:38px;"><option value="minutes">{11}</option><option value="hours">{12}</option></select><br><label for="send_reading" style="font-size:20px">{10}:</label><input type="number" min="0" max="525600" name="send_every_int" style="width:135px;text-align:right;direction: rtl;height:38px;" value="{14}" required><select id="send_reading" name="send_every_min_hr" style="width:120px;text-align:left;height:38px;"><option value="minutes">{11}</option><option value="hours">{12}</option></select><br><label for="resolution" style="font-size:20px">{19}:</label><select id="resolution" name="resolution" style="width:255px;text-align:left;height:38px;">{20}</select><br><label for="deadband" style="font-size:20px">{21}:</label><input type="number" id="deadband" name="deadband" min="0" max="100" step="0.01" style="width:255px;text-align:right;height:38px;" value="{22}"><br><label for="alarm_low" style="font-size:20px">{23}:</label><input type="number" id="alarm_low" name="alarm_low" min="-55" max="125" step="0.1" style="width:255px;text-align:right;height:38px;" value="{24}"><br><label for="alarm_high" style="font-size:20px">{25}:</label><input type="number" id="alarm_high" name="alarm_high" min="-55" max="125" step="0.1" style="width:255px;text-align:right;height:38px;" value="{26}"><br><label for="heartbeat_hours" style="font-size:20px">{27}:</label><input type="number" id="heartbeat_hours" name="heartbeat_hours" min="1" max="8760" style="width:255px;text-align:right;height:38px;" value="{28}"><br><label for="adaptive_min" style="font-size:20px">{29}:</label><input type="number" id="adaptive_min" name="adaptive_min" min="0" max="525600" style="width:255px;text-align:right;height:38px;" value="{30}"><br><label for="adaptive_max" style="font-size:20px">{31}:</label><input type="number" id="adaptive_max" name="adaptive_max" min="1" max="525600" style="width:255px;text-align:right;height:38px;" value="{32}"><br><br><input type="submit" value="{6}" /></fieldset></form></div></div></section><section class="tab" id="first-tab"><nav><a href="#first-tab" class="active">{0}</a><a href="#second-tab">{1}</a><a href="#third-tab">{2}</a></nav><div class="tab-box"><div class="form-style-5"><form action="/{7}#first-tab" method="GET"><fieldset><legend><input type="hidden" name="scan" value="True"/><button class="scanButton"><span>{3}</span></button></legend><textarea rows="4" style="white-space: pre; overflow: scroll; resize: vertical;" wrap="off" name="scanned_networks" disabled>{4}</textarea></form>{5}<br><br><input type="submit" value="{6}" /></fieldset></form></div></div></section></main></body>'.format(
+                        language_dictionary_html["WiFi"],  # {0}
+                        language_dictionary_html["Sensor"],  # {1}
+                        language_dictionary_html["Data"],  # {2}
+                        language_dictionary_html["Network"],  # {3}
+                        found_networks_html,  # {4}
+                        html_content_wifi,  # {5}
+                        language_dictionary_html["Apply"],  # {6}
+                        file_request,   # {7}
+                        sensor_info_html,  # {8}
+                        language_dictionary_html["Take_Reading_Every"],  # {9}
+                        language_dictionary_html["Send_Readings_Every"],  # {10}
+                        language_dictionary_html["Minutes"],  # {11}
+                        language_dictionary_html["Hours"],  # {12}
+                        int(wifi_settings_dictionary['record_data_interval_ms'] / 60000),  # {13}
+                        wifi_settings_dictionary['send_data_interval_min'],  # {14}
+                        html_content_data,  # {15}
+                        language_dictionary_html["Test_Connection"],  # {16}
+                        wifi_settings_dictionary['mqtt_url'],  # {17}
+                        html_content_data_extra_settings,  # {18}
+                        language_dictionary_html["Resolution"],  # {19}
+                        resolution_options_html,  # {20}
+                        language_dictionary_html["Deadband"],  # {21}
+                        wifi_settings_dictionary['deadband_c'],  # {22}
+                        language_dictionary_html["Alarm_Low"],  # {23}
+                        '' if wifi_settings_dictionary['alarm_low_c'] is None else wifi_settings_dictionary['alarm_low_c'],  # {24}
+                        language_dictionary_html["Alarm_High"],  # {25}
+                        '' if wifi_settings_dictionary['alarm_high_c'] is None else wifi_settings_dictionary['alarm_high_c'],  # {26}
+                        language_dictionary_html["Heartbeat_Hours"],  # {27}
+                        int(wifi_settings_dictionary['heartbeat_min'] / 60),  # {28}
+                        language_dictionary_html["Adaptive_Min"],  # {29}
+                        int(wifi_settings_dictionary['adaptive_min_ms'] / 60000),  # {30}
+                        language_dictionary_html["Adaptive_Max"],  # {31}
+                        int(wifi_settings_dictionary['adaptive_max_ms'] / 60000)  # {32}
+                    )
+                    html_end = '</html>'
+                    response = '{0}{1}{2}{3}{4}{5}{6}'.format(
+                        html_start,  # {0}
+                        html_lang,  # {1}
+                        html_head_start,  # {2}
+                        html_style,  # {3}
+                        html_head_end,  # {4}
+                        html_body,  # {5}
+                        html_end  # {6}
+                    )
+
+                else:
+                    try:
+                        file = open(file_request, 'rb')  # open file , r => read , b => byte format
+                        response = file.read()
+                        file.close()
+
+                        if file_request.endswith(".html"):
+                            mimetype = 'text/html'
+                        elif file_request.endswith(".svg"):
+                            mimetype = 'image/svg+xml'
+                        elif file_request.endswith(".css"):
+                            mimetype = 'text/css'
+                        else:
+                            mimetype = 'application/octet-stream'
+
+                        header = 'HTTP/1.1 200 OK\nContent-Type: {0}\nConnection: close\n\n'.format(mimetype)
+
+                    except Exception as e:
+                        header = 'HTTP/1.1 404 Not Found\nContent-Type: text/html\nConnection: close\n\n'
+                        response = '<!DOCTYPE html><html lang=en><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1"><title>NFS</title><meta name="noflippingswitches" content="NFS"></head><center><h3>Error 404: File {0} not found</h3><p>{1}</p></center></body></html>'.format(file_request, e)
+
+            else:
+                # Unable to load language_dictionary_html
+                header = 'HTTP/1.1 500 Internal Server Error\nContent-Type: text/html\nConnection: close\n\n'
+                response = '<!DOCTYPE html><html lang=en><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8" /><meta name="viewport" content="width=device-width, initial-scale=1"><title>NFS</title><meta name="noflippingswitches" content="NFS"></head><body><center><h3>Error 500: Unable to load a language_dictionary_html</h3></center></body></html>'
+
+            connection.send(header)
+            connection.sendall(response)
+            connection.close()
+            # garbage collection after serving each page
+            gc.collect()
+
+            # Things to_do after serving page
+            if 'scan' in param_request_dictionary:
+                first_tab_access_point_machine_reset = True
+            elif first_tab_access_point_machine_reset:
+                machine.reset()
+
+            if 'refresh_third_tab' in param_request_dictionary:
+                third_tab_access_point_machine_reset = True
+            elif third_tab_access_point_machine_reset:
+                machine.reset()
+
+        except Exception as e:
+            print('Error: {0}'.format(e))
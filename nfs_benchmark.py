@@ -0,0 +1,86 @@
+# NFS - wake benchmark, run on the board from a soft reset: mpremote run nfs_benchmark.py
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import gc
+
+
+# [ Functions ]
+# (ms, heap bytes) taken by importing module_name_list, modules imported before are not counted again
+def benchmark_import(module_name_list):
+    gc.collect()
+    heap_start = gc.mem_alloc()
+    start_ticks_ms = time.ticks_ms()
+    for module_name in module_name_list:
+        __import__(module_name)
+    import_ms = time.ticks_diff(time.ticks_ms(), start_ticks_ms)
+    gc.collect()
+    return import_ms, gc.mem_alloc() - heap_start
+
+
+# ms taken by function(*args)
+def benchmark_ms(function, *args):
+    start_ticks_ms = time.ticks_ms()
+    function(*args)
+    return time.ticks_diff(time.ticks_ms(), start_ticks_ms)
+
+
+# print the import time and heap of a record-only and a send wake, the settings from flash and from the rtc config snapshot, and the sensor
+# and battery reads one after the other and overlapped
+def benchmark():
+    # a record-only wake imports the sensor and rtc code, a send wake also the settings, wifi, mqtt and payload code
+    record_ms, record_heap = benchmark_import(['nfs_sensor', 'nfs_rtc'])
+    send_ms, send_heap = benchmark_import(['nfs_settings', 'nfs_network', 'nfs_payload', 'nfs_mqtt'])
+    print('imports record-only wake: {0} ms, {1} bytes heap'.format(record_ms, record_heap))
+    print('imports send wake: {0} ms, {1} bytes heap'.format(record_ms + send_ms, record_heap + send_heap))
+    print('heap free after the send wake imports: {0} bytes'.format(gc.mem_free()))
+
+    # settings, json on flash on a cold boot or after a settings change, the rtc config snapshot on the other wakes
+    from nfs_settings import settings_load
+    from nfs_rtc import rtc_config_pack_into, rtc_config_unpack, Constant_rtc_memory_size
+    device_settings_dictionary, wifi_settings_dictionary = settings_load()
+    rtc_memory = bytearray(Constant_rtc_memory_size)
+    rtc_config_pack_into(rtc_memory, device_settings_dictionary, wifi_settings_dictionary)
+    print('settings from flash: {0} ms'.format(benchmark_ms(settings_load)))
+    print('settings from the rtc config snapshot: {0} ms'.format(benchmark_ms(rtc_config_unpack, rtc_memory)))
+
+    # sensor and battery one after the other, then the battery read while the ds18b20(s) convert
+    from nfs_sensor import ds18b20, ds18b20_start, ds18b20_collect, batt
+    start_ticks_ms = time.ticks_ms()
+    ds18b20(device_settings_dictionary['ds18b20_sn_list'], wifi_settings_dictionary['ds18b20_resolution'])
+    sensor_ms = time.ticks_diff(time.ticks_ms(), start_ticks_ms)
+    batt()
+    serial_ms = time.ticks_diff(time.ticks_ms(), start_ticks_ms)
+    print('sensor then battery: sensor {0} ms, battery {1} ms, total {2} ms'.format(sensor_ms, serial_ms - sensor_ms, serial_ms))
+    start_ticks_ms = time.ticks_ms()
+    ds18b20_conversion = ds18b20_start(device_settings_dictionary['ds18b20_sn_list'], wifi_settings_dictionary['ds18b20_resolution'])
+    start_ms = time.ticks_diff(time.ticks_ms(), start_ticks_ms)
+    batt()
+    battery_ms = time.ticks_diff(time.ticks_ms(), start_ticks_ms)
+    ds18b20_collect(ds18b20_conversion)
+    overlap_ms = time.ticks_diff(time.ticks_ms(), start_ticks_ms)
+    print('battery during the conversion: start {0} ms, battery until {1} ms, collected at {2} ms'.format(start_ms, battery_ms, overlap_ms))
+
+
+# [START]
+benchmark()
@@ -0,0 +1,230 @@
+# NFS - esp-now transport, sensors send to a mains powered gateway that publishes to mqtt
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import time
+import os
+import network
+import json
+import struct
+import ubinascii
+from nfs_rtc import rtc_state_default_dictionary, profile_start
+from nfs_network import known_wifi_list, wifi_station_connect
+from nfs_mqtt import mqtt_client, mqtt_publish
+from micropython import const
+
+
+# [ Functions ]
+# esp-now frames of a message, each is the frame header (magic, boot nonce, message id, frame index, frame count) then the next part of the message.
+# message_key is (boot nonce, message id), the nonce tells a sender that restarted its message ids from a repeated message
+def espnow_frames(message_key, message_bytes):
+    espnow_frame_data_bytes = Constant_espnow_frame_bytes - struct.calcsize(Constant_espnow_frame_header_format)
+    espnow_frame_count = max(1, (len(message_bytes) + espnow_frame_data_bytes - 1) // espnow_frame_data_bytes)
+    return [struct.pack(Constant_espnow_frame_header_format, Constant_espnow_frame_magic, message_key[0], message_key[1], espnow_frame_index, espnow_frame_count) + message_bytes[espnow_frame_index * espnow_frame_data_bytes:(espnow_frame_index + 1) * espnow_frame_data_bytes] for espnow_frame_index in range(espnow_frame_count)]
+
+
+# add a frame from sender to the messages being received, one per sender. Returns (message key, message) once every frame of the message arrived, else None.
+# The message key is (boot nonce, message id)
+def espnow_reassemble(espnow_messages_dictionary, sender, espnow_frame):
+    espnow_frame_header_bytes = struct.calcsize(Constant_espnow_frame_header_format)
+    if len(espnow_frame) < espnow_frame_header_bytes:
+        return None
+    espnow_frame_magic, boot_nonce, message_id, espnow_frame_index, espnow_frame_count = struct.unpack_from(Constant_espnow_frame_header_format, espnow_frame)
+    message_key = (boot_nonce, message_id)
+    if espnow_frame_magic != Constant_espnow_frame_magic or espnow_frame_index >= espnow_frame_count:
+        return None
+    espnow_message = espnow_messages_dictionary.get(sender)
+    # a new message drops what arrived of the last one
+    if espnow_message is None or espnow_message[0] != message_key or espnow_message[1] != espnow_frame_count:
+        espnow_message = [message_key, espnow_frame_count, [None] * espnow_frame_count]
+        espnow_messages_dictionary[sender] = espnow_message
+    espnow_message[2][espnow_frame_index] = bytes(espnow_frame[espnow_frame_header_bytes:])
+    if None in espnow_message[2]:
+        return None
+    del espnow_messages_dictionary[sender]
+    return message_key, b''.join(espnow_message[2])
+
+
+# esp-now frame the gateway sends back once a message was published to mqtt (status 0) or could not be (status 1)
+def espnow_ack_pack(message_key, espnow_status):
+    return struct.pack(Constant_espnow_ack_format, Constant_espnow_ack_magic, message_key[0], message_key[1], espnow_status)
+
+
+# (message key, status) of an ack from the gateway, None if the frame is not an ack
+def espnow_ack_unpack(espnow_frame):
+    if len(espnow_frame) != struct.calcsize(Constant_espnow_ack_format):
+        return None
+    espnow_ack_magic, boot_nonce, message_id, espnow_status = struct.unpack(Constant_espnow_ack_format, espnow_frame)
+    if espnow_ack_magic != Constant_espnow_ack_magic:
+        return None
+    return (boot_nonce, message_id), espnow_status
+
+
+# sensor, send a message to the esp-now gateway without connecting to wifi and wait until the gateway acknowledges it was published to mqtt.
+# Returns True if it was, the caller falls back to wifi and mqtt if not
+def espnow_send(wifi_station, wifi_settings_dictionary, rtc_state_dictionary, message_bytes):
+    try:
+        import espnow
+    except ImportError as e:
+        print('Error: {0}'.format(e))
+        return False
+    espnow_gateway_mac = ubinascii.unhexlify(wifi_settings_dictionary['espnow_gateway_mac'].replace(':', ''))
+    # the gateway listens on the channel of its wifi network, the channel of the last wifi connect unless set
+    espnow_channel = wifi_settings_dictionary['espnow_channel'] or rtc_state_dictionary['wifi_channel']
+    # message ids restart when the rtc state is lost, a new nonce then keeps the gateway from taking a new message for one it already published
+    if not rtc_state_dictionary['espnow_boot_nonce']:
+        rtc_state_dictionary['espnow_boot_nonce'] = struct.unpack('<H', os.urandom(2))[0] or 1
+    rtc_state_dictionary['espnow_message_id'] = (rtc_state_dictionary['espnow_message_id'] + 1) & 0xFFFF
+    message_key = (rtc_state_dictionary['espnow_boot_nonce'], rtc_state_dictionary['espnow_message_id'])
+    esp_now = espnow.ESPNow()
+    try:
+        if espnow_channel:
+            wifi_station.config(channel=espnow_channel)
+        esp_now.active(True)
+        esp_now.add_peer(espnow_gateway_mac)
+        for espnow_frame in espnow_frames(message_key, message_bytes):
+            # waits for the radio of the gateway to acknowledge the frame
+            if not esp_now.send(espnow_gateway_mac, espnow_frame, True):
+                print('esp-now gateway did not receive the frame')
+                return False
+        # wait for the gateway to acknowledge it published the message
+        espnow_ack_ticks_ms = time.ticks_ms()
+        while time.ticks_diff(time.ticks_ms(), espnow_ack_ticks_ms) < Constant_espnow_ack_timeout_ms:
+            espnow_sender, espnow_frame = esp_now.recv(Constant_espnow_ack_timeout_ms - time.ticks_diff(time.ticks_ms(), espnow_ack_ticks_ms))
+            if espnow_frame is None:
+                break
+            espnow_ack = espnow_ack_unpack(espnow_frame)
+            if espnow_sender == espnow_gateway_mac and espnow_ack is not None and espnow_ack[0] == message_key:
+                return espnow_ack[1] == 0
+        print('esp-now gateway did not acknowledge')
+        return False
+    except Exception as e:
+        print('Error: {0}'.format(e))
+        return False
+    finally:
+        esp_now.active(False)
+
+
+# gateway, mains powered and always on. Stays connected to wifi and mqtt and publishes every message from an esp-now sensor to the topic of the
+# sensor, then acknowledges it back to the sensor. Never returns
+def espnow_gateway(device_settings_dictionary, wifi_settings_dictionary, wdt):
+    import espnow
+    wifi_station = network.WLAN(network.STA_IF)
+    wifi_station.active(True)
+    wifi_station.config(hostname=device_settings_dictionary['unique_id'])
+    print('esp-now gateway mac: {0}'.format(ubinascii.hexlify(wifi_station.config('mac'), ':').decode('UTF-8')))
+    # the gateway never deep sleeps, the rtc state is only for connecting to wifi
+    rtc_state_dictionary = rtc_state_default_dictionary()
+    profile_start(rtc_state_dictionary, time.ticks_ms())
+    mqttc = mqtt_client(wifi_settings_dictionary, device_settings_dictionary['unique_id'])
+    mqtt_connected = False
+    mqtt_ping_ticks_ms = time.ticks_ms()
+
+    esp_now = espnow.ESPNow()
+    # room for the frames of a few messages while a publish is running, the buffer is only allocated by active(True)
+    esp_now.config(rxbuf=Constant_espnow_gateway_rxbuf_bytes)
+    esp_now.active(True)
+    espnow_messages_dictionary = {}
+    # last (boot nonce, message id) published for each sensor, a message sent again because the ack was lost is only acknowledged
+    espnow_published_dictionary = {}
+
+    while True:
+        wdt.feed()  # feed the watchdog timmer
+        # wifi and mqtt back up when lost
+        if not wifi_station.isconnected():
+            mqtt_connected = False
+            for known_wifi_dictionary in known_wifi_list(wifi_settings_dictionary):
+                if wifi_station_connect(wifi_station, known_wifi_dictionary, None, 0, rtc_state_dictionary) == network.STAT_GOT_IP:
+                    break
+                wifi_station.disconnect()
+                wdt.feed()  # feed the watchdog timmer
+            if not wifi_station.isconnected():
+                time.sleep_ms(Constant_espnow_gateway_retry_ms)
+                continue
+        if not mqtt_connected:
+            try:
+                mqttc.connect(clean_session=True)
+                mqtt_connected = True
+                mqtt_ping_ticks_ms = time.ticks_ms()
+            except Exception as e:
+                print('Error: {0}'.format(e))
+                time.sleep_ms(Constant_espnow_gateway_retry_ms)
+                continue
+
+        espnow_sender, espnow_frame = esp_now.recv(Constant_espnow_gateway_retry_ms)
+        if espnow_frame is None:
+            # keep the mqtt connection alive while no sensor sends
+            if time.ticks_diff(time.ticks_ms(), mqtt_ping_ticks_ms) > Constant_espnow_gateway_ping_ms:
+                try:
+                    mqttc.ping()
+                except Exception as e:
+                    print('Error: {0}'.format(e))
+                    mqtt_connected = False
+                mqtt_ping_ticks_ms = time.ticks_ms()
+            continue
+        espnow_message = espnow_reassemble(espnow_messages_dictionary, espnow_sender, espnow_frame)
+        if espnow_message is None:
+            continue
+
+        espnow_status = 0
+        if espnow_published_dictionary.get(espnow_sender) != espnow_message[0]:
+            try:
+                # the message is the payload of the sensor, keyed by its unique id like its own mqtt topic
+                topic_byte = ('noflippingswitches/sensor/' + next(iter(json.loads(espnow_message[1])))).encode()
+                mqtt_publish(mqttc, topic_byte, espnow_message[1])
+                mqtt_ping_ticks_ms = time.ticks_ms()
+                espnow_published_dictionary[espnow_sender] = espnow_message[0]
+            except Exception as e:
+                print('Error: {0}'.format(e))
+                espnow_status = 1
+                mqtt_connected = False
+
+        # noinspection PyBroadException
+        try:
+            esp_now.add_peer(espnow_sender)
+        except Exception:
+            # already a peer
+            pass
+        try:
+            esp_now.send(espnow_sender, espnow_ack_pack(espnow_message[0], espnow_status), False)
+        except Exception as e:
+            print('Error: {0}'.format(e))
+
+
+# [Static]
+# esp-now - max bytes of one esp-now frame
+Constant_espnow_frame_bytes = const(250)
+# esp-now - frame header (magic, boot nonce, message id, frame index, frame count), then the next part of the message
+Constant_espnow_frame_header_format = '<BHHBB'
+Constant_espnow_frame_magic = const(0xE5)
+# esp-now - ack from the gateway (magic, boot nonce, message id, status 0 published 1 failed)
+Constant_espnow_ack_format = '<BHHB'
+Constant_espnow_ack_magic = const(0xE6)
+# esp-now - ms a sensor waits for the ack of the gateway after the last frame, the gateway publishes to mqtt first
+Constant_espnow_ack_timeout_ms = const(2000)
+# esp-now - bytes the gateway buffers for received frames
+Constant_espnow_gateway_rxbuf_bytes = const(8192)
+# esp-now - ms the gateway waits for a frame, and before trying wifi or mqtt again
+Constant_espnow_gateway_retry_ms = const(1000)
+# esp-now - ms without mqtt traffic before the gateway pings the mqtt server, under the mqtt keepalive
+Constant_espnow_gateway_ping_ms = const(30000)
@@ -0,0 +1,483 @@
+# NFS - send wake, wifi and mqtt
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+# noinspection PyUnresolvedReferences
+import umqtt.simple
+import machine
+import network
+import gc
+import struct
+import socket
+import ubinascii
+from nfs_sensor import batt_cached, ds18b20_collect
+from nfs_payload import payload_stream, payload_json_write, payload_json_bytes, payload_binary_pack, Constant_payload_static_every_sends
+from nfs_rtc import (
+    rtc_time_segments_read, rtc_time_segments_shift, time_stamps_dictionary, rtc_published_write, record_reading, station_deep_sleep,
+    rtc_series_clear, rtc_series_reversed, spool_read, spool_advance, spool_pending, send_backoff, profile_mark, profile_mark_sensor, profile_diagnostics_dictionary,
+    rtc_wifi_networks_check, rtc_wifi_network_read, energy_battery_dictionary, energy_ledger_save, Constant_spool_drain_per_wake
+)
+from nfs_network import (
+    known_wifi_list, known_wifi_crc, ntp_sync, wifi_connection_status, wifi_station_rssi, wifi_station_scan, wifi_networks_ranked, wifi_network_connect,
+    Constant_ntp_resync_s, Constant_wifi_fast_connect_rssi_min, Constant_wifi_networks_per_wake, Constant_wifi_status_weak
+)
+from micropython import const
+
+
+# noinspection PyPep8Naming
+class mqtt_tls:
+    """TLS context of the mqtt connection for umqtt, sends the hostname of the server when connecting to its cached ip address"""
+    def __init__(self, server_hostname):
+        self.server_hostname = server_hostname
+
+    # noinspection PyUnusedLocal
+    def wrap_socket(self, sock, server_hostname=None):
+        try:
+            import ssl
+        except ImportError:
+            # noinspection PyUnresolvedReferences
+            import ussl as ssl
+        if not hasattr(ssl, 'SSLContext'):
+            return ssl.wrap_socket(sock, server_hostname=self.server_hostname)
+        ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        # like ssl.wrap_socket, the server certificate is not verified
+        ssl_context.verify_mode = ssl.CERT_NONE
+        return ssl_context.wrap_socket(sock, server_hostname=self.server_hostname)
+
+
+# [ Functions ]
+# payload of a send, the readings with their timestamps, battery, device and the diagnostics when on
+def station_payload_dictionary(device_settings_dictionary, wifi_settings_dictionary, rtc_memory, rtc_state_dictionary, sensor_id_list, tempC_internal_ready_ms, batt_result, record_interval_ms, wifi_station, known_wifi):
+    # one list per sensor, newest first
+    rtc_memory_reversed_list = rtc_series_reversed(rtc_memory, rtc_state_dictionary)
+    # timestamps of the readings, newest first like the readings
+    time_stamps = time_stamps_dictionary(rtc_time_segments_read(rtc_memory, rtc_state_dictionary), rtc_state_dictionary['series_rows'], rtc_state_dictionary['time_sync_s'])
+
+    data_out_dictionary = {
+        device_settings_dictionary['unique_id']: {
+            "sensor": {
+                "tempC": rtc_memory_reversed_list[0],
+                "tempC_by_sensor_id": dict(zip(sensor_id_list, rtc_memory_reversed_list)),
+                "ts_base": time_stamps['ts_base'],
+                "ts_interval_ms": time_stamps['ts_interval_ms'],
+                "ts_gaps": time_stamps['ts_gaps'],
+                "record_data_interval_ms": int(wifi_settings_dictionary['record_data_interval_ms']),
+                "record_interval_ms": int(record_interval_ms),
+                "send_data_interval_min": int(wifi_settings_dictionary['send_data_interval_min']),
+                "power_up_ms": tempC_internal_ready_ms[0],
+                "conversion_ms": tempC_internal_ready_ms[1]
+            },
+            "battery": {
+                "volts": batt_result[0],
+                "percentage": batt_result[1],
+                "energy": energy_battery_dictionary(rtc_state_dictionary, wifi_settings_dictionary)
+            },
+            "device": {
+                "device": device_settings_dictionary['device'],
+                "sensor_id": device_settings_dictionary['ds18b20_sn'],
+                "sensor_ids": device_settings_dictionary['ds18b20_sn_list']
+            }
+        }
+    }
+    # phase profile of the wakes since the last send, to find slow wakes and access points without a serial console
+    diagnostics = profile_diagnostics_dictionary(rtc_memory, rtc_state_dictionary)
+    if wifi_settings_dictionary['diagnostics'] and diagnostics:
+        diagnostics['rssi'] = wifi_station_rssi(wifi_station)
+        diagnostics['wifi_failures'] = rtc_state_dictionary['wifi_failures']
+        diagnostics['send_failures'] = rtc_state_dictionary['send_failures']
+        # per known wifi network [ssid, connects tried, success rate in %, average ms to connect]
+        diagnostics['wifi_networks'] = [[known_wifi_dictionary['wifi_ssid']] + list(rtc_wifi_network_read(rtc_memory, wifi_network_index)) for wifi_network_index, known_wifi_dictionary in enumerate(known_wifi)]
+        for wifi_network in diagnostics['wifi_networks']:
+            wifi_network[2] = wifi_network[2] * 100 // 255
+        if rtc_state_dictionary['wifi_failures'] or rtc_state_dictionary['send_failures']:
+            diagnostics['wifi_exit'] = wifi_connection_status(rtc_state_dictionary['wifi_exit_status'])
+        data_out_dictionary[device_settings_dictionary['unique_id']]['diagnostics'] = diagnostics
+
+    return data_out_dictionary
+
+
+# the readings were sent, clear them and start the diagnostics and energy averages since the send again
+def station_sent(rtc_memory, rtc_state_dictionary, tempC_list):
+    # clear rtc readings, keep rtc state and the readings just sent for the deadband
+    rtc_series_clear(rtc_state_dictionary)
+    # the phase profile was sent, start a new one
+    rtc_state_dictionary['profile_wakes'] = 0
+    rtc_state_dictionary['wifi_failures'] = 0
+    # sent, the next send is on time again
+    rtc_state_dictionary['send_failures'] = 0
+    rtc_state_dictionary['send_retry_s'] = 0
+    # keep the energy ledger of the battery on flash, start a new average since the send
+    energy_ledger_save(rtc_state_dictionary)
+    rtc_state_dictionary['energy_send_uas'] = 0
+    rtc_state_dictionary['energy_send_ms'] = 0
+    rtc_published_write(rtc_memory, rtc_state_dictionary, tempC_list, time.time())
+
+
+# ip address of the mqtt server, kept in rtc state so sends skip dns. The server name if it can not be resolved
+def mqtt_server_ip(rtc_state_dictionary, server):
+    if rtc_state_dictionary['mqtt_server_crc'] == ubinascii.crc32(server.encode()):
+        return '.'.join([str(ip_byte) for ip_byte in rtc_state_dictionary['mqtt_ip']])
+    try:
+        server_address = socket.getaddrinfo(server, 0)[0][-1]
+        # ports that give a raw sockaddr are left to umqtt to resolve
+        if not isinstance(server_address, tuple):
+            return server
+        rtc_state_dictionary['mqtt_ip'] = bytes([int(ip_byte) for ip_byte in server_address[0].split('.')])
+        rtc_state_dictionary['mqtt_server_crc'] = ubinascii.crc32(server.encode())
+        return server_address[0]
+    except Exception as e:
+        print('Error: {0}'.format(e))
+        return server
+
+
+# mqtt client for the server in the wifi settings, connects to server_ip when given
+def mqtt_client(wifi_settings_dictionary, client_id, server_ip=None):
+    server = wifi_settings_dictionary['mqtt_url']
+    if server == 'noflippingswitches.com' or server == 'no-fs.com':
+        port = 8883
+        keepalive = 60
+        ssl = True
+        user = None
+        password = None
+    else:
+        port = wifi_settings_dictionary['mqtt_port']
+        keepalive = 60
+        ssl = wifi_settings_dictionary['mqtt_ssl']
+        user = wifi_settings_dictionary['mqtt_username']
+        if user == '':
+            user = None
+        password = wifi_settings_dictionary['mqtt_password']
+        if password == '':
+            password = None
+
+    if ssl:
+        ssl = mqtt_tls(server)
+    return umqtt.simple.MQTTClient(client_id, server_ip or server, port, user, password, keepalive, ssl)
+
+
+# publish with qos 1 like umqtt publish. A payload that is not bytes is written to the socket as json while it is serialized, the length in the
+# mqtt header comes from a first pass that only counts, so the readings are never in memory as one big string. Mirrors MQTTClient.publish of
+# umqtt.simple 1.3.4 (micropython-lib) and uses its _send_str, pid and sock, a umqtt without them gets the json as one string through publish
+def mqtt_publish(mqttc, topic_byte, payload_value):
+    if not hasattr(mqttc, '_send_str') or not hasattr(mqttc, 'pid'):
+        mqttc.publish(topic_byte, payload_value if isinstance(payload_value, (bytes, bytearray)) else payload_json_bytes(payload_value), retain=False, qos=1)
+        return
+    if isinstance(payload_value, (bytes, bytearray)):
+        payload_length = len(payload_value)
+    else:
+        payload_counter = payload_stream()
+        payload_json_write(payload_counter, payload_value)
+        payload_length = payload_counter.length
+    # fixed header of a qos 1 publish then the remaining length as a varint
+    mqtt_header = bytearray(b'\x32\0\0\0\0')
+    remaining_length = 2 + len(topic_byte) + 2 + payload_length
+    i = 1
+    while remaining_length > 0x7F:
+        mqtt_header[i] = (remaining_length & 0x7F) | 0x80
+        remaining_length >>= 7
+        i += 1
+    mqtt_header[i] = remaining_length
+    mqttc.sock.write(mqtt_header, i + 1)
+    # noinspection PyProtectedMember
+    mqttc._send_str(topic_byte)
+    # packet id 1 to 65535, 0 is not allowed
+    mqttc.pid = ((mqttc.pid + 1) & 0xFFFF) or 1
+    struct.pack_into('!H', mqtt_header, 0, mqttc.pid)
+    mqttc.sock.write(mqtt_header, 2)
+    if isinstance(payload_value, (bytes, bytearray)):
+        mqttc.sock.write(payload_value)
+    else:
+        payload_writer = payload_stream(mqttc.sock)
+        payload_json_write(payload_writer, payload_value)
+        payload_writer.flush()
+    # wait for the puback of this publish, other packets are skipped. wait_msg sets the socket back to blocking, the timeout is set again each time
+    puback_deadline_ticks_ms = time.ticks_add(time.ticks_ms(), Constant_mqtt_puback_timeout_ms)
+    while time.ticks_diff(puback_deadline_ticks_ms, time.ticks_ms()) > 0:
+        mqttc.sock.settimeout(time.ticks_diff(puback_deadline_ticks_ms, time.ticks_ms()) / 1000)
+        if mqttc.wait_msg() == 0x40:
+            if mqttc.sock.read(1) != b'\x02':
+                raise OSError('mqtt puback')
+            puback_pid = mqttc.sock.read(2)
+            if puback_pid[0] << 8 | puback_pid[1] == mqttc.pid:
+                mqttc.sock.settimeout(None)
+                return
+    raise OSError('mqtt puback timeout')
+
+
+# send wake, bring up wifi and send the readings (spooled first) over mqtt, then deep sleep until the next reading. Never returns
+def station_send(device_settings_dictionary, wifi_settings_dictionary, rtc_memory, rtc_state_dictionary, ds18b20_conversion, tempC_internal, tempC_list, tempC_internal_ready_ms, record_interval_ms, start_time_s, wdt, pull_up_pin_list):
+    # send the data to the server!
+    # do as much as possible before connecting to wi-fi, as it eats the most power while on.
+    # battery and Wi-Fi bring-up run while the ds18b20(s) are still converting
+
+    # get battery voltage, from the rtc memory cache most wakes
+    batt_result = batt_cached(rtc_state_dictionary, wifi_settings_dictionary['battery_read_every_wakes'], record_interval_ms)
+    profile_mark(rtc_state_dictionary, 'battery')
+
+    # CONNECT
+    # define Wi-Fi station
+    wifi_station = network.WLAN(network.STA_IF)
+    # Make sure wifi_station is not active (note: if no True/False given as an argument it will output current state)
+    # Make sure we are not connected to a Wi-Fi network
+    if wifi_station.active():
+        # Make sure we are not connected to a Wi-Fi network
+        if wifi_station.isconnected():
+            wifi_station.disconnect()
+            # give Wi-Fi time to disconnect
+            time.sleep_ms(250)
+        wifi_station.active(False)
+        # give Wi-Fi time to go down
+        time.sleep_ms(250)
+
+    wifi_station.active(True)
+    # give Wi-Fi time to come up
+    time.sleep_ms(250)
+
+    # how many attemps to connect to this network/ssid. will try # of times if good conection is lost NOTE: call them one at a time else jams up
+    wifi_station.config(hostname=device_settings_dictionary['unique_id'])
+    wifi_station.config(reconnects=1)
+    profile_mark(rtc_state_dictionary, 'wifi_up')
+
+    # deadband mode already recorded the reading
+    if tempC_internal is None:
+        # get tempature of ds18b20(s), conversion has been running during battery read and Wi-Fi bring-up
+        tempC_internal, tempC_internal_ready_ms = ds18b20_collect(ds18b20_conversion)
+        profile_mark_sensor(rtc_state_dictionary, ds18b20_conversion)
+        # temperatures in the order of the sensors, for the readings, the deadband and the deep sleep
+        tempC_list = [ds18b20_result[1] for ds18b20_result in tempC_internal]
+
+        # add temp to end of rtc readings, also when interval is 1 so readings are kept if wifi or mqtt fail
+        record_interval_ms = record_reading(rtc_memory, rtc_state_dictionary, tempC_list, wifi_settings_dictionary, start_time_s)
+        profile_mark(rtc_state_dictionary, 'record')
+    # ids of the sensors in the order of the readings, label the readings in the payloads
+    sensor_id_list = [ds18b20_result[0] for ds18b20_result in tempC_internal]
+
+    # NOTE: anoying you cannot unassign static values for ifconfig, you must reset device. rather try dhcp networks first.
+    # NOTE: if a ssid had a password and now does not the last 5 values are cashed. user must change the ssid for network on thier router/device! Gerrr.
+
+    # known wifi networks, the user prefers the first
+    known_wifi = known_wifi_list(wifi_settings_dictionary)
+
+    # esp-now sensor, send to the gateway without connecting to wifi. Wifi and mqtt when the clock is due for ntp, readings are spooled or
+    # the gateway did not acknowledge
+    if wifi_settings_dictionary['espnow_role'] == 'sensor' and rtc_state_dictionary['time_sync_s'] and time.time() - rtc_state_dictionary['time_sync_s'] <= Constant_ntp_resync_s and not spool_pending(rtc_state_dictionary):
+        from nfs_espnow import espnow_send
+        data_out_dictionary = station_payload_dictionary(device_settings_dictionary, wifi_settings_dictionary, rtc_memory, rtc_state_dictionary, sensor_id_list, tempC_internal_ready_ms, batt_result, record_interval_ms, wifi_station, known_wifi)
+        espnow_sent = espnow_send(wifi_station, wifi_settings_dictionary, rtc_state_dictionary, payload_json_bytes(data_out_dictionary))
+        profile_mark(rtc_state_dictionary, 'espnow')
+        if espnow_sent:
+            station_sent(rtc_memory, rtc_state_dictionary, tempC_list)
+            station_deep_sleep(rtc_memory, rtc_state_dictionary, wifi_settings_dictionary, record_interval_ms, tempC_list, wdt, pull_up_pin_list)
+
+    # make sure we are not connected
+    if not wifi_station.isconnected():
+        # if no Wi-Fi is declared by user then sleep for max time to save batt until user sets a value
+        if not known_wifi:
+
+            # disable pull-up(s) to stop current leakage before sleep
+            for pull_up_pin in pull_up_pin_list:
+                # noinspection PyTypeChecker
+                pull_up_pin.init(pull=None)
+
+            # garbage collection before deep sleap
+            gc.collect()
+            machine.deepsleep()
+            # print('C-01')
+            # print('Preform Soft Reset, Ctrl+D')
+            # time.sleep_ms(99999)
+        else:
+            # IMPORTANT! feed the watchdog before trying to connect to Wi-Fi ssid
+            wdt.feed()  # feed the watchdog timmer
+
+            # statistics of the known wifi networks in rtc memory are for this list of networks
+            rtc_wifi_networks_check(rtc_memory, rtc_state_dictionary, known_wifi_crc(known_wifi))
+
+            # fast connect, straight to the access point of the last send without a scan, while its signal was good
+            wifi_network_index = None
+            wifi_access_point = None
+            if rtc_state_dictionary['wifi_channel'] and rtc_state_dictionary['wifi_rssi'] >= Constant_wifi_fast_connect_rssi_min and rtc_state_dictionary['wifi_network'] < len(known_wifi):
+                wifi_network_index = rtc_state_dictionary['wifi_network']
+                wifi_access_point = (rtc_state_dictionary['wifi_bssid'], rtc_state_dictionary['wifi_channel'], rtc_state_dictionary['wifi_rssi'])
+                wifi_network_connect(wifi_station, rtc_memory, rtc_state_dictionary, known_wifi, wifi_network_index, wifi_access_point)
+                wdt.feed()  # feed the watchdog timmer
+                if not wifi_station.isconnected():
+                    # the access point is gone or moved channel, scan for it
+                    rtc_state_dictionary['wifi_channel'] = 0
+
+            if not wifi_station.isconnected():
+                # known wifi networks found in the scan, the ones expected to connect fastest first
+                wifi_networks = wifi_networks_ranked(rtc_memory, known_wifi, wifi_station_scan(wifi_station))
+                profile_mark(rtc_state_dictionary, 'wifi_scan')
+                # a link weaker than send_rssi_min is not worth connecting to, when every network found is that weak the send waits like a failed one
+                wifi_networks_strong = [wifi_network for wifi_network in wifi_networks if wifi_network[1] is None or wifi_network[1][2] >= wifi_settings_dictionary['send_rssi_min']]
+                if not wifi_networks_strong:
+                    rtc_state_dictionary['wifi_exit_status'] = Constant_wifi_status_weak
+                wifi_networks = wifi_networks_strong
+
+                for wifi_network_index, wifi_access_point in wifi_networks[:Constant_wifi_networks_per_wake]:
+                    wdt.feed()  # feed the watchdog timmer
+                    if wifi_network_connect(wifi_station, rtc_memory, rtc_state_dictionary, known_wifi, wifi_network_index, wifi_access_point) == network.STAT_GOT_IP:
+                        break
+
+            # keep the access point for the fast connect of the next send
+            if wifi_station.isconnected() and wifi_access_point:
+                rtc_state_dictionary['wifi_network'] = wifi_network_index
+                rtc_state_dictionary['wifi_bssid'] = wifi_access_point[0]
+                rtc_state_dictionary['wifi_channel'] = wifi_access_point[1]
+                rtc_state_dictionary['wifi_rssi'] = max(-128, min(127, wifi_station_rssi(wifi_station) or wifi_access_point[2]))
+            # get status after while loop finishes
+            status = wifi_connection_status(wifi_station.status())
+            # print(str(status))
+
+            # IMPORTANT! feed the watchdog after trying to connect to Wi-Fi ssid
+            wdt.feed()  # feed the watchdog timmer
+
+    # unable to connect, try to store extra entry into avalible rtc memory. If no room in rtc memory left then remove oldeset entry from list. Then preform a defined sleep cycle
+    if not wifi_station.isconnected():
+        # wait before trying to send again
+        send_backoff(rtc_state_dictionary, wifi_settings_dictionary, time.time())
+        # write rtc state and readings to rtc memory and deep sleep until the next reading
+        station_deep_sleep(rtc_memory, rtc_state_dictionary, wifi_settings_dictionary, record_interval_ms, tempC_list, wdt, pull_up_pin_list)
+
+    # We have connected to the Wi-Fi, MQTT stuff
+    if wifi_station.isconnected():
+        # get connection info
+        ifconfig = wifi_station.ifconfig()
+        ip_address_html = ifconfig[0]
+        subnet_mask_html = ifconfig[1]
+        gateway_server_html = ifconfig[2]
+        dns_server_html = ifconfig[3]
+        hostname_html = wifi_station.config('hostname')
+        ssid_html = wifi_station.config('ssid')
+        # print('Connected to: {0}'.format(ssid))
+
+        # set the clock from ntp while wifi is up anyway, at most every Constant_ntp_resync_s
+        if not rtc_state_dictionary['time_sync_s'] or time.time() - rtc_state_dictionary['time_sync_s'] > Constant_ntp_resync_s:
+            time_synced = rtc_state_dictionary['time_sync_s']
+            time_shift_s = ntp_sync(rtc_state_dictionary)
+            # readings taken before the first sync since power on were timed with the unset clock, move them with the clock
+            if time_shift_s is not None and not time_synced:
+                rtc_time_segments_shift(rtc_memory, rtc_state_dictionary, time_shift_s)
+        profile_mark(rtc_state_dictionary, 'ntp')
+
+        data_out_dictionary = station_payload_dictionary(device_settings_dictionary, wifi_settings_dictionary, rtc_memory, rtc_state_dictionary, sensor_id_list, tempC_internal_ready_ms, batt_result, record_interval_ms, wifi_station, known_wifi)
+        # binary frames on their own topic so consumers of the json keep working
+        topic_byte = ('noflippingswitches/sensor/' + hostname_html).encode()
+        if wifi_settings_dictionary['payload_format'] == 'binary':
+            topic_byte += Constant_payload_binary_topic_suffix
+            # the static fields at least every Constant_payload_static_every_sends sends, for consumers that started after they last changed
+            if rtc_state_dictionary['payload_static_sends'] >= Constant_payload_static_every_sends:
+                rtc_state_dictionary['payload_static_crc'] = 0
+            msg_byte, payload_static_crc = payload_binary_pack(data_out_dictionary[device_settings_dictionary['unique_id']], sensor_id_list, rtc_state_dictionary['payload_static_crc'])
+        else:
+            # the json is written to the socket while it is serialized
+            msg_byte = data_out_dictionary
+            payload_static_crc = 0
+
+        # mqtt
+        # by the ip address of the server from the last send, skips dns
+        mqttc = mqtt_client(wifi_settings_dictionary, hostname_html, mqtt_server_ip(rtc_state_dictionary, wifi_settings_dictionary['mqtt_url']))
+
+        # attempts to connect and publish with wifi up, a failure after the last one waits for the backoff
+        while_loop_counter = 1
+        while True:
+            mqtt_connected = False
+            # noinspection PyBroadException
+            try:
+                mqttc.connect(clean_session=True)
+                mqtt_connected = True
+                profile_mark(rtc_state_dictionary, 'mqtt_connect')
+                # send readings spooled to flash first, oldest first, so readings arrive in order. Rest are sent next send
+                # the first binary frame carries the static fields when they changed, the consumer needs them for the spooled readings too
+                spool_static_crc = rtc_state_dictionary['payload_static_crc']
+                for _ in range(Constant_spool_drain_per_wake):
+                    spool_record = spool_read(rtc_state_dictionary)
+                    if spool_record is None:
+                        break
+                    # readings of other sensors than the ones now (added, removed, re-ordered) can not be labelled, drop them
+                    if spool_record[3] != rtc_state_dictionary['series_crc']:
+                        print('Error: spooled readings of other sensors, dropped')
+                        spool_advance(rtc_state_dictionary, spool_record[1])
+                        continue
+                    spool_sensor_dictionary = dict(data_out_dictionary[device_settings_dictionary['unique_id']]['sensor'])
+                    spool_sensor_dictionary['tempC'] = spool_record[0][0]
+                    spool_sensor_dictionary['tempC_by_sensor_id'] = dict(zip(sensor_id_list, spool_record[0]))
+                    spool_sensor_dictionary.update(spool_record[2])
+                    spool_sensor_dictionary['spooled'] = True
+                    spool_data_out_dictionary = {"sensor": spool_sensor_dictionary, "battery": data_out_dictionary[device_settings_dictionary['unique_id']]['battery'], "device": data_out_dictionary[device_settings_dictionary['unique_id']]['device']}
+                    if wifi_settings_dictionary['payload_format'] == 'binary':
+                        spool_msg_byte, spool_static_crc = payload_binary_pack(spool_data_out_dictionary, sensor_id_list, spool_static_crc)
+                    else:
+                        spool_msg_byte = {device_settings_dictionary['unique_id']: spool_data_out_dictionary}
+                    mqtt_publish(mqttc, topic_byte, spool_msg_byte)
+                    spool_advance(rtc_state_dictionary, spool_record[1])
+                    wdt.feed()  # feed the watchdog timmer
+                mqtt_publish(mqttc, topic_byte, msg_byte)
+                mqttc.disconnect()
+                # the static fields were sent, later binary frames leave them out until they change or are due again
+                if rtc_state_dictionary['payload_static_crc'] != payload_static_crc:
+                    rtc_state_dictionary['payload_static_sends'] = 0
+                else:
+                    rtc_state_dictionary['payload_static_sends'] = min(rtc_state_dictionary['payload_static_sends'] + 1, 0xFF)
+                rtc_state_dictionary['payload_static_crc'] = payload_static_crc
+                profile_mark(rtc_state_dictionary, 'mqtt_publish')
+                # print('mqtt sent')
+                break
+            except Exception as e:
+                profile_mark(rtc_state_dictionary, 'mqtt_publish' if mqtt_connected else 'mqtt_connect')
+                # the cached ip address of the server may be stale, resolve it again. Wifi is kept for the next attempt
+                if not mqtt_connected:
+                    rtc_state_dictionary['mqtt_server_crc'] = 0
+                    mqttc.server = wifi_settings_dictionary['mqtt_url']
+                # print('mqtt exception')
+                if while_loop_counter == Constant_mqtt_attempts:
+                    # wait before trying to send again
+                    send_backoff(rtc_state_dictionary, wifi_settings_dictionary, time.time())
+                    wifi_station.disconnect()
+                    wifi_station.active(False)
+                    # give wifi time to go down
+                    time.sleep_ms(250)
+                    # write rtc state and readings to rtc memory and deep sleep until the next reading
+                    station_deep_sleep(rtc_memory, rtc_state_dictionary, wifi_settings_dictionary, record_interval_ms, tempC_list, wdt, pull_up_pin_list)
+
+                    break
+                while_loop_counter += 1
+                # give the mqtt server a moment, wifi stays up for the next attempt
+                time.sleep_ms(Constant_mqtt_retry_ms)
+                wdt.feed()  # feed the watchdog timmer
+
+        # the readings were sent
+        station_sent(rtc_memory, rtc_state_dictionary, tempC_list)
+        # write rtc state and readings to rtc memory and deep sleep until the next reading
+        station_deep_sleep(rtc_memory, rtc_state_dictionary, wifi_settings_dictionary, record_interval_ms, tempC_list, wdt, pull_up_pin_list)
+
+
+# [Static]
+# mqtt - attempts to connect and publish on a send wake
+Constant_mqtt_attempts = const(3)
+# mqtt - ms between the attempts
+Constant_mqtt_retry_ms = const(1000)
+# mqtt - max ms to wait for the puback of a publish
+Constant_mqtt_puback_timeout_ms = const(10000)
+# payload - topic suffix of the binary payload, the json payload stays on the topic of the device
+Constant_payload_binary_topic_suffix = b'/bin'
@@ -0,0 +1,329 @@
+# NFS - wifi station and ntp
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import network
+import ubinascii
+import ntptime
+from nfs_rtc import clock_ms, drift_learn, profile_mark, rtc_wifi_network_read, rtc_wifi_network_update, Constant_drift_learn_min_s, Constant_wifi_networks_max
+from micropython import const
+
+
+# [ Functions ]
+# set the clock from ntp, only on wakes that already have wifi. Returns the seconds the clock moved, None if ntp failed
+def ntp_sync(rtc_state_dictionary):
+    time_before_ms = clock_ms()
+    try:
+        ntptime.settime()
+    except Exception as e:
+        print('Error: {0}'.format(e))
+        return None
+    time_shift_ms = clock_ms() - time_before_ms
+    # how far the clock was off since the last sync is the drift of the rtc oscillator at the average temperature since then
+    if rtc_state_dictionary['time_sync_s'] and rtc_state_dictionary['drift_temp_count']:
+        time_elapsed_ms = time_before_ms - rtc_state_dictionary['time_sync_s'] * 1000 + time_shift_ms
+        if time_elapsed_ms >= Constant_drift_learn_min_s * 1000:
+            drift_learn(rtc_state_dictionary, rtc_state_dictionary['drift_temp_sum'] / rtc_state_dictionary['drift_temp_count'], -time_shift_ms * 1000000 // time_elapsed_ms)
+    rtc_state_dictionary['drift_temp_sum'] = 0
+    rtc_state_dictionary['drift_temp_count'] = 0
+    rtc_state_dictionary['time_sync_s'] = time.time()
+    return (time_shift_ms + 500) // 1000
+
+
+# Return the current status of the wireless connection
+def wifi_connection_status(stat):
+    if stat == network.STAT_ASSOC_FAIL:
+        return 'STAT_ASSOC_FAIL: received frame other than authentication or probe request'
+    elif stat == network.STAT_BEACON_TIMEOUT:
+        return 'STAT_BEACON_TIMEOUT: missed a number beacon frames from wifi station'
+    elif stat == network.STAT_CONNECTING:
+        return 'STAT_CONNECTING: connecting in progress'
+    elif stat == network.STAT_GOT_IP:
+        return 'STAT_GOT_IP: connection successful'
+    elif stat == network.STAT_HANDSHAKE_TIMEOUT:
+        return 'STAT_HANDSHAKE_TIMEOUT: missed handshakes with wifi station'
+    elif stat == network.STAT_IDLE:
+        return 'STAT_IDLE: no connection and no activity'
+    elif stat == network.STAT_NO_AP_FOUND:
+        return 'STAT_NO_AP_FOUND: failed because no wifi station found or replied'
+    elif stat == network.STAT_WRONG_PASSWORD:
+        return 'STAT_WRONG_PASSWORD: failed due to incorrect password'
+    elif stat == Constant_wifi_status_timeout:
+        return 'TIMEOUT: still connecting when the time to connect ran out'
+    elif stat == Constant_wifi_status_weak:
+        return 'WEAK: every known wifi network found was weaker than send_rssi_min'
+    else:
+        return 'STAT_UNKNOWN: unknown return value of {0}'.format(stat)
+
+
+# rssi of the access point the station is associated with, None if not associated or the port can not tell
+def wifi_station_rssi(wifi_station):
+    # noinspection PyBroadException
+    try:
+        return wifi_station.status('rssi')
+    except Exception:
+        return None
+
+
+# True once the station is associated with the access point, before it has an ip address from dhcp
+def wifi_station_associated(wifi_station):
+    return wifi_station_rssi(wifi_station) is not None
+
+
+# known wifi networks in the order the user prefers them, known_wifi is one network or a list of networks. Each network has wifi_ssid, optional
+# wifi_password and the optional static settings ip_address, subnet_mask, gateway_server and dns_server, dhcp without them
+def known_wifi_list(wifi_settings_dictionary):
+    if isinstance(wifi_settings_dictionary['known_wifi'], dict):
+        if 'wifi_ssid' not in wifi_settings_dictionary['known_wifi']:
+            return []
+        return [wifi_settings_dictionary['known_wifi']]
+    return [known_wifi_dictionary for known_wifi_dictionary in wifi_settings_dictionary['known_wifi'][:Constant_wifi_networks_max] if 'wifi_ssid' in known_wifi_dictionary]
+
+
+# first known wifi network, the one set in access point mode. Empty if there is none
+def known_wifi_first(wifi_settings_dictionary):
+    known_wifi = known_wifi_list(wifi_settings_dictionary)
+    if not known_wifi:
+        return {}
+    return known_wifi[0]
+
+
+# set the first known wifi network, the other known wifi networks are kept
+def known_wifi_set_first(wifi_settings_dictionary, known_wifi_dictionary):
+    if isinstance(wifi_settings_dictionary['known_wifi'], list) and wifi_settings_dictionary['known_wifi']:
+        wifi_settings_dictionary['known_wifi'][0] = known_wifi_dictionary
+    else:
+        wifi_settings_dictionary['known_wifi'] = known_wifi_dictionary
+
+
+# crc of the ssids of the known wifi networks, the statistics of the networks in rtc memory are for this list
+def known_wifi_crc(known_wifi):
+    return ubinascii.crc32('\n'.join([known_wifi_dictionary['wifi_ssid'] for known_wifi_dictionary in known_wifi]).encode())
+
+
+# scan for wifi networks, returns the raw scan or an empty list if it failed
+def wifi_station_scan(wifi_station):
+    # noinspection PyShadowingNames
+    try:
+        return wifi_station.scan()
+    except Exception as e:
+        print('Error: {0}'.format(e))
+        print('Unable to scan wifi networks')
+    return []
+
+
+# strongest access point of wifi_ssid in a scan (bssid, channel, rssi), None if it was not found
+def wifi_scan_best(wifi_client_scan_raw, wifi_ssid):
+    wifi_scan_sorted = sorted(wifi_client_scan_raw, key=lambda x: -x[3])  # sorts by fourth element in wifi tuple (rssi) signal strength.
+    for ssid in wifi_scan_sorted:
+        # noinspection PyUnresolvedReferences
+        if str(ssid[0].decode('UTF-8')) == wifi_ssid:
+            return ssid[1], ssid[2], ssid[3]
+    return None
+
+
+# known wifi networks to try in order [(index in known_wifi, (bssid, channel, rssi))]. Only the networks found in the scan, fewest expected ms to connect first
+# from the success rate and connect time kept for each network, a weak signal counts double. Ties go in the order the user prefers them.
+# If the scan found none of them (scan failed, hidden ssid) every network is tried in the order the user prefers them without a bssid
+def wifi_networks_ranked(rtc_memory, known_wifi, wifi_client_scan_raw):
+    wifi_networks = []
+    for wifi_network_index, known_wifi_dictionary in enumerate(known_wifi):
+        wifi_access_point = wifi_scan_best(wifi_client_scan_raw, known_wifi_dictionary['wifi_ssid'])
+        if wifi_access_point is None:
+            continue
+        wifi_network_tries, wifi_network_success_rate, wifi_network_connect_ms = rtc_wifi_network_read(rtc_memory, wifi_network_index)
+        if not wifi_network_tries:
+            expected_ms = Constant_wifi_connect_default_ms
+        else:
+            expected_ms = (wifi_network_connect_ms or Constant_wifi_connect_timeout_ms) * 255 // max(wifi_network_success_rate, 1)
+        if wifi_access_point[2] < Constant_wifi_fast_connect_rssi_min:
+            expected_ms *= 2
+        wifi_networks.append((expected_ms, wifi_network_index, wifi_access_point))
+    if not wifi_networks:
+        return [(wifi_network_index, None) for wifi_network_index in range(len(known_wifi))]
+    wifi_networks.sort(key=lambda x: (x[0], x[1]))
+    return [(wifi_network[1], wifi_network[2]) for wifi_network in wifi_networks]
+
+
+# connect to the known wifi network at wifi_network_index, to the access point (bssid, channel, rssi) when given, and keep its statistics.
+# Disconnects if it failed. Returns the status once connecting ended
+def wifi_network_connect(wifi_station, rtc_memory, rtc_state_dictionary, known_wifi, wifi_network_index, wifi_access_point):
+    connect_ticks_ms = time.ticks_ms()
+    if wifi_access_point:
+        wifi_exit_status = wifi_station_connect(wifi_station, known_wifi[wifi_network_index], wifi_access_point[0], wifi_access_point[1], rtc_state_dictionary)
+    else:
+        wifi_exit_status = wifi_station_connect(wifi_station, known_wifi[wifi_network_index], None, 0, rtc_state_dictionary)
+    rtc_wifi_network_update(rtc_memory, wifi_network_index, wifi_exit_status == network.STAT_GOT_IP, time.ticks_diff(time.ticks_ms(), connect_ticks_ms))
+    if wifi_exit_status != network.STAT_GOT_IP:
+        wifi_station.disconnect()
+    return wifi_exit_status
+
+
+# connect the wifi station to a known wifi network, to bssid on channel when given. Returns the status once connecting ended
+def wifi_station_connect(wifi_station, known_wifi_dictionary, bssid, channel, rtc_state_dictionary):
+    if channel:
+        # noinspection PyBroadException
+        try:
+            # tune to the channel of the access point so connecting does not search every channel, ports that can not set it search every channel
+            wifi_station.config(channel=channel)
+        except Exception:
+            pass
+
+    # static settings of the network, else back to dhcp if a network before it this wake was static
+    try:
+        if 'ip_address' in known_wifi_dictionary:
+            wifi_station.ifconfig((known_wifi_dictionary['ip_address'], known_wifi_dictionary['subnet_mask'], known_wifi_dictionary['gateway_server'], known_wifi_dictionary['dns_server']))
+            rtc_state_dictionary['wifi_static'] = True
+        elif rtc_state_dictionary.get('wifi_static'):
+            wifi_station.ifconfig('dhcp')
+            rtc_state_dictionary['wifi_static'] = False
+    except Exception as e:
+        print('Error: {0}'.format(e))
+
+    if 'wifi_password' not in known_wifi_dictionary:
+        wifi_station.connect(known_wifi_dictionary['wifi_ssid'], bssid=bssid)
+    else:
+        wifi_station.connect(known_wifi_dictionary['wifi_ssid'], known_wifi_dictionary['wifi_password'], bssid=bssid)
+
+    # print('Trying to Connect to: {0}'.format(known_wifi_dictionary['wifi_ssid']))
+    wifi_exit_status, wifi_associated_ticks_ms = wifi_station_wait(wifi_station, Constant_wifi_connect_timeout_ms)
+    profile_mark(rtc_state_dictionary, 'wifi_associate', wifi_associated_ticks_ms)
+    profile_mark(rtc_state_dictionary, 'wifi_dhcp')
+    # keep why connecting failed for the diagnostics of the next send
+    if wifi_exit_status != network.STAT_GOT_IP:
+        rtc_state_dictionary['wifi_exit_status'] = wifi_exit_status
+        rtc_state_dictionary['wifi_failures'] = min(rtc_state_dictionary['wifi_failures'] + 1, 0xFF)
+    return wifi_exit_status
+
+
+# wait until the wifi station is done connecting, sleeping between polls. Returns the exit reason and the ticks_ms it was associated at (None if not seen).
+# The exit reason is the status it ended on, or Constant_wifi_status_timeout if it was still connecting after timeout_ms and was disconnected
+def wifi_station_wait(wifi_station, timeout_ms):
+    wifi_time_ticks_ms = time.ticks_ms()
+    # associated with the access point, the rest of connecting is dhcp
+    wifi_associated_ticks_ms = None
+    while True:
+        wifi_status = wifi_station.status()
+        # every status but connecting is the end, connected or failed
+        if wifi_status != network.STAT_CONNECTING:
+            return wifi_status, wifi_associated_ticks_ms
+        if wifi_associated_ticks_ms is None and wifi_station_associated(wifi_station):
+            wifi_associated_ticks_ms = time.ticks_ms()
+        if time.ticks_diff(time.ticks_ms(), wifi_time_ticks_ms) > timeout_ms:
+            wifi_station.disconnect()
+            print("Timeout. Could not connect.")
+            return Constant_wifi_status_timeout, wifi_associated_ticks_ms
+        # idle between polls instead of spinning at full clock
+        time.sleep_ms(Constant_wifi_poll_ms)
+
+
+def wifi_client_scan():  # returns wifi_client_scan_formatted
+    # scan for other wireless networks, so we can calculate best channel to use
+    # must enable network.STA_IF, station aka client that connects to upstream Wi-Fi's
+    wifi_client = network.WLAN(network.STA_IF)
+    # Make sure wifi_client is not active before trying to connect (if no True/False given it will output current state)
+    if wifi_client.active():
+        # Make sure we are not connected to a wi-fi network
+        if wifi_client.isconnected():
+            wifi_client.disconnect()
+            # give wi-fi time to disconnect
+            time.sleep_ms(250)
+        wifi_client.active(False)
+        # give wi-fi time to go down
+        time.sleep_ms(250)
+
+    wifi_client.active(True)
+    # give wi-fi time to come up
+    time.sleep_ms(250)
+
+    # noinspection PyShadowingNames
+    try:
+        # noinspection PyShadowingNames
+        wifi_client_scan_raw = wifi_client.scan()
+        # disconnect after scan
+        wifi_client.active(False)
+        # give wi-fi time to go down
+        time.sleep_ms(250)
+        if wifi_client.active():
+            # Make sure we are not connected to a wi-fi network
+            wifi_client.active(False)
+        # give wi-fi time to go down
+        time.sleep_ms(250)
+
+    except Exception as e:
+        print('Error: {0}'.format(e))
+        print('wifi_client_scan_raw')
+        return False
+
+    # format wifi_client_scan_raw, a list containing tuples, some containing binary form, into something human-readable
+    wifi_client_scan_formatted = []  # create new list for formatted tuple's
+    scan_security_to_readable_string = 'unknown'
+
+    # noinspection PyShadowingNames
+    for the_tuple in wifi_client_scan_raw:
+
+        # ssid - only list tuple's that have a ssid or are not hidden
+        # noinspection PyUnresolvedReferences
+        scan_ssid = str(the_tuple[0].decode('UTF-8'))
+        scan_hidden = the_tuple[5]
+        if len(scan_ssid) > 0 and not scan_hidden:
+            # noinspection PyTypeChecker
+            scan_bssid = ubinascii.hexlify(the_tuple[1]).decode('UTF-8')
+            scan_channel = the_tuple[2]
+            scan_rssi = the_tuple[3]
+            scan_security = the_tuple[4]
+
+            if scan_security == 0:
+                scan_security_to_readable_string = 'open'
+            elif scan_security == 1:
+                scan_security_to_readable_string = 'WEP'
+            elif scan_security == 2:
+                scan_security_to_readable_string = 'WPA-PSK'
+            elif scan_security == 3:
+                scan_security_to_readable_string = 'WPA2-PSK'
+            elif scan_security == 4:
+                scan_security_to_readable_string = 'WPA/WPA2-PSK'
+
+            wifi_client_scan_formatted.append((scan_ssid, scan_bssid, scan_channel, scan_rssi, scan_security_to_readable_string))
+
+    return wifi_client_scan_formatted, wifi_client_scan_raw
+
+
+# [Static]
+# ntp - resync the clock on a send wake when the last sync is older than this
+Constant_ntp_resync_s = const(6 * 60 * 60)
+
+# wifi - fast connect to the access point of the last send without a scan while its rssi was at least this, in dBm
+Constant_wifi_fast_connect_rssi_min = const(-75)
+# wifi - max ms to wait for connecting to a wifi network
+Constant_wifi_connect_timeout_ms = const(15000)
+# wifi - ms between polls of the status while connecting
+Constant_wifi_poll_ms = const(50)
+# wifi - exit reason of connecting when it timed out, not a network status
+Constant_wifi_status_timeout = const(0xFFFF)
+# wifi - exit reason when no known wifi network was strong enough to connect to, not a network status
+Constant_wifi_status_weak = const(0xFFFE)
+# wifi - expected ms to connect to a network that was never tried, ranks it ahead of networks that often fail
+Constant_wifi_connect_default_ms = const(3000)
+# wifi - max known wifi networks tried on one send wake, each can take up to Constant_wifi_connect_timeout_ms
+Constant_wifi_networks_per_wake = const(2)
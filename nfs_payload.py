@@ -0,0 +1,185 @@
+# NFS - payload serialization, json streamed to the mqtt socket and the compact binary frame
+
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+
+import json
+import struct
+import ubinascii
+from nfs_rtc import temp_to_centi, series_reversed_view
+from micropython import const
+
+
+# noinspection PyPep8Naming
+class payload_stream:
+    """Writer of a payload in pieces. Counts the bytes when target is None, fills target when it is a bytearray of the length counted before,
+    else writes to target (a socket) through a small buffer so the socket does not get a write, and a tls record, per piece"""
+    def __init__(self, target=None):
+        self.target = target
+        self.length = 0
+        self.buffer = bytearray(Constant_payload_stream_buffer_bytes) if target is not None and not isinstance(target, bytearray) else None
+        self.buffer_used = 0
+
+    def write(self, payload_text):
+        payload_piece = payload_text.encode() if isinstance(payload_text, str) else payload_text
+        if isinstance(self.target, bytearray):
+            self.target[self.length:self.length + len(payload_piece)] = payload_piece
+        elif self.buffer is not None:
+            if self.buffer_used + len(payload_piece) > len(self.buffer):
+                self.flush()
+            if len(payload_piece) > len(self.buffer):
+                self.target.write(payload_piece)
+            else:
+                self.buffer[self.buffer_used:self.buffer_used + len(payload_piece)] = payload_piece
+                self.buffer_used += len(payload_piece)
+        self.length += len(payload_piece)
+
+    def flush(self):
+        if self.buffer_used:
+            self.target.write(memoryview(self.buffer)[:self.buffer_used])
+            self.buffer_used = 0
+
+
+# [ Functions ]
+# write the json of payload_value to payload_writer in pieces, the same text as json.dumps. Readings views are written one reading at a time so
+# the readings are never copied into lists or one big string
+def payload_json_write(payload_writer, payload_value):
+    if isinstance(payload_value, dict):
+        payload_writer.write('{')
+        for i, payload_key in enumerate(payload_value):
+            if i:
+                payload_writer.write(', ')
+            payload_writer.write(json.dumps(payload_key))
+            payload_writer.write(': ')
+            payload_json_write(payload_writer, payload_value[payload_key])
+        payload_writer.write('}')
+    elif isinstance(payload_value, series_reversed_view):
+        payload_writer.write('[')
+        for i, temp in enumerate(payload_value):
+            if i:
+                payload_writer.write(', ')
+            payload_writer.write(json.dumps(temp))
+        payload_writer.write(']')
+    else:
+        payload_writer.write(json.dumps(payload_value))
+
+
+# bytes of the json of payload_value in one bytearray of the exact length
+def payload_json_bytes(payload_value):
+    payload_counter = payload_stream()
+    payload_json_write(payload_counter, payload_value)
+    payload_bytes = bytearray(payload_counter.length)
+    payload_json_write(payload_stream(payload_bytes), payload_value)
+    return payload_bytes
+
+
+# length prefixed utf-8 of text, at most 255 bytes. No text (False, None) is empty, sensor_id is False when no sensor was found
+def payload_text_pack(text):
+    text_bytes = str(text).encode()[:255] if text else b''
+    return bytes([len(text_bytes)]) + text_bytes
+
+
+# binary frame of the payload of one device (its "sensor", "battery", "device" and "diagnostics" dictionaries), series in the order of
+# sensor_id_list. The static fields are included when their crc is not payload_static_crc, the one of the last sent frame, 0 to include them.
+# Returns (frame, crc of the static fields)
+def payload_binary_pack(payload_dictionary, sensor_id_list, payload_static_crc):
+    sensor_dictionary = payload_dictionary['sensor']
+    series_list = [sensor_dictionary['tempC_by_sensor_id'][sensor_id] for sensor_id in sensor_id_list]
+    series_rows = len(series_list[0]) if series_list else 0
+    payload_flags = 0
+
+    # static fields, the consumer keeps the last ones it got for the device
+    payload_static = struct.pack(Constant_payload_static_format, sensor_dictionary['record_data_interval_ms'], sensor_dictionary['send_data_interval_min'])
+    payload_static += payload_text_pack(payload_dictionary['device']['device']) + payload_text_pack(payload_dictionary['device']['sensor_id']) + bytes([len(sensor_id_list)])
+    for sensor_id in sensor_id_list:
+        payload_static += payload_text_pack(sensor_id)
+    payload_static_crc_new = ubinascii.crc32(payload_static)
+    if payload_static_crc_new != payload_static_crc:
+        payload_flags |= Constant_payload_flag_static
+    if sensor_dictionary.get('spooled'):
+        payload_flags |= Constant_payload_flag_spooled
+    energy_dictionary = payload_dictionary['battery'].get('energy')
+    if energy_dictionary:
+        payload_flags |= Constant_payload_flag_energy
+    diagnostics_dictionary = payload_dictionary.get('diagnostics')
+    if diagnostics_dictionary:
+        payload_flags |= Constant_payload_flag_diagnostics
+
+    payload_frame = bytearray(struct.pack(
+        Constant_payload_header_format,
+        Constant_payload_version,
+        payload_flags,
+        len(series_list),
+        series_rows,
+        sensor_dictionary['ts_base'] or 0,
+        sensor_dictionary['ts_interval_ms'] or 0,
+        sensor_dictionary['record_interval_ms'],
+        int(payload_dictionary['battery']['volts'] * 1000),
+        max(0, min(255, int(payload_dictionary['battery']['percentage']))),
+        sensor_dictionary['power_up_ms'],
+        sensor_dictionary['conversion_ms'],
+        len(sensor_dictionary['ts_gaps'])
+    ))
+    for ts_gap in sensor_dictionary['ts_gaps']:
+        payload_frame += struct.pack(Constant_payload_gap_format, *ts_gap)
+    # readings in centi-degrees, error codes as in rtc memory, each sensor newest first
+    payload_readings_offset = len(payload_frame)
+    payload_frame.extend(bytes(2 * series_rows * len(series_list)))
+    for series in series_list:
+        for temp in series:
+            struct.pack_into('<h', payload_frame, payload_readings_offset, temp_to_centi(temp))
+            payload_readings_offset += 2
+    if energy_dictionary:
+        payload_frame += struct.pack(Constant_payload_energy_format, *[float('nan') if energy_dictionary[energy_key] is None else energy_dictionary[energy_key] for energy_key in Constant_payload_energy_keys])
+    if payload_flags & Constant_payload_flag_static:
+        payload_frame += payload_static
+    # diagnostics are for finding problems, not worth a format of their own
+    if diagnostics_dictionary:
+        diagnostics_bytes = json.dumps(diagnostics_dictionary).encode()
+        payload_frame += struct.pack('<H', len(diagnostics_bytes)) + diagnostics_bytes
+    return payload_frame, payload_static_crc_new
+
+
+# [Static]
+# payload - bytes buffered before a write to the socket
+Constant_payload_stream_buffer_bytes = const(512)
+# payload - version of the binary frame, change when the frame changes
+Constant_payload_version = const(1)
+# payload - (version, flags, sensors, readings per sensor, ts_base, ts_interval_ms, record_interval_ms, battery mV, battery %, power_up_ms,
+# conversion_ms, gaps)
+Constant_payload_header_format = '<BBBHIIIHBhhB'
+# payload - per gap in the timestamps (reading, timestamp, interval ms)
+Constant_payload_gap_format = '<HII'
+# payload - energy ledger of the battery, nan when not known
+Constant_payload_energy_format = '<ffff'
+Constant_payload_energy_keys = ('used_mah', 'average_ma', 'average_ma_since_send', 'days_remaining')
+# payload - (record_data_interval_ms, send_data_interval_min) then device, sensor_id and the sensor ids as length prefixed text
+Constant_payload_static_format = '<IH'
+# payload - the static fields are in a frame at least every this many sends, a consumer that starts late can decode frames within a day at an
+# hourly send interval
+Constant_payload_static_every_sends = const(24)
+# payload - flags of what follows the readings
+Constant_payload_flag_static = const(1)
+Constant_payload_flag_spooled = const(2)
+Constant_payload_flag_energy = const(4)
+Constant_payload_flag_diagnostics = const(8)
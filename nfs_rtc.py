@@ -0,0 +1,972 @@
+# NFS - rtc memory state, readings, time segments, flash spool and deep sleep
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import machine
+import os
+import gc
+import struct
+import ubinascii
+from nfs_sensor import ds18b20_rom_from_serial_number
+from micropython import const
+
+
+# noinspection PyPep8Naming
+class series_reversed_view:
+    """Readings of one sensor laid out as in rtc memory (first row, last row, deltas) in buffer, newest first. Walks the deltas back from the
+    last row on every iteration so the readings are never copied"""
+    def __init__(self, buffer, first_offset, series_count, series_rows, series_bytes, series_index):
+        self.buffer = buffer
+        self.first_offset = first_offset
+        self.series_count = series_count
+        self.series_rows = series_rows
+        self.series_bytes = series_bytes
+        self.series_index = series_index
+
+    def __len__(self):
+        return self.series_rows
+
+    def __iter__(self):
+        if not self.series_rows:
+            return
+        delta_offset = self.first_offset + 4 * self.series_count
+        offset = delta_offset + self.series_bytes
+        centi = struct.unpack_from('<h', self.buffer, self.first_offset + 2 * (self.series_count + self.series_index))[0]
+        yield centi_to_temp(centi)
+        for _ in range(self.series_rows - 1):
+            # deltas of a row are in sensor order, back from the last sensor
+            for i in range(self.series_count - 1, -1, -1):
+                delta, offset = varint_unpack_before(self.buffer, delta_offset, offset)
+                if i == self.series_index:
+                    centi -= delta
+            yield centi_to_temp(centi)
+
+
+# [ Functions ]
+# rtc memory state that is kept across deep sleep, starts with the default
+def rtc_state_default_dictionary():
+    rtc_state_dictionary = dict([(rtc_state_field[0], 0) for rtc_state_field in Constant_rtc_state_fields])
+    rtc_state_dictionary['magic'] = Constant_rtc_state_magic
+    rtc_state_dictionary['version'] = Constant_rtc_state_version
+    rtc_state_dictionary['wake_late_ms'] = Constant_wake_late_default_ms
+    rtc_state_dictionary['wifi_bssid'] = bytes(6)
+    rtc_state_dictionary['mqtt_ip'] = bytes(4)
+    return rtc_state_dictionary
+
+
+# size in bytes of the rtc state at the start of rtc memory
+def rtc_state_size():
+    return struct.calcsize('<' + ''.join([rtc_state_field[1] for rtc_state_field in Constant_rtc_state_fields]))
+
+
+# rtc state dictionary from the start of rtc memory, rtc memory from other software gets the default state
+def rtc_state_unpack(rtc_memory):
+    if len(rtc_memory) < rtc_state_size():
+        return rtc_state_default_dictionary()
+    rtc_state_dictionary = dict(zip([rtc_state_field[0] for rtc_state_field in Constant_rtc_state_fields], struct.unpack_from('<' + ''.join([rtc_state_field[1] for rtc_state_field in Constant_rtc_state_fields]), rtc_memory)))
+    if rtc_state_dictionary['magic'] != Constant_rtc_state_magic or rtc_state_dictionary['version'] != Constant_rtc_state_version:
+        return rtc_state_default_dictionary()
+    return rtc_state_dictionary
+
+
+# write the rtc state dictionary in place at the start of rtc memory
+def rtc_state_pack_into(rtc_state_dictionary, rtc_memory):
+    struct.pack_into('<' + ''.join([rtc_state_field[1] for rtc_state_field in Constant_rtc_state_fields]), rtc_memory, 0, *[rtc_state_dictionary[rtc_state_field[0]] for rtc_state_field in Constant_rtc_state_fields])
+
+
+# size in bytes of the config snapshot after the rtc state
+def rtc_config_size():
+    return struct.calcsize('<' + ''.join([rtc_config_field[1] for rtc_config_field in Constant_rtc_config_fields])) + 8 * Constant_rtc_sensors_max
+
+
+# offset in rtc memory of the phase profile, after the rtc state and config snapshot
+def rtc_profile_offset():
+    return rtc_state_size() + rtc_config_size()
+
+
+# offset in rtc memory of the statistics of the known wifi networks, after the phase profile
+def rtc_wifi_networks_offset():
+    return rtc_profile_offset() + len(Constant_profile_phases) * struct.calcsize(Constant_profile_phase_format)
+
+
+# offset in rtc memory of the time segments, after the statistics of the known wifi networks
+def rtc_time_segments_offset():
+    return rtc_wifi_networks_offset() + Constant_wifi_networks_max * struct.calcsize(Constant_wifi_network_format)
+
+
+# keep the settings a record-only wake needs in rtc memory after the rtc state, with a crc. Not kept with more sensors than fit
+def rtc_config_pack_into(rtc_memory, device_settings_dictionary, wifi_settings_dictionary):
+    if len(device_settings_dictionary['ds18b20_sn_list']) > Constant_rtc_sensors_max:
+        return
+    rtc_config_dictionary = dict(wifi_settings_dictionary)
+    rtc_config_dictionary['version'] = Constant_rtc_config_version
+    rtc_config_dictionary['sensor_count'] = len(device_settings_dictionary['ds18b20_sn_list'])
+    # no alarm is kept as nan
+    for alarm_setting in ('alarm_low_c', 'alarm_high_c'):
+        if rtc_config_dictionary[alarm_setting] is None:
+            rtc_config_dictionary[alarm_setting] = float('nan')
+    rtc_config_format = '<' + ''.join([rtc_config_field[1] for rtc_config_field in Constant_rtc_config_fields])
+    struct.pack_into(rtc_config_format, rtc_memory, rtc_state_size(), 0, *[rtc_config_dictionary[rtc_config_field[0]] for rtc_config_field in Constant_rtc_config_fields[1:]])
+    for i, ds18b20_serial_number in enumerate(device_settings_dictionary['ds18b20_sn_list']):
+        rtc_memory[rtc_state_size() + struct.calcsize(rtc_config_format) + 8 * i:rtc_state_size() + struct.calcsize(rtc_config_format) + 8 * i + 8] = ds18b20_rom_from_serial_number(ds18b20_serial_number)
+    struct.pack_into('<I', rtc_memory, rtc_state_size(), ubinascii.crc32(rtc_memory[rtc_state_size() + 4:rtc_state_size() + rtc_config_size()]))
+
+
+# (device settings, wifi settings) with only the settings a record-only wake needs from the config snapshot in rtc memory, None if there is no valid one
+def rtc_config_unpack(rtc_memory):
+    if len(rtc_memory) < rtc_state_size() + rtc_config_size():
+        return None
+    if struct.unpack_from('<I', rtc_memory, rtc_state_size())[0] != ubinascii.crc32(rtc_memory[rtc_state_size() + 4:rtc_state_size() + rtc_config_size()]):
+        return None
+    rtc_config_format = '<' + ''.join([rtc_config_field[1] for rtc_config_field in Constant_rtc_config_fields])
+    wifi_settings_dictionary = dict(zip([rtc_config_field[0] for rtc_config_field in Constant_rtc_config_fields], struct.unpack_from(rtc_config_format, rtc_memory, rtc_state_size())))
+    if wifi_settings_dictionary['version'] != Constant_rtc_config_version:
+        return None
+    for alarm_setting in ('alarm_low_c', 'alarm_high_c'):
+        if wifi_settings_dictionary[alarm_setting] != wifi_settings_dictionary[alarm_setting]:
+            wifi_settings_dictionary[alarm_setting] = None
+    device_settings_dictionary = {
+        "ds18b20_sn_list": [ubinascii.hexlify(rtc_memory[rtc_state_size() + struct.calcsize(rtc_config_format) + 8 * i:rtc_state_size() + struct.calcsize(rtc_config_format) + 8 * i + 8]).decode('UTF-8').upper() for i in range(wifi_settings_dictionary['sensor_count'])]
+    }
+    return device_settings_dictionary, wifi_settings_dictionary
+
+
+# settings were changed, drop the config snapshot in rtc memory so the next station wake reads flash
+def rtc_config_invalidate():
+    # noinspection PyArgumentList
+    rtc_read_memory = machine.RTC().memory()
+    if len(rtc_read_memory) >= rtc_state_size() + 4:
+        rtc_memory = bytearray(rtc_read_memory)
+        rtc_memory[rtc_state_size():rtc_state_size() + 4] = b'\xff\xff\xff\xff'
+        rtc_memory[rtc_state_size() + 4] = rtc_memory[rtc_state_size() + 4] ^ 0xFF
+        # noinspection PyArgumentList
+        machine.RTC().memory(rtc_memory)
+
+
+# temperature to int centi-degrees for the rtc readings, error codes (996, 998, 999) are kept above Constant_rtc_series_error_offset
+def temp_to_centi(temp):
+    if temp >= Constant_temp_error_code_min:
+        return Constant_rtc_series_error_offset + int(temp) - Constant_temp_error_code_min
+    return int(round(temp * 100))
+
+
+# int centi-degrees from the rtc readings back to temperature or error code
+def centi_to_temp(centi):
+    if centi >= Constant_rtc_series_error_offset:
+        return centi - Constant_rtc_series_error_offset + Constant_temp_error_code_min
+    return centi / 100
+
+
+# zigzag and varint encode an int into buffer at offset, returns the offset after it. Small changes up or down take 1 byte
+def varint_pack_into(value, buffer, offset):
+    value = value << 1 if value >= 0 else ((-value) << 1) - 1
+    while value > 0x7F:
+        buffer[offset] = (value & 0x7F) | 0x80
+        value >>= 7
+        offset += 1
+    buffer[offset] = value
+    return offset + 1
+
+
+# zigzag and varint decode an int from buffer at offset, returns (value, offset after it)
+def varint_unpack_from(buffer, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1), offset
+
+
+# zigzag and varint decode the int that ends at end_offset in buffer, varints start at start_offset. Returns (value, offset of it). A varint ends
+# at the first byte without the high bit, so the one before it ends where the byte before has no high bit
+def varint_unpack_before(buffer, start_offset, end_offset):
+    offset = end_offset - 1
+    while offset > start_offset and buffer[offset - 1] & 0x80:
+        offset -= 1
+    return varint_unpack_from(buffer, offset)[0], offset
+
+
+# rtc readings after the rtc state and time segments: first row and last row as int16 per sensor, then one varint delta per sensor for every row after the first
+# offset in rtc memory of the first row, the last row and the deltas
+def rtc_series_offsets(series_count):
+    first_offset = rtc_previous_offset() + 2 * Constant_rtc_sensors_max
+    return first_offset, first_offset + 2 * series_count, first_offset + 4 * series_count
+
+
+# time segments of the rtc readings oldest first, [first row, clock time in s of first row, interval in ms]. A gap in the readings starts a new segment
+def rtc_time_segments_read(rtc_memory, rtc_state_dictionary):
+    return [list(struct.unpack_from(Constant_rtc_time_segment_format, rtc_memory, rtc_time_segments_offset() + i * struct.calcsize(Constant_rtc_time_segment_format))) for i in range(rtc_state_dictionary['time_segments'])]
+
+
+# write time segments in place after the rtc state
+def rtc_time_segments_write(rtc_memory, rtc_state_dictionary, time_segment_list):
+    for i, time_segment in enumerate(time_segment_list):
+        struct.pack_into(Constant_rtc_time_segment_format, rtc_memory, rtc_time_segments_offset() + i * struct.calcsize(Constant_rtc_time_segment_format), *time_segment)
+    rtc_state_dictionary['time_segments'] = len(time_segment_list)
+
+
+# True if a reading at time_s does not follow the last time segment (missed wakes, other interval) and needs a new time segment
+def rtc_time_segment_gap(rtc_memory, rtc_state_dictionary, time_s, interval_ms):
+    if rtc_state_dictionary['series_rows'] == 0:
+        return False
+    if rtc_state_dictionary['time_segments'] == 0:
+        return True
+    time_segment = rtc_time_segments_read(rtc_memory, rtc_state_dictionary)[-1]
+    return time_segment[2] != interval_ms or 2 * abs((time_s - time_segment[1]) * 1000 - (rtc_state_dictionary['series_rows'] - time_segment[0]) * time_segment[2]) > interval_ms
+
+
+# move the time segments of the rtc readings with the clock, when the clock is set for the first time since power on
+def rtc_time_segments_shift(rtc_memory, rtc_state_dictionary, shift_s):
+    time_segment_list = rtc_time_segments_read(rtc_memory, rtc_state_dictionary)
+    for time_segment in time_segment_list:
+        time_segment[1] += shift_s
+    rtc_time_segments_write(rtc_memory, rtc_state_dictionary, time_segment_list)
+
+
+# timestamps of readings newest first: unix time of the newest reading and interval, then [index, unix time, interval] where a gap starts. None if the clock was never set
+def time_stamps_dictionary(time_segment_list, series_rows, time_synced):
+    if not time_synced or not time_segment_list or not series_rows:
+        return {"ts_base": None, "ts_interval_ms": None, "ts_gaps": []}
+    time_stamp_list = []
+    end_row = series_rows
+    for time_segment in reversed(time_segment_list):
+        time_stamp_list.append([series_rows - end_row, Constant_unix_epoch_offset_s + time_segment[1] + ((end_row - 1 - time_segment[0]) * time_segment[2] + 500) // 1000, time_segment[2]])
+        end_row = time_segment[0]
+    return {"ts_base": time_stamp_list[0][1], "ts_interval_ms": time_stamp_list[0][2], "ts_gaps": time_stamp_list[1:]}
+
+
+# offset in rtc memory of the last sent reading of each sensor, int16 centi-degrees after the time segments
+def rtc_published_offset():
+    return rtc_time_segments_offset() + Constant_rtc_time_segments_max * struct.calcsize(Constant_rtc_time_segment_format)
+
+
+# keep the readings that were just sent and when, the deadband is kept around them
+def rtc_published_write(rtc_memory, rtc_state_dictionary, tempC_list, time_s):
+    published_list = [temp_to_centi(temp) for temp in tempC_list[:Constant_rtc_sensors_max]]
+    struct.pack_into('<' + 'h' * len(published_list), rtc_memory, rtc_published_offset(), *published_list)
+    rtc_state_dictionary['published_count'] = len(published_list)
+    rtc_state_dictionary['published_s'] = time_s
+
+
+# report by exception, True if a reading left the deadband around the last sent reading, crossed an alarm or the heartbeat is due
+def deadband_send_due(rtc_memory, rtc_state_dictionary, tempC_list, wifi_settings_dictionary, time_s):
+    if not rtc_state_dictionary['published_s'] or rtc_state_dictionary['published_count'] != min(len(tempC_list), Constant_rtc_sensors_max):
+        return True
+    if time_s - rtc_state_dictionary['published_s'] >= wifi_settings_dictionary['heartbeat_min'] * 60:
+        return True
+    published_list = struct.unpack_from('<' + 'h' * rtc_state_dictionary['published_count'], rtc_memory, rtc_published_offset())
+    for temp, published_centi in zip(tempC_list, published_list):
+        published_temp = centi_to_temp(published_centi)
+        # sensor error started or ended
+        if (temp >= Constant_temp_error_code_min) != (published_temp >= Constant_temp_error_code_min):
+            return True
+        if temp >= Constant_temp_error_code_min:
+            continue
+        if abs(temp - published_temp) > wifi_settings_dictionary['deadband_c']:
+            return True
+        for alarm_c in (wifi_settings_dictionary['alarm_low_c'], wifi_settings_dictionary['alarm_high_c']):
+            if alarm_c is not None and (temp < alarm_c) != (published_temp < alarm_c):
+                return True
+    return False
+
+
+# a send wake failed to send, the next send waits send_backoff_min after the first failure in a row and twice as long after each next one,
+# up to send_backoff_max_min
+def send_backoff(rtc_state_dictionary, wifi_settings_dictionary, time_s):
+    rtc_state_dictionary['send_failures'] = min(rtc_state_dictionary['send_failures'] + 1, 0xFF)
+    backoff_s = min(wifi_settings_dictionary['send_backoff_min'] * 60 << min(rtc_state_dictionary['send_failures'] - 1, 16), wifi_settings_dictionary['send_backoff_max_min'] * 60)
+    rtc_state_dictionary['send_retry_s'] = time_s + backoff_s
+
+
+# True while the send after a failed one is waiting out its backoff, the wake records and sleeps without trying wifi
+def send_deferred(rtc_state_dictionary, wifi_settings_dictionary, time_s):
+    if not rtc_state_dictionary['send_failures']:
+        return False
+    # a retry time further away than the longest backoff is from a clock that was set back, send now
+    return time_s < rtc_state_dictionary['send_retry_s'] <= time_s + wifi_settings_dictionary['send_backoff_max_min'] * 60
+
+
+# offset in rtc memory of the last reading of each sensor, int16 centi-degrees after the last sent readings
+def rtc_previous_offset():
+    return rtc_published_offset() + 2 * Constant_rtc_sensors_max
+
+
+# swap the last reading of each sensor in rtc memory for this wakes readings, returns the last readings
+def rtc_previous_swap(rtc_memory, rtc_state_dictionary, tempC_list):
+    previous_list = [centi_to_temp(centi) for centi in struct.unpack_from('<' + 'h' * rtc_state_dictionary['previous_count'], rtc_memory, rtc_previous_offset())]
+    current_list = [temp_to_centi(temp) for temp in tempC_list[:Constant_rtc_sensors_max]]
+    struct.pack_into('<' + 'h' * len(current_list), rtc_memory, rtc_previous_offset(), *current_list)
+    rtc_state_dictionary['previous_count'] = len(current_list)
+    return previous_list
+
+
+# adaptive sampling, interval in ms to the next reading from how fast the readings change, kept between adaptive_min_ms and adaptive_max_ms.
+# Goes to the min interval when a reading changed more than adaptive_step_c, halves when the average change over an interval is above adaptive_step_c
+# and doubles after Constant_adaptive_flat_wakes wakes where the average change over the doubled interval stays under adaptive_step_c
+def adaptive_interval_ms(rtc_memory, rtc_state_dictionary, tempC_list, wifi_settings_dictionary):
+    interval_ms = min(max(rtc_state_dictionary['interval_ms'] or wifi_settings_dictionary['record_data_interval_ms'], wifi_settings_dictionary['adaptive_min_ms']), wifi_settings_dictionary['adaptive_max_ms'])
+    previous_list = rtc_previous_swap(rtc_memory, rtc_state_dictionary, tempC_list)
+    # largest change of any sensor since the last reading, sensor errors are left out
+    change_list = [abs(temp - previous_temp) for temp, previous_temp in zip(tempC_list, previous_list) if temp < Constant_temp_error_code_min and previous_temp < Constant_temp_error_code_min]
+    if change_list and len(previous_list) == min(len(tempC_list), Constant_rtc_sensors_max):
+        # average change in centi-degrees per hour
+        rtc_state_dictionary['adaptive_rate'] = min(int((3 * rtc_state_dictionary['adaptive_rate'] + max(change_list) * 100 * 3600000 / (rtc_state_dictionary['interval_ms'] or interval_ms)) / 4), 0xFFFF)
+        if max(change_list) > wifi_settings_dictionary['adaptive_step_c']:
+            rtc_state_dictionary['adaptive_flat_wakes'] = 0
+            interval_ms = wifi_settings_dictionary['adaptive_min_ms']
+        elif rtc_state_dictionary['adaptive_rate'] * interval_ms > wifi_settings_dictionary['adaptive_step_c'] * 100 * 3600000:
+            rtc_state_dictionary['adaptive_flat_wakes'] = 0
+            interval_ms = max(interval_ms // 2, wifi_settings_dictionary['adaptive_min_ms'])
+        elif rtc_state_dictionary['adaptive_rate'] * interval_ms * 2 < wifi_settings_dictionary['adaptive_step_c'] * 100 * 3600000:
+            rtc_state_dictionary['adaptive_flat_wakes'] += 1
+            if rtc_state_dictionary['adaptive_flat_wakes'] >= Constant_adaptive_flat_wakes:
+                rtc_state_dictionary['adaptive_flat_wakes'] = 0
+                interval_ms = min(interval_ms * 2, wifi_settings_dictionary['adaptive_max_ms'])
+        else:
+            rtc_state_dictionary['adaptive_flat_wakes'] = 0
+    rtc_state_dictionary['interval_ms'] = interval_ms
+    return interval_ms
+
+
+# add the readings of this wake to the rtc readings, returns the interval in ms to the next reading
+def record_reading(rtc_memory, rtc_state_dictionary, tempC_list, wifi_settings_dictionary, time_s):
+    interval_ms = wifi_settings_dictionary['record_data_interval_ms']
+    # adaptive sampling is on when adaptive_min_ms is set
+    if 0 < wifi_settings_dictionary['adaptive_min_ms'] < wifi_settings_dictionary['adaptive_max_ms']:
+        interval_ms = adaptive_interval_ms(rtc_memory, rtc_state_dictionary, tempC_list, wifi_settings_dictionary)
+    else:
+        rtc_state_dictionary['interval_ms'] = 0
+    # a change of interval starts a new time segment, so the time of every reading is known
+    rtc_series_append_spool(rtc_memory, rtc_state_dictionary, tempC_list, time_s, interval_ms)
+    return interval_ms
+
+
+# clock time in ms, the clock keeps running in deep sleep
+def clock_ms():
+    if hasattr(time, 'time_ns'):
+        return time.time_ns() // 1000000
+    return time.time() * 1000
+
+
+# add one drift sample (ppm, + is the clock running fast) at a temperature, older samples count less and less
+def drift_learn(rtc_state_dictionary, temp, drift_ppm):
+    if abs(drift_ppm) > Constant_drift_max_ppm:
+        print('Error: drift {0} ppm'.format(drift_ppm))
+        return
+    for drift_sum, drift_value in (('drift_s0', 1), ('drift_s1', temp), ('drift_s2', temp * temp), ('drift_sd', drift_ppm), ('drift_std', temp * drift_ppm)):
+        rtc_state_dictionary[drift_sum] = rtc_state_dictionary[drift_sum] * Constant_drift_forget + drift_value
+
+
+# drift of the rtc oscillator in ppm at a temperature, a line fitted over the drift samples. Only the average drift until the samples cover a range of temperatures
+def drift_ppm(rtc_state_dictionary, temp):
+    if rtc_state_dictionary['drift_s0'] < 1:
+        return 0
+    drift_mean_temp = rtc_state_dictionary['drift_s1'] / rtc_state_dictionary['drift_s0']
+    drift_mean_ppm = rtc_state_dictionary['drift_sd'] / rtc_state_dictionary['drift_s0']
+    drift_temp_variance = rtc_state_dictionary['drift_s2'] / rtc_state_dictionary['drift_s0'] - drift_mean_temp * drift_mean_temp
+    drift_slope = 0
+    if temp is not None and drift_temp_variance >= Constant_drift_temp_variance_min:
+        drift_slope = (rtc_state_dictionary['drift_std'] / rtc_state_dictionary['drift_s0'] - drift_mean_temp * drift_mean_ppm) / drift_temp_variance
+        drift_mean_ppm += drift_slope * (temp - drift_mean_temp)
+    return int(min(max(drift_mean_ppm, -Constant_drift_max_ppm), Constant_drift_max_ppm))
+
+
+# learn how long after the sleep timer the code starts (boot, imports), the next sleep ends that much earlier
+def wake_late_learn(rtc_state_dictionary, wake_clock_ms):
+    wake_late_ms = wake_clock_ms - rtc_state_dictionary['wake_sleep_end_ms']
+    if rtc_state_dictionary['wake_sleep_end_ms'] and machine.reset_cause() == machine.DEEPSLEEP_RESET and 0 <= wake_late_ms < Constant_wake_late_max_ms:
+        rtc_state_dictionary['wake_late_ms'] = (3 * rtc_state_dictionary['wake_late_ms'] + wake_late_ms) // 4
+    rtc_state_dictionary['wake_sleep_end_ms'] = 0
+
+
+# statistics of the known wifi networks are for the networks with this crc, they are cleared with the access point of the last send when the networks changed
+def rtc_wifi_networks_check(rtc_memory, rtc_state_dictionary, wifi_networks_crc):
+    if rtc_state_dictionary['wifi_networks_crc'] == wifi_networks_crc:
+        return
+    rtc_memory[rtc_wifi_networks_offset():rtc_time_segments_offset()] = bytes(rtc_time_segments_offset() - rtc_wifi_networks_offset())
+    rtc_state_dictionary['wifi_networks_crc'] = wifi_networks_crc
+    rtc_state_dictionary['wifi_channel'] = 0
+
+
+# statistics of the known wifi network at wifi_network_index (connects tried, success rate out of 255, average ms to connect)
+def rtc_wifi_network_read(rtc_memory, wifi_network_index):
+    return struct.unpack_from(Constant_wifi_network_format, rtc_memory, rtc_wifi_networks_offset() + wifi_network_index * struct.calcsize(Constant_wifi_network_format))
+
+
+# add a connect to the statistics of the known wifi network at wifi_network_index, the success rate and the ms to connect are averages where
+# the last connect counts a quarter. The ms to connect are only of connects that worked
+def rtc_wifi_network_update(rtc_memory, wifi_network_index, connected, connect_ms):
+    wifi_network_tries, wifi_network_success_rate, wifi_network_connect_ms = rtc_wifi_network_read(rtc_memory, wifi_network_index)
+    if not wifi_network_tries:
+        wifi_network_success_rate = 255 if connected else 0
+    else:
+        wifi_network_success_rate = (3 * wifi_network_success_rate + (255 if connected else 0)) // 4
+    if connected:
+        connect_ms = min(connect_ms, 0xFFFF)
+        wifi_network_connect_ms = (3 * wifi_network_connect_ms + connect_ms) // 4 if wifi_network_connect_ms else connect_ms
+    struct.pack_into(Constant_wifi_network_format, rtc_memory, rtc_wifi_networks_offset() + wifi_network_index * struct.calcsize(Constant_wifi_network_format), min(wifi_network_tries + 1, 0xFF), wifi_network_success_rate, wifi_network_connect_ms)
+
+
+# start timing the phases of this wake from ticks_ms, the ms of each phase this wake are kept in the rtc state dictionary until the deep sleep
+def profile_start(rtc_state_dictionary, ticks_ms):
+    rtc_state_dictionary['profile_ticks_ms'] = ticks_ms
+    rtc_state_dictionary['profile_wake_ms'] = [None] * len(Constant_profile_phases)
+
+
+# end a phase at ticks_ms (now if None), the ms since the end of the last phase are added to it
+def profile_mark(rtc_state_dictionary, phase, ticks_ms=None):
+    if ticks_ms is None:
+        ticks_ms = time.ticks_ms()
+    phase_index = Constant_profile_phases.index(phase)
+    phase_ms = max(0, time.ticks_diff(ticks_ms, rtc_state_dictionary['profile_ticks_ms']))
+    rtc_state_dictionary['profile_wake_ms'][phase_index] = (rtc_state_dictionary['profile_wake_ms'][phase_index] or 0) + phase_ms
+    rtc_state_dictionary['profile_ticks_ms'] = ticks_ms
+
+
+# end the ds18b20 phases, waiting for the conversion then reading the scratchpads
+def profile_mark_sensor(rtc_state_dictionary, ds18b20_conversion):
+    profile_mark(rtc_state_dictionary, 'sensor_convert', ds18b20_conversion.get('read_ticks_ms'))
+    profile_mark(rtc_state_dictionary, 'sensor_read')
+
+
+# add the phases of this wake to the phase profile in rtc memory, (total ms, ms of the longest wake, wakes) per phase since it was last sent
+def rtc_profile_add(rtc_memory, rtc_state_dictionary):
+    profile_phase_size = struct.calcsize(Constant_profile_phase_format)
+    # no wakes means the profile was sent or the rtc state is new, the bytes are left from before
+    if not rtc_state_dictionary['profile_wakes']:
+        rtc_memory[rtc_profile_offset():rtc_time_segments_offset()] = bytes(len(Constant_profile_phases) * profile_phase_size)
+    for phase_index, phase_ms in enumerate(rtc_state_dictionary['profile_wake_ms']):
+        if phase_ms is None:
+            continue
+        phase_offset = rtc_profile_offset() + phase_index * profile_phase_size
+        total_ms, longest_ms, wakes = struct.unpack_from(Constant_profile_phase_format, rtc_memory, phase_offset)
+        struct.pack_into(Constant_profile_phase_format, rtc_memory, phase_offset, min(total_ms + phase_ms, 0xFFFFFFFF), min(max(longest_ms, phase_ms), 0xFFFF), min(wakes + 1, 0xFFFF))
+    rtc_state_dictionary['profile_wakes'] = min(rtc_state_dictionary['profile_wakes'] + 1, 0xFFFF)
+
+
+# diagnostics of the wakes since the phase profile was last sent, {phase: [total ms, ms of the longest wake, wakes]} for the phases that ran.
+# None if there are no wakes. The phases of this wake are added at the deep sleep, so they are sent with the next send
+def profile_diagnostics_dictionary(rtc_memory, rtc_state_dictionary):
+    if not rtc_state_dictionary['profile_wakes']:
+        return None
+    profile_phase_size = struct.calcsize(Constant_profile_phase_format)
+    phase_ms_dictionary = {}
+    for phase_index, phase in enumerate(Constant_profile_phases):
+        total_ms, longest_ms, wakes = struct.unpack_from(Constant_profile_phase_format, rtc_memory, rtc_profile_offset() + phase_index * profile_phase_size)
+        if wakes:
+            phase_ms_dictionary[phase] = [total_ms, longest_ms, wakes]
+    return {
+        "wakes": rtc_state_dictionary['profile_wakes'],
+        "wake_late_ms": rtc_state_dictionary['wake_late_ms'],
+        "phase_ms": phase_ms_dictionary
+    }
+
+
+# energy ledger, add the charge used by this wake from its phases and the deep sleep after it. Charge is in uAs (mA x ms), the same
+# for the battery since it was put in and since the last send. The ds18b20(s) are counted as powered during the sensor phases
+def energy_ledger_add(rtc_state_dictionary, wifi_settings_dictionary, sleep_ms):
+    awake_ms = rtc_state_dictionary['wake_late_ms']
+    radio_ms = 0
+    sensor_ms = 0
+    for phase_index, phase_ms in enumerate(rtc_state_dictionary['profile_wake_ms']):
+        if phase_ms is None:
+            continue
+        awake_ms += phase_ms
+        if Constant_profile_phases[phase_index] in Constant_energy_radio_phases:
+            radio_ms += phase_ms
+        elif Constant_profile_phases[phase_index] in Constant_energy_sensor_phases:
+            sensor_ms += phase_ms
+    charge_uas = int(awake_ms * wifi_settings_dictionary['energy_awake_ma'] + radio_ms * wifi_settings_dictionary['energy_radio_ma'] + sensor_ms * wifi_settings_dictionary['energy_sensor_ma'] + sleep_ms * wifi_settings_dictionary['energy_sleep_ma'])
+    for energy_key in ('energy', 'energy_send'):
+        rtc_state_dictionary[energy_key + '_uas'] += charge_uas
+        rtc_state_dictionary[energy_key + '_ms'] += awake_ms + sleep_ms
+
+
+# energy ledger, the ledger lives in the rtc state and is saved to flash on send wakes. When the rtc state was lost the ledger is read back
+# from flash, unless the machine was powered on which is taken as a new battery
+def energy_ledger_restore(rtc_state_dictionary):
+    if rtc_state_dictionary['energy_ms']:
+        return
+    if machine.reset_cause() == machine.PWRON_RESET:
+        return
+    try:
+        with open(Constant_energy_file, 'rb') as energy_file:
+            rtc_state_dictionary['energy_uas'], rtc_state_dictionary['energy_ms'] = struct.unpack(Constant_energy_file_format, energy_file.read())
+    except Exception as e:
+        print('Error: {0}'.format(e))
+
+
+# energy ledger, save the ledger of the battery to flash
+def energy_ledger_save(rtc_state_dictionary):
+    try:
+        with open(Constant_energy_file, 'wb') as energy_file:
+            energy_file.write(struct.pack(Constant_energy_file_format, rtc_state_dictionary['energy_uas'], rtc_state_dictionary['energy_ms']))
+    except Exception as e:
+        print('Error: {0}'.format(e))
+
+
+# energy ledger, charge used from the battery and the days it has left at the average current since it was put in. None until there is a ledger
+def energy_battery_dictionary(rtc_state_dictionary, wifi_settings_dictionary):
+    if not rtc_state_dictionary['energy_ms']:
+        return None
+    # uAs per ms is mA
+    average_ma = rtc_state_dictionary['energy_uas'] / rtc_state_dictionary['energy_ms']
+    remaining_uas = max(0, wifi_settings_dictionary['battery_capacity_mah'] * 3600000 - rtc_state_dictionary['energy_uas'])
+    return {
+        "used_mah": round(rtc_state_dictionary['energy_uas'] / 3600000, 2),
+        "average_ma": round(average_ma, 4),
+        "average_ma_since_send": round(rtc_state_dictionary['energy_send_uas'] / rtc_state_dictionary['energy_send_ms'], 4) if rtc_state_dictionary['energy_send_ms'] else None,
+        "days_remaining": round(remaining_uas / average_ma / 86400000, 1) if average_ma > 0 else None
+    }
+
+
+# write rtc state and readings to rtc memory and deep sleep until the next reading. Wakes are kept on whole intervals of clock time since the
+# epoch, so readings stay evenly spaced, with the sleep corrected for the drift of the rtc oscillator at this wakes temperature. Never returns
+def station_deep_sleep(rtc_memory, rtc_state_dictionary, wifi_settings_dictionary, interval_ms, tempC_list, wdt, pull_up_pin_list):
+    # average temperature since the last ntp sync, for learning the drift
+    temp = None
+    for tempC in tempC_list:
+        if tempC < Constant_temp_error_code_min:
+            temp = tempC
+            break
+    if temp is not None:
+        rtc_state_dictionary['drift_temp_sum'] += temp
+        rtc_state_dictionary['drift_temp_count'] = min(rtc_state_dictionary['drift_temp_count'] + 1, 0xFFFF)
+    drift = drift_ppm(rtc_state_dictionary, temp)
+
+    # clock time corrected for the drift since the last ntp sync
+    now_clock_ms = clock_ms()
+    now_ms = now_clock_ms
+    if rtc_state_dictionary['time_sync_s']:
+        now_ms = rtc_state_dictionary['time_sync_s'] * 1000 + (now_clock_ms - rtc_state_dictionary['time_sync_s'] * 1000) * 1000000 // (1000000 + drift)
+    # next whole interval, skip it if it is too close
+    next_ms = (now_ms // interval_ms + 1) * interval_ms
+    if next_ms - now_ms < Constant_sleep_min_ms:
+        next_ms += interval_ms
+    # sleep in rtc oscillator time, ending early by how late the code starts after a wake
+    sleep_ms = max((next_ms - now_ms) * (1000000 + drift) // 1000000 - rtc_state_dictionary['wake_late_ms'], Constant_sleep_min_ms)
+    rtc_state_dictionary['wake_sleep_end_ms'] = now_clock_ms + sleep_ms
+
+    # the phases of this wake are kept with the wakes before until they are sent
+    profile_mark(rtc_state_dictionary, 'sleep')
+    rtc_profile_add(rtc_memory, rtc_state_dictionary)
+    # charge used by this wake and the sleep after it
+    energy_ledger_add(rtc_state_dictionary, wifi_settings_dictionary, sleep_ms)
+
+    # write rtc state and readings to rtc memory
+    rtc_state_pack_into(rtc_state_dictionary, rtc_memory)
+    # noinspection PyArgumentList
+    machine.RTC().memory(rtc_memory[:rtc_series_offsets(rtc_state_dictionary['series_count'])[2] + rtc_state_dictionary['series_bytes']])
+
+    # garbage collection before deep sleap
+    gc.collect()
+    # feed the watchdog timmer
+    wdt.feed()
+
+    # disable pull-up(s) to stop current leakage before sleep
+    for pull_up_pin in pull_up_pin_list:
+        # noinspection PyTypeChecker
+        pull_up_pin.init(pull=None)
+
+    machine.deepsleep(sleep_ms)
+
+
+# rows that fit in rtc memory even if every change between readings takes 2 bytes (changes under 81 deg.C), most take 1 byte
+def rtc_series_capacity_rows(series_count):
+    return 1 + (Constant_rtc_memory_size - rtc_series_offsets(series_count)[2]) // (2 * series_count)
+
+
+# start empty rtc readings if there are none or the sensors changed, series_crc from series_sensors_crc
+def rtc_series_check(rtc_state_dictionary, series_count, series_crc):
+    if rtc_state_dictionary['series_count'] != series_count or rtc_state_dictionary['series_crc'] != series_crc or rtc_series_offsets(series_count)[2] + rtc_state_dictionary['series_bytes'] > Constant_rtc_memory_size:
+        rtc_state_dictionary['series_count'] = series_count
+        rtc_state_dictionary['series_crc'] = series_crc
+        rtc_series_clear(rtc_state_dictionary)
+
+
+# crc of the sensors of the readings in order, readings of other sensors (added, removed, re-ordered) are not labelled with these sensors
+def series_sensors_crc(ds18b20_sn_list):
+    return ubinascii.crc32(''.join(ds18b20_sn_list).encode())
+
+
+# empty the rtc readings, the bytes are left as they are
+def rtc_series_clear(rtc_state_dictionary):
+    rtc_state_dictionary['series_rows'] = 0
+    rtc_state_dictionary['series_bytes'] = 0
+    rtc_state_dictionary['time_segments'] = 0
+
+
+# drop the oldest row, the second row becomes the first and its deltas are removed from the front of the stream
+def rtc_series_drop_oldest(rtc_memory, rtc_state_dictionary):
+    series_count = rtc_state_dictionary['series_count']
+    first_offset, last_offset, delta_offset = rtc_series_offsets(series_count)
+    if rtc_state_dictionary['series_rows'] <= 1:
+        rtc_series_clear(rtc_state_dictionary)
+        return
+    first_row = list(struct.unpack_from('<' + 'h' * series_count, rtc_memory, first_offset))
+    offset = delta_offset
+    for i in range(series_count):
+        delta, offset = varint_unpack_from(rtc_memory, offset)
+        first_row[i] += delta
+    struct.pack_into('<' + 'h' * series_count, rtc_memory, first_offset, *first_row)
+    delta_end = delta_offset + rtc_state_dictionary['series_bytes']
+    rtc_memory[delta_offset:delta_end - (offset - delta_offset)] = rtc_memory[offset:delta_end]
+    rtc_state_dictionary['series_bytes'] -= offset - delta_offset
+    rtc_state_dictionary['series_rows'] -= 1
+    # the first time segment starts one interval later, or is gone if its only row was dropped
+    time_segment_list = rtc_time_segments_read(rtc_memory, rtc_state_dictionary)
+    if len(time_segment_list) > 1 and time_segment_list[1][0] == 1:
+        del time_segment_list[0]
+    elif time_segment_list:
+        time_segment_list[0][1] += (time_segment_list[0][2] + 500) // 1000
+    for time_segment in time_segment_list:
+        if time_segment[0]:
+            time_segment[0] -= 1
+    rtc_time_segments_write(rtc_memory, rtc_state_dictionary, time_segment_list)
+
+
+# add one row of readings taken at clock time_s, one per sensor, in place in rtc memory. Only the new deltas are written, when full the oldest row is dropped
+def rtc_series_append(rtc_memory, rtc_state_dictionary, tempC_list, time_s, interval_ms):
+    series_count = rtc_state_dictionary['series_count']
+    first_offset, last_offset, delta_offset = rtc_series_offsets(series_count)
+    row = [temp_to_centi(temp) for temp in tempC_list[:series_count]]
+    if rtc_state_dictionary['series_rows'] == 0:
+        struct.pack_into('<' + 'h' * series_count, rtc_memory, first_offset, *row)
+        struct.pack_into('<' + 'h' * series_count, rtc_memory, last_offset, *row)
+        rtc_state_dictionary['series_rows'] = 1
+        rtc_state_dictionary['series_bytes'] = 0
+        rtc_time_segments_write(rtc_memory, rtc_state_dictionary, [[0, time_s, interval_ms]])
+        return
+    time_gap = rtc_time_segment_gap(rtc_memory, rtc_state_dictionary, time_s, interval_ms)
+    last_row = struct.unpack_from('<' + 'h' * series_count, rtc_memory, last_offset)
+    # varint can be up to 3 bytes for a change in range of int16
+    delta_bytes = bytearray(3 * series_count)
+    delta_length = 0
+    for i in range(series_count):
+        delta_length = varint_pack_into(row[i] - last_row[i], delta_bytes, delta_length)
+    while (delta_offset + rtc_state_dictionary['series_bytes'] + delta_length > Constant_rtc_memory_size or time_gap and rtc_state_dictionary['time_segments'] >= Constant_rtc_time_segments_max) and rtc_state_dictionary['series_rows'] > 1:
+        rtc_series_drop_oldest(rtc_memory, rtc_state_dictionary)
+    delta_end = delta_offset + rtc_state_dictionary['series_bytes']
+    rtc_memory[delta_end:delta_end + delta_length] = delta_bytes[:delta_length]
+    struct.pack_into('<' + 'h' * series_count, rtc_memory, last_offset, *row)
+    if time_gap:
+        rtc_time_segments_write(rtc_memory, rtc_state_dictionary, rtc_time_segments_read(rtc_memory, rtc_state_dictionary) + [[rtc_state_dictionary['series_rows'], time_s, interval_ms]])
+    rtc_state_dictionary['series_bytes'] += delta_length
+    rtc_state_dictionary['series_rows'] += 1
+
+
+# one view of the temperatures per sensor in the rtc readings, newest first. Valid until the rtc readings change
+def rtc_series_reversed(rtc_memory, rtc_state_dictionary):
+    return series_reversed_from(rtc_memory, rtc_series_offsets(rtc_state_dictionary['series_count'])[0], rtc_state_dictionary['series_count'], rtc_state_dictionary['series_rows'], rtc_state_dictionary['series_bytes'])
+
+
+# one view of the temperatures per sensor from readings laid out as in rtc memory (first row, last row, deltas) starting at first_offset, newest first
+def series_reversed_from(buffer, first_offset, series_count, series_rows, series_bytes):
+    return [series_reversed_view(buffer, first_offset, series_count, series_rows, series_bytes, series_index) for series_index in range(series_count)]
+
+
+# add one row of readings, when rtc memory or the time segments are full the readings are spooled to flash first so none are dropped
+def rtc_series_append_spool(rtc_memory, rtc_state_dictionary, tempC_list, time_s, interval_ms):
+    if rtc_series_offsets(rtc_state_dictionary['series_count'])[2] + rtc_state_dictionary['series_bytes'] + 3 * rtc_state_dictionary['series_count'] > Constant_rtc_memory_size or rtc_state_dictionary['time_segments'] >= Constant_rtc_time_segments_max and rtc_time_segment_gap(rtc_memory, rtc_state_dictionary, time_s, interval_ms):
+        spool_write(rtc_memory, rtc_state_dictionary)
+    rtc_series_append(rtc_memory, rtc_state_dictionary, tempC_list, time_s, interval_ms)
+
+
+# path of a spool segment file
+def spool_segment_path(spool_segment):
+    return '{0}/{1:05d}.bin'.format(Constant_spool_directory, spool_segment)
+
+
+# size in bytes of a spool segment file, 0 if there is none
+def spool_segment_size(spool_segment):
+    try:
+        return os.stat(spool_segment_path(spool_segment))[6]
+    except OSError:
+        return 0
+
+
+# find the spool segments on flash when the spool index in rtc memory was lost (power on, new firmware)
+def spool_index_rebuild(rtc_state_dictionary):
+    try:
+        spool_segment_list = sorted([int(file_name[:-4]) for file_name in os.listdir(Constant_spool_directory) if file_name.endswith('.bin')])
+    except (OSError, ValueError):
+        spool_segment_list = []
+    rtc_state_dictionary['spool_first'] = spool_segment_list[0] if spool_segment_list else 0
+    rtc_state_dictionary['spool_last'] = spool_segment_list[-1] if spool_segment_list else 0
+    rtc_state_dictionary['spool_offset'] = 0
+    rtc_state_dictionary['spool_indexed'] = 1
+
+
+# True if there are spooled readings not yet sent
+def spool_pending(rtc_state_dictionary):
+    return rtc_state_dictionary['spool_first'] != rtc_state_dictionary['spool_last'] or rtc_state_dictionary['spool_offset'] < spool_segment_size(rtc_state_dictionary['spool_first'])
+
+
+# move the rtc readings to the end of the spool as one record padded to whole flash blocks, then clear them. Returns False if flash could not be written
+def spool_write(rtc_memory, rtc_state_dictionary):
+    series_count = rtc_state_dictionary['series_count']
+    first_offset, last_offset, delta_offset = rtc_series_offsets(series_count)
+    record_header = struct.pack(Constant_spool_record_header_format, Constant_spool_record_magic, series_count, rtc_state_dictionary['series_rows'], rtc_state_dictionary['series_bytes'], rtc_state_dictionary['time_segments'], 1 if rtc_state_dictionary['time_sync_s'] else 0, rtc_state_dictionary['series_crc'])
+    record_body = rtc_memory[rtc_time_segments_offset():rtc_time_segments_offset() + rtc_state_dictionary['time_segments'] * struct.calcsize(Constant_rtc_time_segment_format)] + rtc_memory[first_offset:delta_offset + rtc_state_dictionary['series_bytes']]
+    record_length = len(record_header) + len(record_body)
+    record_length += -record_length % Constant_spool_block_bytes
+    try:
+        try:
+            os.mkdir(Constant_spool_directory)
+        except OSError:
+            pass
+        # start a new segment when this record does not fit or the last append was cut short (not whole blocks), its segment is skipped from there
+        # when read. Drop the oldest segment when there are too many
+        if spool_segment_size(rtc_state_dictionary['spool_last']) + record_length > Constant_spool_segment_bytes or spool_segment_size(rtc_state_dictionary['spool_last']) % Constant_spool_block_bytes:
+            rtc_state_dictionary['spool_last'] += 1
+            if rtc_state_dictionary['spool_last'] - rtc_state_dictionary['spool_first'] >= Constant_spool_max_segments:
+                os.remove(spool_segment_path(rtc_state_dictionary['spool_first']))
+                rtc_state_dictionary['spool_first'] += 1
+                rtc_state_dictionary['spool_offset'] = 0
+        record = bytearray(b'\xff' * record_length)
+        record[:len(record_header)] = record_header
+        record[len(record_header):len(record_header) + len(record_body)] = record_body
+        with open(spool_segment_path(rtc_state_dictionary['spool_last']), 'ab') as spool_file:
+            spool_file.write(record)
+    except OSError as e:
+        print('Error: {0}'.format(e))
+        return False
+    rtc_series_clear(rtc_state_dictionary)
+    return True
+
+
+# oldest spooled record not yet sent as (one list of temperatures per sensor newest first, record length, timestamps, crc of its sensors), None if there
+# is none
+def spool_read(rtc_state_dictionary):
+    while True:
+        while rtc_state_dictionary['spool_offset'] >= spool_segment_size(rtc_state_dictionary['spool_first']):
+            if not spool_next_segment(rtc_state_dictionary):
+                return None
+        try:
+            with open(spool_segment_path(rtc_state_dictionary['spool_first']), 'rb') as spool_file:
+                spool_file.seek(rtc_state_dictionary['spool_offset'])
+                record_header = spool_file.read(struct.calcsize(Constant_spool_record_header_format))
+                if len(record_header) != struct.calcsize(Constant_spool_record_header_format):
+                    raise ValueError('spool record header')
+                record_magic, series_count, series_rows, series_bytes, time_segments, time_synced, series_crc = struct.unpack(Constant_spool_record_header_format, record_header)
+                if record_magic != Constant_spool_record_magic or not 0 < series_count <= Constant_rtc_sensors_max or time_segments > Constant_rtc_time_segments_max:
+                    raise ValueError('spool record')
+                record = spool_file.read(time_segments * struct.calcsize(Constant_rtc_time_segment_format) + 4 * series_count + series_bytes)
+                # power was cut while the record was appended
+                if len(record) != time_segments * struct.calcsize(Constant_rtc_time_segment_format) + 4 * series_count + series_bytes:
+                    raise ValueError('spool record length')
+                time_segment_list = [list(struct.unpack_from(Constant_rtc_time_segment_format, record, i * struct.calcsize(Constant_rtc_time_segment_format))) for i in range(time_segments)]
+            record_length = len(record_header) + len(record)
+            return series_reversed_from(record, time_segments * struct.calcsize(Constant_rtc_time_segment_format), series_count, series_rows, series_bytes), record_length + -record_length % Constant_spool_block_bytes, time_stamps_dictionary(time_segment_list, series_rows, time_synced), series_crc
+        except (OSError, ValueError) as e:
+            print('Error: {0}'.format(e))
+            # unreadable record, skip the rest of its segment
+            rtc_state_dictionary['spool_offset'] = spool_segment_size(rtc_state_dictionary['spool_first'])
+
+
+# mark the oldest spooled record as sent
+def spool_advance(rtc_state_dictionary, record_length):
+    rtc_state_dictionary['spool_offset'] += record_length
+    if rtc_state_dictionary['spool_offset'] >= spool_segment_size(rtc_state_dictionary['spool_first']):
+        spool_next_segment(rtc_state_dictionary)
+
+
+# remove the sent oldest segment, returns False if it was the segment being written
+def spool_next_segment(rtc_state_dictionary):
+    try:
+        os.remove(spool_segment_path(rtc_state_dictionary['spool_first']))
+    except OSError:
+        pass
+    rtc_state_dictionary['spool_offset'] = 0
+    if rtc_state_dictionary['spool_first'] == rtc_state_dictionary['spool_last']:
+        return False
+    rtc_state_dictionary['spool_first'] += 1
+    return True
+
+
+# [Static]
+# rtc memory - state kept across deep sleep at the start of rtc memory, (name, struct format). Change Constant_rtc_state_version when changed
+Constant_rtc_state_fields = (
+    ('magic', 'H'),
+    ('version', 'B'),
+    ('battery_mv', 'H'),  # battery voltage cache
+    ('battery_wakes', 'H'),  # wakes since battery voltage was read
+    ('series_count', 'B'),  # readings, one series per sensor
+    ('series_rows', 'H'),  # rows of readings kept
+    ('series_bytes', 'H'),  # bytes of varint deltas after the first and last rows
+    ('series_crc', 'I'),  # crc of the sensors of the readings, series_sensors_crc
+    ('spool_indexed', 'B'),  # 1 once the spool segments on flash were found
+    ('spool_first', 'H'),  # oldest spool segment with readings not yet sent
+    ('spool_offset', 'H'),  # bytes of the oldest spool segment already sent
+    ('spool_last', 'H'),  # spool segment being written
+    ('time_sync_s', 'I'),  # clock time of the last ntp sync, 0 if the clock was not set since power on
+    ('time_segments', 'B'),  # time segments in use after the rtc state
+    ('published_count', 'B'),  # sensors in the last sent readings after the time segments
+    ('published_s', 'I'),  # clock time of the last send, 0 if never sent
+    ('previous_count', 'B'),  # sensors in the last readings after the last sent readings
+    ('interval_ms', 'I'),  # adaptive sampling interval to the next reading, 0 if off
+    ('adaptive_rate', 'H'),  # adaptive sampling average change in centi-degrees per hour
+    ('adaptive_flat_wakes', 'B'),  # adaptive sampling wakes in a row with little change
+    ('drift_s0', 'f'),  # rtc oscillator drift samples, sums of 1, temp, temp^2, ppm, temp*ppm with older samples counting less
+    ('drift_s1', 'f'),
+    ('drift_s2', 'f'),
+    ('drift_sd', 'f'),
+    ('drift_std', 'f'),
+    ('drift_temp_sum', 'f'),  # sum of temperatures since the last ntp sync
+    ('drift_temp_count', 'H'),  # wakes since the last ntp sync with a temperature
+    ('wake_sleep_end_ms', 'Q'),  # clock time the last deep sleep was set to end
+    ('wake_late_ms', 'H'),  # average ms from the end of deep sleep to the start of code
+    ('profile_wakes', 'H'),  # wakes in the phase profile after the config snapshot, 0 once sent
+    ('energy_uas', 'Q'),  # energy ledger, charge in uAs (mA x ms) used since the battery was put in
+    ('energy_ms', 'Q'),  # energy ledger, ms awake and asleep since the battery was put in
+    ('energy_send_uas', 'Q'),  # energy ledger, charge in uAs used since the last send
+    ('energy_send_ms', 'Q'),  # energy ledger, ms awake and asleep since the last send
+    ('wifi_networks_crc', 'I'),  # crc of the known wifi networks the statistics after the phase profile are for
+    ('wifi_network', 'B'),  # known wifi network of the last send
+    ('wifi_bssid', '6s'),  # access point of the last send, for the fast connect
+    ('wifi_channel', 'B'),  # channel of the access point of the last send, 0 scans for the access point
+    ('wifi_rssi', 'b'),  # rssi of the access point of the last send in dBm
+    ('wifi_exit_status', 'H'),  # why the last failed connect to wifi ended, status or timeout
+    ('wifi_failures', 'B'),  # failed connects to wifi since the last send
+    ('espnow_message_id', 'H'),  # id of the last message sent to the esp-now gateway
+    ('espnow_boot_nonce', 'H'),  # random for this rtc state, new after power on, 0 until the first esp-now send
+    ('send_failures', 'B'),  # send wakes in a row that failed to send, 0 once sent
+    ('send_retry_s', 'I'),  # time of the next send after a failed one
+    ('mqtt_server_crc', 'I'),  # crc of the name of the mqtt server mqtt_ip is for, 0 resolves it again
+    ('mqtt_ip', '4s'),  # ip address of the mqtt server
+    ('payload_static_crc', 'I'),  # crc of the static fields of the last sent binary payload
+    ('payload_static_sends', 'B'),  # sends since the static fields were last in a binary payload
+)
+Constant_rtc_state_magic = const(0x4E46)
+Constant_rtc_state_version = const(21)
+# profile - phases of a station wake in order, the ms of each are kept in rtc memory until sent as diagnostics. Change Constant_rtc_state_version when changed
+Constant_profile_phases = (
+    'import',  # start of code to the end of the imports in main.py
+    'config',  # settings from the rtc config snapshot or flash
+    'sensor_power',  # ds18b20 power up and start of the conversion
+    'sensor_convert',  # waiting for what is left of the conversion
+    'sensor_read',  # reading the scratchpads
+    'record',  # rtc state, readings, spool
+    'battery',
+    'wifi_up',  # wifi station on and configured
+    'espnow',  # frames to the esp-now gateway until its ack
+    'wifi_scan',
+    'wifi_associate',  # connect until associated with the access point
+    'wifi_dhcp',  # associated until an ip address
+    'ntp',  # ntp and timestamps
+    'mqtt_connect',  # tcp, tls and mqtt connect, failed attempts included
+    'mqtt_publish',  # publish and disconnect
+    'sleep',  # before the deep sleep
+)
+# profile - per phase (total ms, ms of the longest wake, wakes with the phase)
+Constant_profile_phase_format = '<IHH'
+
+# wifi - max known wifi networks, statistics of each are kept in rtc memory after the phase profile
+Constant_wifi_networks_max = const(4)
+# wifi - per known wifi network (connects tried, success rate out of 255, average ms to connect)
+Constant_wifi_network_format = '<BBH'
+
+# energy ledger - phases with the wifi radio on, energy_radio_ma is added to energy_awake_ma for them
+Constant_energy_radio_phases = ('wifi_up', 'espnow', 'wifi_scan', 'wifi_associate', 'wifi_dhcp', 'ntp', 'mqtt_connect', 'mqtt_publish')
+# energy ledger - phases with the ds18b20(s) powered, energy_sensor_ma is added to energy_awake_ma for them
+Constant_energy_sensor_phases = ('sensor_power', 'sensor_convert', 'sensor_read')
+# energy ledger - file on flash with the ledger of the battery (uAs, ms)
+Constant_energy_file = 'energy.bin'
+Constant_energy_file_format = '<QQ'
+# rtc memory - time segments after the rtc state (first row, clock time in s of first row, interval in ms), a new one for every gap
+Constant_rtc_time_segment_format = '<HII'
+Constant_rtc_time_segments_max = const(8)
+# rtc memory - max sensors whose last sent reading (deadband) and last reading (adaptive sampling) are kept
+Constant_rtc_sensors_max = const(8)
+# rtc memory - config snapshot after the rtc state, settings a record-only wake needs so it does not read flash, then the ds18b20 roms (name, struct format).
+# Change Constant_rtc_config_version when changed
+Constant_rtc_config_fields = (
+    ('crc', 'I'),
+    ('version', 'B'),
+    ('record_data_interval_ms', 'I'),
+    ('send_data_interval_list_length', 'H'),
+    ('ds18b20_resolution', 'B'),
+    ('battery_read_every_wakes', 'H'),
+    ('deadband_c', 'f'),
+    ('alarm_low_c', 'f'),
+    ('alarm_high_c', 'f'),
+    ('heartbeat_min', 'I'),
+    ('adaptive_min_ms', 'I'),
+    ('adaptive_max_ms', 'I'),
+    ('adaptive_step_c', 'f'),
+    ('energy_awake_ma', 'f'),
+    ('energy_radio_ma', 'f'),
+    ('energy_sensor_ma', 'f'),
+    ('energy_sleep_ma', 'f'),
+    ('send_backoff_min', 'H'),
+    ('send_backoff_max_min', 'H'),
+    ('sensor_count', 'B'),
+)
+Constant_rtc_config_version = const(3)
+# rtc memory - bytes of rtc memory available, esp32 machine.RTC().memory() max
+Constant_rtc_memory_size = const(2048)
+# rtc memory - centi-degrees at or above this are error codes
+Constant_rtc_series_error_offset = const(32000)
+# temperatures at or above this are error codes not readings (996, 998, 999)
+Constant_temp_error_code_min = const(900)
+
+# adaptive sampling - wakes in a row with little change before the interval is doubled
+Constant_adaptive_flat_wakes = const(4)
+
+# deep sleep - shortest sleep, a wake closer than this to the next whole interval waits for the one after
+Constant_sleep_min_ms = const(1000)
+# deep sleep - ms from the end of deep sleep to the start of code until it is learned, was measured at 70deg.F
+Constant_wake_late_default_ms = const(2000)
+# deep sleep - a wake later than this is not a normal boot and is not learned from
+Constant_wake_late_max_ms = const(10000)
+# deep sleep - drift samples need at least this long between ntp syncs, the ntp clock is only set to the second
+Constant_drift_learn_min_s = const(60 * 60)
+# deep sleep - drift samples further than this from 0 are errors, also the max correction
+Constant_drift_max_ppm = const(100000)
+# deep sleep - weight of the older drift samples at each new sample
+Constant_drift_forget = 0.9
+# deep sleep - the drift samples need this spread of temperature (deg.C squared) before drift is fitted against temperature
+Constant_drift_temp_variance_min = 1.0
+
+# ntp - seconds from 1970-01-01 to the epoch of time.time(), 2000-01-01 on most ports
+Constant_unix_epoch_offset_s = 946684800 if time.gmtime(0)[0] == 2000 else 0
+
+# spool - directory on flash for readings that did not fit in rtc memory while wifi or mqtt was down
+Constant_spool_directory = 'spool'
+# spool - records are padded to whole flash blocks (pages) so no block is written twice
+Constant_spool_block_bytes = const(256)
+# spool - max bytes of one segment file, a new segment is started when the next record does not fit
+Constant_spool_segment_bytes = const(16384)
+# spool - max segments kept, the oldest is dropped when a new one is needed (bounds flash use)
+Constant_spool_max_segments = const(32)
+# spool - max spooled records sent per wake, the rest are sent on the next wakes
+Constant_spool_drain_per_wake = const(4)
+# spool - record header (magic, series_count, series_rows, series_bytes, time_segments, time_synced, series_crc) then the time segments and readings as in
+# rtc memory
+Constant_spool_record_header_format = '<BBHHBBI'
+Constant_spool_record_magic = const(0xA7)
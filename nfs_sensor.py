@@ -0,0 +1,415 @@
+# NFS - ds18b20 temperature sensors, battery and onboard led
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import machine
+import onewire
+import ds18x20
+from micropython import const
+
+
+# [Exceptions]
+# noinspection PyPep8Naming
+class ds18b20_85C_Exception(Exception):
+    """Raised when the ds18b20 value is 85"""
+    pass
+
+
+# noinspection PyPep8Naming
+class ds18b20_NEG_55C_POS_125C_Exception(Exception):
+    """Raised when the ds18b20 value is less than NEG_55C or greaterthan POS_125C"""
+    pass
+
+
+# noinspection PyPep8Naming
+class ds18b20_scratchpad_Exception(Exception):
+    """Raised when the ds18b20 scratchpad fails the CRC or reads all zeros or all ones"""
+    pass
+
+
+# [ Functions ]
+# mean of samples after dropping the lowest and highest trim fraction, 0.5 is the median
+def trimmed_mean(samples, trim):
+    samples = sorted(samples)
+    trim_count = int(len(samples) * trim)
+    if trim_count * 2 >= len(samples):
+        # median
+        return samples[len(samples) // 2]
+    samples = samples[trim_count:len(samples) - trim_count]
+    return sum(samples) / len(samples)
+
+
+# Battery estimated percentage remaining, also keep from going past 100% or under 0%
+def batt_percent(volts):
+    remaining_percent = int(100 * (volts - Constant_battery_min_voltage) / (Constant_battery_max_voltage - Constant_battery_min_voltage))  # 100 * (adc_volts - BATTERY_MIN_ADC) / (BATTERY_MAX_ADC - BATTERY_MIN_ADC)
+    if remaining_percent > 100:
+        remaining_percent = 100
+    elif remaining_percent < 0:
+        remaining_percent = 0
+    return remaining_percent
+
+
+# Battery (Volts, Remaining%)
+def batt():
+    # supply voltage gpio pin for voltage divider
+    gpio_pos_volts_supply = machine.Pin(Constant_batt_gpio_pos_volts_supply_pin, machine.Pin.OUT)
+
+    # set gpio_pos_volts_supply high/(+)
+    gpio_pos_volts_supply.value(1)
+    # give time for voltage to settle
+    time.sleep_ms(50)
+
+    # analog voltage gpio pin
+    adc_gpio_read_batt_voltage = machine.Pin(Constant_adc_gpio_read_batt_voltage_pin)
+    # Create an ADC object out of our pin object
+    adc_object = machine.ADC(adc_gpio_read_batt_voltage)
+
+    # 11 dB attenuation means full 0.15 - 2.45V range
+    adc_object.atten(adc_object.ATTN_11DB)
+
+    # read voltage, a burst of samples inside the one settle window
+    microvolts_after_divider_samples = [adc_object.read_uv() for _ in range(Constant_battery_adc_samples)]
+
+    # turn off voltage pin used to supply gpio (+)
+    gpio_pos_volts_supply.value(0)
+
+    # filter out adc noise and spikes
+    microvolts_after_divider = trimmed_mean(microvolts_after_divider_samples, Constant_battery_adc_trim)
+
+    # Calculate voltage from microvolts to volts
+    volts_after_divider = microvolts_after_divider / 1000000
+    # convert to original voltage before voltage divider
+    volts = round((volts_after_divider * 1.523809524), 2)  # Voltage In = Voltage Out * (R1+R2/R2) R1=1.1Kohms R2=2.1Kohms
+
+    return volts, batt_percent(volts)
+
+
+# Battery (Volts, Remaining%) from the rtc memory cache, the voltage divider only runs every battery_read_every_wakes wakes or when the cache is stale
+def batt_cached(rtc_state_dictionary, battery_read_every_wakes, record_data_interval_ms):
+    battery_cache_age_ms = rtc_state_dictionary['battery_wakes'] * record_data_interval_ms
+    if rtc_state_dictionary['battery_mv'] == 0 or rtc_state_dictionary['battery_wakes'] >= battery_read_every_wakes or battery_cache_age_ms >= Constant_battery_cache_max_age_ms:
+        volts, remaining_percent = batt()
+        rtc_state_dictionary['battery_mv'] = int(volts * 1000)
+        rtc_state_dictionary['battery_wakes'] = 0
+        return volts, remaining_percent
+    volts = rtc_state_dictionary['battery_mv'] / 1000
+    return volts, batt_percent(volts)
+
+
+# convert human-readable serial number back into bytearray
+def ds18b20_rom_from_serial_number(ds18b20_serial_number):
+    ds18b20rom = bytearray(8)
+    for i in range(8):
+        ds18b20rom[i] = int(ds18b20_serial_number[i * 2:i * 2 + 2], 16)
+    return ds18b20rom
+
+
+# poll ready_function until it returns True or timeout_ms has passed, returns ms waited or -1 if it timed out
+def wait_until_ready_ms(ready_function, timeout_ms, poll_ms):
+    wait_start_ticks_ms = time.ticks_ms()
+    while True:
+        if ready_function():
+            return time.ticks_diff(time.ticks_ms(), wait_start_ticks_ms)
+        if time.ticks_diff(time.ticks_ms(), wait_start_ticks_ms) >= timeout_ms:
+            return -1
+        time.sleep_ms(poll_ms)
+
+
+# wait for ds18b20 power up, a presence pulse on the one wire bus means a sensor is ready to talk
+def ds18b20_wait_for_power_up(ds_sensors):
+    return wait_until_ready_ms(ds_sensors.ow.reset, Constant_ds18b20_power_up_timeout_ms, Constant_ds18b20_poll_ms)
+
+
+# wait for ds18b20 conversion, the bus reads 1 when every sensor has finished. Never longer than the datasheet max for the resolution
+def ds18b20_wait_for_conversion(ds_sensors, ds18b20_resolution):
+    return wait_until_ready_ms(ds_sensors.ow.readbit, Constant_ds18b20_conversion_time_ms[ds18b20_resolution], Constant_ds18b20_poll_ms)
+
+
+# start a conversion on one ds18b20 only, used when just that sensor has to convert again
+def ds18b20_convert_one(ds_sensors, ds18b20rom):
+    ds_sensors.ow.reset(True)
+    ds_sensors.ow.select_rom(ds18b20rom)
+    ds_sensors.ow.writebyte(0x44)
+
+
+# read the raw 9 byte scratchpad of one ds18b20, checked by ds18b20_check_scratch()
+def ds18b20_read_scratch(ds_sensors, ds18b20rom):
+    ds18b20_scratch = bytearray(9)
+    ds_sensors.ow.reset(True)
+    ds_sensors.ow.select_rom(ds18b20rom)
+    ds_sensors.ow.writebyte(0xBE)
+    ds_sensors.ow.readinto(ds18b20_scratch)
+    return ds18b20_scratch
+
+
+# check the scratchpad came over the bus intact, a bad transfer only needs the scratchpad read again
+def ds18b20_check_scratch(ds_sensors, ds18b20_scratch):
+    if ds_sensors.ow.crc8(ds18b20_scratch):
+        raise ds18b20_scratchpad_Exception('scratchpad CRC error, read scratchpad again')
+    # a bus held low reads all zeros and passes the CRC, a bus with no sensor reads all ones. Reserved bytes are not checked, clone ds18b20s differ
+    if not any(ds18b20_scratch) or all([scratch_byte == 0xFF for scratch_byte in ds18b20_scratch]):
+        raise ds18b20_scratchpad_Exception('scratchpad is all zeros or all ones, read scratchpad again')
+
+
+# temperature from a checked scratchpad, raises if the sensor has to convert again
+def ds18b20_scratch_to_valid_temp(ds18b20rom, ds18b20_scratch):
+    # power on reset value is 85C with 0x0C in the reserved byte 6, a real 85C conversion leaves 0x10 there
+    if ds18b20rom[0] != 0x10 and ds18b20_scratch[0] == 0x50 and ds18b20_scratch[1] == 0x05 and ds18b20_scratch[6] == 0x0C:
+        raise ds18b20_85C_Exception('Temperature is the 85C power on reset value, sensor did not convert, convert again')
+    temp = ds18b20_scratch_to_temp(ds18b20rom, ds18b20_scratch)
+    if temp > 125 or temp < -55:
+        raise ds18b20_NEG_55C_POS_125C_Exception('Temperature is less than NEG_55C or greater than POS_125C, convert again')
+    return temp
+
+
+# ds18b20 configuration register value for a resolution of 9, 10, 11 or 12 bits
+def ds18b20_resolution_to_config(ds18b20_resolution):
+    return ((ds18b20_resolution - 9) << 5) | 0x1F
+
+
+# ds18b20 resolution in bits from the configuration register
+def ds18b20_config_to_resolution(ds18b20_config):
+    return ((ds18b20_config >> 5) & 0x03) + 9
+
+
+# convert a 9 byte scratchpad into a temperature
+def ds18b20_scratch_to_temp(ds18b20rom, ds18b20_scratch):
+    # ds18s20 (0x10) has a fixed 9 bit reading plus count remain bytes, same as the ds18x20 library
+    if ds18b20rom[0] == 0x10:
+        if ds18b20_scratch[1]:
+            t = ds18b20_scratch[0] >> 1 | 0x80
+            t = -((~t + 1) & 0xFF)
+        else:
+            t = ds18b20_scratch[0] >> 1
+        return t - 0.25 + (ds18b20_scratch[7] - ds18b20_scratch[6]) / ds18b20_scratch[7]
+    t = ds18b20_scratch[1] << 8 | ds18b20_scratch[0]
+    # bits below the selected resolution are undefined, clear them
+    t &= 0xFFFF ^ ((1 << (12 - ds18b20_config_to_resolution(ds18b20_scratch[4]))) - 1)
+    if t & 0x8000:
+        t = -((t ^ 0xFFFF) + 1)
+    return t / 16
+
+
+# write the resolution to the ds18b20 configuration register and copy it to the sensors eeprom, so it only has to be done once
+def ds18b20_write_resolution(ds_sensors, ds18b20rom, ds18b20_resolution):
+    # keep the alarm TH and TL bytes at the power on defaults
+    ds_sensors.write_scratch(ds18b20rom, bytearray((0x4B, 0x46, ds18b20_resolution_to_config(ds18b20_resolution))))
+    # copy scratchpad to eeprom
+    ds_sensors.ow.reset()
+    ds_sensors.ow.select_rom(ds18b20rom)
+    ds_sensors.ow.writebyte(0x48)
+    # eeprom write takes up to 10ms
+    time.sleep_ms(10)
+
+
+# set the resolution of every ds18b20 on the bus, used when the resolution setting is changed
+def ds18b20_apply_resolution(ds18b20_serial_number_list, ds18b20_resolution):
+    if not ds18b20_serial_number_list:
+        return
+    # pin used to supply gpio (+) voltage to temp sensor(s)
+    gpio_pin_pos_volt_supply_for_ds18b20 = machine.Pin(Constant_ds18b20_gpio_pos_pin, machine.Pin.OUT)
+    # set pin1 high/(+)
+    gpio_pin_pos_volt_supply_for_ds18b20.value(1)
+    ds_sensors = ds18x20.DS18X20(onewire.OneWire(machine.Pin(Constant_ds18b20_one_wire_pin)))
+    # give time for voltage to settle
+    ds18b20_wait_for_power_up(ds_sensors)
+    for ds18b20_serial_number in ds18b20_serial_number_list:
+        # noinspection PyBroadException
+        try:
+            ds18b20_write_resolution(ds_sensors, ds18b20_rom_from_serial_number(ds18b20_serial_number), ds18b20_resolution)
+        except Exception as e:
+            print('Error: {0}'.format(e))
+            print('unable to set resolution of ds18b20: {0}'.format(ds18b20_serial_number))
+    # set pin1 low/(-)
+    gpio_pin_pos_volt_supply_for_ds18b20.value(0)
+
+
+# read one ds18b20 on the bus, the first read uses the conversion already started for all sensors on the bus.
+# a corrupted transfer only reads the scratchpad again, a sensor that did not convert converts again on its own.
+# everything stops at ds18b20_deadline_ticks_ms and an error code is returned: 85 no conversion, 998 out of range, 996 unable to read
+def ds18b20_read_temp(ds_sensors, ds18b20rom, ds18b20_resolution, ds18b20_deadline_ticks_ms):
+    ds18b20_sensor_resolution = ds18b20_resolution
+    ds18b20_scratch_reads = 0
+    while True:
+        ds18b20_scratch_reads += 1
+        ds18b20_convert = False
+        # noinspection PyShadowingNames,PyBroadException
+        try:
+            ds18b20_scratch = ds18b20_read_scratch(ds_sensors, ds18b20rom)
+            ds18b20_check_scratch(ds_sensors, ds18b20_scratch)
+            ds18b20_sensor_resolution = ds18b20_config_to_resolution(ds18b20_scratch[4])
+            # sensor is not at the selected resolution (new or replaced sensor), set it once for next time
+            if ds18b20rom[0] != 0x10 and ds18b20_sensor_resolution != ds18b20_resolution:
+                print('ds18b20 resolution is {0} bits, setting it to {1} bits'.format(ds18b20_sensor_resolution, ds18b20_resolution))
+                ds18b20_write_resolution(ds_sensors, ds18b20rom, ds18b20_resolution)
+                ds18b20_sensor_resolution = ds18b20_resolution
+            return ds18b20_scratch_to_valid_temp(ds18b20rom, ds18b20_scratch)
+        except ds18b20_scratchpad_Exception as e:
+            print('Error: {0}'.format(e))
+            temp = 996
+        except ds18b20_85C_Exception as e:
+            print('Error: {0}'.format(e))
+            temp = 85
+            ds18b20_convert = True
+        except ds18b20_NEG_55C_POS_125C_Exception as e:
+            print('Error: {0}'.format(e))
+            temp = 998
+            ds18b20_convert = True
+        except Exception as e:
+            print('Error: {0}'.format(e))
+            print('unable to get temperature')
+            temp = 996
+        ds18b20_remaining_ms = time.ticks_diff(ds18b20_deadline_ticks_ms, time.ticks_ms())
+        # only convert again if the conversion fits in what is left of the time budget, a sensor that is gone stops after a few reads
+        if ds18b20_remaining_ms <= 0 or ds18b20_scratch_reads >= Constant_ds18b20_max_scratch_reads or (ds18b20_convert and ds18b20_remaining_ms < Constant_ds18b20_conversion_time_ms[ds18b20_sensor_resolution]):
+            print('ds18b20 read time budget used, temp set to error code {0}'.format(temp))
+            return temp
+        if ds18b20_convert:
+            # noinspection PyBroadException
+            try:
+                ds18b20_convert_one(ds_sensors, ds18b20rom)
+                ds18b20_wait_for_conversion(ds_sensors, ds18b20_sensor_resolution)
+            except Exception as e:
+                print('Error: {0}'.format(e))
+
+
+# ds18b20 Temperature Sensor(s), power up the bus and start one conversion for every sensor without waiting for it.
+# returns a dictionary for ds18b20_collect(), so other work can be done while the sensors convert
+def ds18b20_start(ds18b20_serial_number_list, ds18b20_resolution):
+    ds18b20_conversion = {
+        "serial_number_list": ds18b20_serial_number_list,
+        "resolution": ds18b20_resolution,
+        "power_up_ms": -1,
+        "start_ticks_ms": None
+    }
+    # check that sensor was found and loaded else report code in ds18b20_collect()
+    if not ds18b20_serial_number_list:
+        return ds18b20_conversion
+    # pin used to supply gpio (+) voltage to temp sensor(s)
+    gpio_pin_pos_volt_supply_for_ds18b20 = machine.Pin(Constant_ds18b20_gpio_pos_pin, machine.Pin.OUT)
+    # set pin1 high/(+)
+    gpio_pin_pos_volt_supply_for_ds18b20.value(1)
+    # pin used to communicate with one wire ds18b20 temp sensor(s)
+    ds18b20_one_wire = machine.Pin(Constant_ds18b20_one_wire_pin)
+    # define sensors object useing library
+    ds_sensors = ds18x20.DS18X20(onewire.OneWire(ds18b20_one_wire))
+    ds18b20_conversion["gpio_pin_pos_volt_supply"] = gpio_pin_pos_volt_supply_for_ds18b20
+    ds18b20_conversion["ds_sensors"] = ds_sensors
+    # give time for voltage to settle, once for all sensors on the bus
+    ds18b20_conversion["power_up_ms"] = ds18b20_wait_for_power_up(ds_sensors)
+    # noinspection PyBroadException
+    try:
+        # one skip-ROM conversion for every sensor on the bus
+        ds_sensors.convert_temp()
+        ds18b20_conversion["start_ticks_ms"] = time.ticks_ms()
+    except Exception as e:
+        print('Error: {0}'.format(e))
+        print('unable to start temperature conversion')
+    return ds18b20_conversion
+
+
+# ds18b20 Temperature Sensor(s), wait for what is left of the conversion started by ds18b20_start() and read each scratchpad back-to-back
+# returns a list of (serial number, temp) one per sensor and the measured (power up ms, conversion ms), -1 if it timed out
+def ds18b20_collect(ds18b20_conversion):
+    # check that sensor was found and loaded else report code
+    if not ds18b20_conversion["serial_number_list"]:
+        return [('XXXXXXXX', 999)], (-1, -1)
+    ds_sensors = ds18b20_conversion["ds_sensors"]
+    ds18b20_conversion_ms = -1
+    if ds18b20_conversion["start_ticks_ms"] is not None:
+        # never wait past the datasheet max for the resolution, counted from when the conversion started
+        ds18b20_remaining_ms = Constant_ds18b20_conversion_time_ms[ds18b20_conversion["resolution"]] - time.ticks_diff(time.ticks_ms(), ds18b20_conversion["start_ticks_ms"])
+        # noinspection PyBroadException
+        try:
+            if wait_until_ready_ms(ds_sensors.ow.readbit, max(0, ds18b20_remaining_ms), Constant_ds18b20_poll_ms) != -1:
+                # if other work ran past the end of the conversion this is how long until collected
+                ds18b20_conversion_ms = time.ticks_diff(time.ticks_ms(), ds18b20_conversion["start_ticks_ms"])
+        except Exception as e:
+            print('Error: {0}'.format(e))
+            print('unable to poll temperature conversion')
+    # end of waiting for the conversion, for the phase profile
+    ds18b20_conversion["read_ticks_ms"] = time.ticks_ms()
+    # one time budget for reading every sensor, including any scratchpad re-reads and conversions of a bad sensor
+    ds18b20_deadline_ticks_ms = time.ticks_add(time.ticks_ms(), Constant_ds18b20_read_budget_ms)
+    ds18b20_results = []
+    for ds18b20_serial_number in ds18b20_conversion["serial_number_list"]:
+        ds18b20_results.append((ds18b20_serial_number, ds18b20_read_temp(ds_sensors, ds18b20_rom_from_serial_number(ds18b20_serial_number), ds18b20_conversion["resolution"], ds18b20_deadline_ticks_ms)))
+    # set pin1 low/(-)
+    ds18b20_conversion["gpio_pin_pos_volt_supply"].value(0)
+    # print('ds18b20 power up ms: {0}, conversion ms: {1}'.format(ds18b20_conversion["power_up_ms"], ds18b20_conversion_ms))
+    return ds18b20_results, (ds18b20_conversion["power_up_ms"], ds18b20_conversion_ms)
+
+
+# ds18b20 Temperature Sensor(s), blocking read. returns a list of (serial number, temp) one per sensor and the measured (power up ms, conversion ms)
+def ds18b20(ds18b20_serial_number_list, ds18b20_resolution):
+    return ds18b20_collect(ds18b20_start(ds18b20_serial_number_list, ds18b20_resolution))
+
+
+# control the blinks of led
+def led_blink(pin, blinks, interval_on, interval_off, interval_before_sets, interval_after_sets):
+    # establish pin
+    gpio_pin_for_led = machine.Pin(pin, machine.Pin.OUT)
+    # set pin1 low/(-)
+    gpio_pin_for_led.value(0)
+
+    time.sleep_ms(interval_before_sets)
+    for x in range(blinks):
+        gpio_pin_for_led.value(1)
+        time.sleep_ms(interval_on)
+        gpio_pin_for_led.value(0)
+        time.sleep_ms(interval_off)
+    time.sleep_ms(interval_after_sets)
+
+
+# [Static]
+# Battery - Min and Max voltage range
+Constant_battery_min_voltage = const(3.025)
+Constant_battery_max_voltage = const(3.475)
+# Battery - Pin used to supply gpio (+) voltage to voltage divider resister 1.1kohms
+Constant_batt_gpio_pos_volts_supply_pin = const(11)
+# Battery - Pin used for taking analog voltage
+Constant_adc_gpio_read_batt_voltage_pin = const(4)
+# Battery - number of adc samples taken in one settle window
+Constant_battery_adc_samples = const(16)
+# Battery - fraction of the lowest and highest adc samples dropped before averaging
+Constant_battery_adc_trim = 0.25
+# Battery - max age in ms of the battery reading cached in rtc memory
+Constant_battery_cache_max_age_ms = const(24 * 60 * 60000)
+
+# ds18b20 temp sensor - Pin used to supply gpio (+) voltage to temperature sensor
+Constant_ds18b20_gpio_pos_pin = const(5)
+# ds18b20 temp sensor - Pin used to communicate with one wire ds18b20 temperature sensor
+Constant_ds18b20_one_wire_pin = const(3)
+# ds18b20 temp sensor - max conversion time in ms for each resolution in bits (datasheet tCONV), ceiling when polling for conversion done
+Constant_ds18b20_conversion_time_ms = {9: 94, 10: 188, 11: 375, 12: 750}
+# ds18b20 temp sensor - ceiling in ms when polling for the presence pulse after power up
+Constant_ds18b20_power_up_timeout_ms = const(2500)
+# ds18b20 temp sensor - ms between polls of the one wire bus
+Constant_ds18b20_poll_ms = const(2)
+# ds18b20 temp sensor - time budget in ms for reading every sensor after the conversion, enough for one 12 bit conversion of a bad sensor
+Constant_ds18b20_read_budget_ms = const(1000)
+# ds18b20 temp sensor - max scratchpad reads of one sensor per wake
+Constant_ds18b20_max_scratch_reads = const(5)
+
+# onboard led - pin used to turn on and off the onboard led
+Constant_onboard_led_gpio_pin = const(15)
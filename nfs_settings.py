@@ -0,0 +1,215 @@
+# NFS - device and wifi settings on flash
+
+# Copyright (c) 2023 One DB Ventures, LLC (AKA, No Flipping Switches)
+
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+import time
+import machine
+import onewire
+import ds18x20
+import os
+import json
+import ubinascii
+from nfs_sensor import Constant_ds18b20_gpio_pos_pin, Constant_ds18b20_one_wire_pin
+from nfs_rtc import rtc_config_invalidate
+
+
+# [ Functions ]
+# returns json as a python dictionary
+def json_to_dictionary(path_and_or_file_name_to_json):
+    with open(path_and_or_file_name_to_json, 'r') as openfile:
+        # noinspection PyTypeChecker
+        return json.load(openfile)
+
+
+# writes dictionary to a json file
+def dictionary_to_json(python_dictionary, path_and_or_file_name_to_json):
+    with open(path_and_or_file_name_to_json, "w") as outfile:
+        # noinspection PyTypeChecker
+        json.dump(python_dictionary, outfile)
+    # settings changed, station wakes read them from flash again
+    rtc_config_invalidate()
+
+
+# default wifi_settings.json, also used to add settings missing from an older wifi_settings.json
+def wifi_settings_default_dictionary(device_settings_dictionary):
+    return {
+        "record_data_interval_ms": 5 * 60000,
+        "send_data_interval_list_length": 12,
+        "send_data_interval_min": 60,
+        "ds18b20_resolution": 12,
+        "battery_read_every_wakes": 36,
+        "deadband_c": 0,
+        "alarm_low_c": None,
+        "alarm_high_c": None,
+        "heartbeat_min": 24 * 60,
+        "adaptive_min_ms": 0,
+        "adaptive_max_ms": 60 * 60000,
+        "adaptive_step_c": 0.2,
+        "diagnostics": True,
+        # 'json', or 'binary' for the compact frame of nfs_payload.py published on the topic of the device + /bin
+        "payload_format": 'json',
+        # after a failed send the next one waits send_backoff_min, doubling with each failed send up to send_backoff_max_min. Access points
+        # weaker than send_rssi_min dBm are not connected to, the send waits like a failed one
+        "send_backoff_min": 5,
+        "send_backoff_max_min": 4 * 60,
+        "send_rssi_min": -85,
+        # energy ledger, capacity of an ER34615 cell and estimated currents of the board, measure the board to set them
+        "battery_capacity_mah": 19000,
+        "energy_awake_ma": 25.0,
+        "energy_radio_ma": 70.0,
+        "energy_sensor_ma": 1.5,
+        "energy_sleep_ma": 0.05,
+        "access_point": {
+            "wifi_ssid": device_settings_dictionary['unique_id'],
+            "wifi_password": device_settings_dictionary['hash_unique_id']
+        },
+        "known_wifi": {
+        },
+        "mqtt_url": 'noflippingswitches.com',
+        "mqtt_ssl": False,
+        "mqtt_port": 1883,
+        "mqtt_username": '',
+        "mqtt_password": '',
+        # esp-now, '' off, 'sensor' sends to the gateway with the mac espnow_gateway_mac, 'gateway' publishes for the sensors. Channel 0 is the
+        # channel of the last wifi connect
+        "espnow_role": '',
+        "espnow_gateway_mac": '',
+        "espnow_channel": 0
+    }
+
+
+# device and wifi settings from flash, creates them if missing (the machine resets after). Missing settings are added in memory
+def settings_load():
+    # Load device_settings.json to Python dictionary, Else create them
+    try:
+        device_settings_dictionary = json_to_dictionary('device_settings.json')
+        # print('Loaded device_settings.json')
+    except Exception as e:
+        print(' ')
+        print('Error: {0}'.format(e))
+        print('Unable to open file: device_settings.json')
+        print('cetch_all: try to delete device_settings.json if it cant be opened')
+        try:
+            os.remove('device_settings.json')
+        except Exception as e:
+            print('Error: {0}'.format(e))
+
+        import hashlib
+
+        # Get unique ID from the esp32, every device has a different one
+        raw_unique_id = machine.unique_id()
+        unique_id_b1 = ubinascii.hexlify(raw_unique_id)
+        unique_id = unique_id_b1.decode('UTF-8')
+
+        # create access_point_ssid by hashing unique_id
+        raw_hash_unique_id = hashlib.sha256(unique_id_b1)
+        hash_unique_id_b1 = ubinascii.hexlify(raw_hash_unique_id.digest())
+        hash_unique_id_b2 = hash_unique_id_b1.decode('UTF-8')
+        hash_unique_id = hash_unique_id_b2[-12:]
+
+        # Get ds18b20 Serial number(s), every sensor found on the bus
+        # this is so we don't have to waste battery scanning for it after each wake from deep sleap
+        # pin used to supply gpio (+) voltage to temp sensor
+        gpio_pin_pos_volt_supply_for_ds18b20_x1 = machine.Pin(Constant_ds18b20_gpio_pos_pin, machine.Pin.OUT)
+        # set pin1 high/(+)
+        gpio_pin_pos_volt_supply_for_ds18b20_x1.value(1)
+        # give time for voltage to initialize ds18b20 temp sensor
+        time.sleep_ms(1000)
+
+        # pin used to communicate with one wire ds18b20 temp sensor
+        ds18b20_one_wire_x1 = machine.Pin(Constant_ds18b20_one_wire_pin)
+
+        # define sensors object using library
+        ds_sensors_x1 = ds18x20.DS18X20(onewire.OneWire(ds18b20_one_wire_x1))
+
+        # scan for the serial number of the temp sensor(s)
+        sensorIDs = ds_sensors_x1.scan()
+
+        # set pin1 low/(-)
+        gpio_pin_pos_volt_supply_for_ds18b20_x1.value(0)
+
+        # convert bytearray(s) into a human-readable serial number(s)
+        ds18b20_sn_list = []
+        try:
+            for sensorID in sensorIDs:
+                ds18b20_sn_list.append(''.join('%02X' % i for i in iter(sensorID)))
+            ds18b20_sn = ds18b20_sn_list[0]
+        except Exception as e:
+            print(' ')
+            print('Error: {0}'.format(e))
+            print('Unable convert bytearray into a human-readable serial number')
+            print('Make sure ds18b20 is connected and not broken')
+            print('ds18b20_sn set to False')
+            print(' ')
+            ds18b20_sn = False
+
+        device_settings_dictionary = {
+            "device": "NFS.1001.a",
+            "board": "esp32-s2-mini-wemos",
+            "battery": "1x3.6V_D_ER34615@3.6v",
+            "software_version": "0.2.18",
+            "unique_id": 'NFS-{0}'.format(unique_id),
+            "ds18b20_sn": ds18b20_sn,
+            "ds18b20_sn_list": ds18b20_sn_list,
+            "hash_unique_id": hash_unique_id
+        }
+        dictionary_to_json(device_settings_dictionary, 'device_settings.json')
+        print('Created device_settings.json')
+        print(' ')
+        print('Machine will reset')
+        machine.reset()
+
+    # devices created before multi sensor support only saved the first sensor found
+    if 'ds18b20_sn_list' not in device_settings_dictionary:
+        if device_settings_dictionary['ds18b20_sn']:
+            device_settings_dictionary['ds18b20_sn_list'] = [device_settings_dictionary['ds18b20_sn']]
+        else:
+            device_settings_dictionary['ds18b20_sn_list'] = []
+
+    # Load wifi_settings.json to Python dictionary, Else create it
+    try:
+        wifi_settings_dictionary = json_to_dictionary('wifi_settings.json')
+        # print('Loaded wifi_settings.json')
+    except Exception as e:
+        print(' ')
+        print('Error: {0}'.format(e))
+        print('Unable to open file: wifi_settings.json')
+        print('cetch_all: try to delete wifi_settings.json if it cant be opened')
+
+        try:
+            os.remove('wifi_settings.json')
+        except Exception as e:
+            print('Error: {0}'.format(e))
+
+        wifi_settings_dictionary = wifi_settings_default_dictionary(device_settings_dictionary)
+        dictionary_to_json(wifi_settings_dictionary, 'wifi_settings.json')
+        print('Created wifi_settings.json')
+        print(' ')
+        print('Machine will reset')
+        machine.reset()
+
+    # add any setting missing from a wifi_settings.json created by older software, only in memory so flash is not written every wake
+    for wifi_settings_key, wifi_settings_value in wifi_settings_default_dictionary(device_settings_dictionary).items():
+        if wifi_settings_key not in wifi_settings_dictionary:
+            wifi_settings_dictionary[wifi_settings_key] = wifi_settings_value
+
+    return device_settings_dictionary, wifi_settings_dictionary